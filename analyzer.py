@@ -1,47 +1,41 @@
+import io
 import os
 import json
-import tomli  # pip install tomli
+import codecs
+import threading
 from pathlib import Path # Usaremos pathlib para lidar com caminhos
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+import cache
+import ignorados
+import manifestos
+import telemetria
 
 # --- CONSTANTES GLOBAIS ---
 
-# Mapeamento de arquivos de definição de projeto para suas tecnologias
-ARQUIVOS_CHAVE = {
-    # Python
-    "requirements.txt": "Python",
-    "pyproject.toml": "Python",
-    "Pipfile": "Python",
-    # JavaScript
-    "package.json": "JavaScript (Node.js)",
-    # Java
-    "pom.xml": "Java (Maven)",
-    "build.gradle": "Java (Gradle)",
-    # Ruby
-    "Gemfile": "Ruby",
-    # Go
-    "go.mod": "Go",
-    # C#
-    ".csproj": "C# (.NET)",
-    ".sln": "C# (.NET)",
-}
+# Versão da lógica de análise. Faz parte da chave do cache de análises:
+# incremente sempre que mudar algo que altere o contexto gerado.
+VERSAO_ANALISADOR = 6
 
-# Ordem de prioridade para desambiguação no *mesmo* diretório
-# Se encontrar 'pyproject.toml' E 'requirements.txt' na raiz, o 'pyproject.toml' vence.
-LISTA_PRIORIDADE = [
-    "pyproject.toml", "Pipfile", "package.json", 
-    "requirements.txt", "pom.xml", "build.gradle",
-    "go.mod", "Gemfile", ".csproj", ".sln",
-]
-
-# Mapeamento de tecnologias para seus arquivos de entry point
-ARQUIVOS_PRINCIPAIS = {
-    "Python": ["main.py", "app.py", "run.py", "__init__.py"],
-    "JavaScript (Node.js)": [
-        "index.js", "server.js", "app.js", "main.js",
-        "index.ts", "server.ts", "app.ts", "main.ts",
-        "main.tsx", "index.tsx"
-    ]
-}
+# Cache de contextos já analisados, indexado pelo hash da árvore do commit
+CACHE_ANALISE_MAX_MB = float(os.getenv("README_AI_CACHE_ANALISE_MAX_MB", "100"))
+_cache_analise = cache.CacheDisco("analise", max_mb=CACHE_ANALISE_MAX_MB)
+# Última análise de cada URL (com o commit), base da reanálise incremental
+_cache_ultima_analise = cache.CacheDisco("ultima_analise", max_mb=CACHE_ANALISE_MAX_MB)
+
+# Os formatos de manifesto (tecnologia, dependências, entry points e comando de
+# instalação de cada um) ficam no registro do pacote 'manifestos'.
+
+# Pastas, relativas à stack, onde procurar o código principal (além das
+# subpastas diretas e das pastas próprias de cada formato, ex: src/main/java)
+PASTAS_BUSCA_CODIGO = ["", "src", "app", "lib", "cmd"]
+# Caracteres lidos do código principal e o teto de bytes lidos do arquivo (um
+# caractere UTF-8 tem até 4 bytes): um entry point gerado enorme não vai inteiro para a memória
+MAX_CARACTERES_CODIGO = 4000
+MAX_BYTES_CODIGO = MAX_CARACTERES_CODIGO * 4
+
+# Máximo de stacks processadas em paralelo (I/O e parsing de manifestos)
+MAX_WORKERS_STACKS = 8
 
 # Pastas que devem ser ignoradas pela varredura do os.walk()
 IGNORAR_DIRETORIOS = {
@@ -49,58 +43,435 @@ IGNORAR_DIRETORIOS = {
     '__pycache__', '.DS_Store', 'venv', '.env',
     'docs', 'tests', 'test', 'examples', 'scripts',
     'dist', 'build', 'site',
+    'target', '.venv', 'vendor', '.next', 'coverage',
+    '.tox', '.pytest_cache', '.mypy_cache',
 }
 
+# Configuração padrão da varredura (ajustável pelo .env)
+# Globs no formato do .gitignore, separados por vírgula
+VARREDURA_EXCLUIR = os.getenv("README_AI_VARREDURA_EXCLUIR", "")
+VARREDURA_INCLUIR = os.getenv("README_AI_VARREDURA_INCLUIR", "")
+VARREDURA_PROFUNDIDADE_MAX = int(os.getenv("README_AI_VARREDURA_PROFUNDIDADE_MAX", "0")) or None
+# Limites para repositórios enormes (0 desativa): passando deles, a análise
+# é parcial e o contexto ganha a chave 'parcial' dizendo o que ficou de fora
+VARREDURA_MAX_ENTRADAS = int(os.getenv("README_AI_VARREDURA_MAX_ENTRADAS", "200000")) or None
+VARREDURA_MAX_STACKS = int(os.getenv("README_AI_MAX_STACKS", "50")) or None
+# Exemplos de caminhos podados guardados nas estatísticas
+MAX_EXEMPLOS_PODADOS = 20
+
+
+def _lista_globs(valor) -> list[str]:
+    if isinstance(valor, str):
+        return [g.strip() for g in valor.split(",") if g.strip()]
+    return list(valor or [])
+
+
+class ConfigVarredura:
+    """
+    O que a varredura do repositório deve pular:
+    - pastas com nomes em IGNORAR_DIRETORIOS (listadas, mas não visitadas);
+    - o que o .gitignore (de cada pasta) e o .git/info/exclude ignoram;
+    - 'excluir': globs extras, no formato do .gitignore (ex: 'gen/', '*.pb.go');
+    - 'incluir': globs que nunca são podados (vencem todas as regras acima);
+    - 'profundidade_max': não desce além desse nível de pastas (raiz = 0);
+    - 'max_entradas': para a varredura depois de indexar esse total de itens;
+    - 'max_stacks': analisa só esse total de stacks (as mais rasas).
+    """
+
+    def __init__(self, respeitar_gitignore: bool = True, excluir=VARREDURA_EXCLUIR,
+                 incluir=VARREDURA_INCLUIR, profundidade_max: int | None = VARREDURA_PROFUNDIDADE_MAX,
+                 max_entradas: int | None = VARREDURA_MAX_ENTRADAS,
+                 ignorar_diretorios=None, max_stacks: int | None = VARREDURA_MAX_STACKS):
+        self.respeitar_gitignore = respeitar_gitignore
+        self.excluir = _lista_globs(excluir)
+        self.incluir = _lista_globs(incluir)
+        self.profundidade_max = profundidade_max
+        self.max_entradas = max_entradas
+        self.max_stacks = max_stacks
+        self.ignorar_diretorios = set(IGNORAR_DIRETORIOS if ignorar_diretorios is None else ignorar_diretorios)
+
+    def chave(self) -> str:
+        """Representação estável, usada na chave do cache de análises."""
+        return json.dumps({
+            "gitignore": self.respeitar_gitignore,
+            "excluir": self.excluir,
+            "incluir": self.incluir,
+            "profundidade_max": self.profundidade_max,
+            "max_entradas": self.max_entradas,
+            "max_stacks": self.max_stacks,
+            "ignorar_diretorios": sorted(self.ignorar_diretorios),
+        }, sort_keys=True)
+
+# --- ÍNDICE DO REPOSITÓRIO ---
+
+class Entrada(NamedTuple):
+    """Um item listado dentro de um diretório do índice."""
+    nome: str
+    e_diretorio: bool
+
+
+class RepoIndex:
+    """
+    Índice do repositório montado com UMA única varredura baseada em os.scandir().
+    Guarda, para cada diretório visitado, seus itens (nome e tipo), na mesma
+    ordem do os.walk(). Detecção de stacks, mapeamento da raiz e busca de
+    entry points viram consultas em memória, sem novos listdir/exists/isdir.
+
+    Os caminhos relativos seguem o formato de str(Path(...)): '.' para a raiz,
+    'backend', 'backend/app' (com o separador do sistema).
+    """
+
+    def __init__(self, repo_path: str, config: ConfigVarredura | None = None):
+        self.repo_path = str(repo_path)
+        self.config = config or ConfigVarredura()
+        self.diretorios: dict[str, list[Entrada]] = {}
+        self._arquivos: set[str] = set()
+        self._tamanhos: dict[str, int] = {}
+        self.podados = {"padrao": 0, "gitignore": 0, "excluir": 0, "profundidade": 0, "limite_entradas": 0}
+        self.exemplos_podados: list[str] = []
+        self.truncado = False
+        self._varrer()
+
+    def _varrer(self) -> None:
+        with telemetria.span("analise.varredura") as s:
+            self._varrer_pastas()
+            s.definir(diretorios=len(self.diretorios), arquivos=len(self._arquivos),
+                      truncado=self.truncado,
+                      **{f"podados_{motivo}": n for motivo, n in self.podados.items()})
+
+    def _podar(self, motivo: str, caminho_rel: str) -> None:
+        self.podados[motivo] += 1
+        if len(self.exemplos_podados) < MAX_EXEMPLOS_PODADOS:
+            self.exemplos_podados.append(f"{motivo}: {caminho_rel}")
+
+    def _motivo_poda(self, caminho_posix: str, nome: str, e_diretorio: bool,
+                     conjuntos: tuple) -> str | None:
+        """Por que um item deve ser podado (ou None para mantê-lo no índice)."""
+        if self._incluir and self._incluir.decidir(caminho_posix, nome, e_diretorio):
+            return None
+        if self._excluir and self._excluir.decidir(caminho_posix, nome, e_diretorio):
+            return "excluir"
+        if conjuntos and ignorados.esta_ignorado(conjuntos, caminho_posix, nome, e_diretorio):
+            return "gitignore"
+        return None
+
+    def _varrer_pastas(self) -> None:
+        config = self.config
+        self._incluir = ignorados.ConjuntoPadroes(config.incluir)
+        self._excluir = ignorados.ConjuntoPadroes(config.excluir)
+        conjuntos_raiz = ()
+        if config.respeitar_gitignore:
+            exclude = self._padroes_exclude()
+            conjuntos_raiz = (exclude,) if exclude else ()
+        total_entradas = 0
+
+        # Pilha (DFS pré-ordem) para reproduzir a ordem do os.walk(topdown=True).
+        # Cada pasta leva a profundidade e os conjuntos de padrões que valem nela.
+        pendentes = [(".", 0, conjuntos_raiz)]
+        while pendentes:
+            if config.max_entradas and total_entradas >= config.max_entradas:
+                self.truncado = True
+                for caminho_rel, _, _ in pendentes:
+                    self._podar("limite_entradas", caminho_rel)
+                break
+
+            caminho_rel, profundidade, conjuntos = pendentes.pop()
+            itens = self._listar_pasta(caminho_rel)
+
+            # O .gitignore de uma pasta vale para ela mesma e para as subpastas
+            if config.respeitar_gitignore and any(nome == ignorados.NOME_GITIGNORE for nome, _, _ in itens):
+                base = "" if caminho_rel == "." else caminho_rel.replace(os.sep, "/")
+                conjunto = self._ler_padroes(os.path.join(caminho_rel, ignorados.NOME_GITIGNORE), base)
+                if conjunto:
+                    conjuntos = (*conjuntos, conjunto)
+
+            entradas = []
+            subdiretorios = []
+            for nome, e_diretorio, e_link in itens:
+                item_rel = nome if caminho_rel == "." else os.path.join(caminho_rel, nome)
+                motivo = self._motivo_poda(item_rel.replace(os.sep, "/"), nome, e_diretorio, conjuntos)
+                if motivo:
+                    self._podar(motivo, item_rel)
+                    continue
+                entradas.append(Entrada(nome, e_diretorio))
+
+                if not e_diretorio:
+                    self._arquivos.add(item_rel)
+                elif e_link:
+                    continue
+                elif nome in config.ignorar_diretorios and not \
+                        (self._incluir and self._incluir.decidir(item_rel.replace(os.sep, "/"), nome, True)):
+                    self._podar("padrao", item_rel)
+                elif config.profundidade_max is not None and profundidade >= config.profundidade_max:
+                    self._podar("profundidade", item_rel)
+                else:
+                    subdiretorios.append((item_rel, profundidade + 1, conjuntos))
+
+            self.diretorios[caminho_rel] = entradas
+            total_entradas += len(entradas)
+            pendentes.extend(reversed(subdiretorios))
+
+        podados = ", ".join(f"{motivo}={n}" for motivo, n in self.podados.items() if n)
+        print(f"Índice do repositório: {len(self.diretorios)} diretórios, "
+              f"{len(self._arquivos)} arquivos." + (f" Podados: {podados}." if podados else ""))
+
+    def _listar_pasta(self, caminho_rel: str) -> list[tuple[str, bool, bool]]:
+        """Itens de uma pasta no disco: (nome, é diretório, é link para diretório)."""
+        itens = []
+        try:
+            with os.scandir(self.caminho_absoluto(caminho_rel)) as it:
+                for item in it:
+                    try:
+                        e_diretorio = item.is_dir()
+                    except OSError:
+                        e_diretorio = False
+                    # Assim como o os.walk(), não segue links simbólicos para diretórios
+                    itens.append((item.name, e_diretorio, e_diretorio and item.is_symlink()))
+        except OSError:
+            pass
+        return itens
+
+    def _padroes_exclude(self) -> ignorados.ConjuntoPadroes | None:
+        return ignorados.ler_arquivo_padroes(os.path.join(self.repo_path, ignorados.CAMINHO_EXCLUDE))
+
+    def _ler_padroes(self, caminho_rel: str, base: str) -> ignorados.ConjuntoPadroes | None:
+        return ignorados.ler_arquivo_padroes(self.caminho_absoluto(caminho_rel), base)
+
+    def abrir(self, caminho_rel: str, binario: bool = False, limite_bytes: int | None = None):
+        """
+        Abre um arquivo do repositório para leitura (texto UTF-8 ou binário).
+        'limite_bytes' é só uma dica: quem lê do disco já lê em partes.
+        """
+        caminho_abs = self.caminho_absoluto(os.path.normpath(caminho_rel))
+        if binario:
+            return open(caminho_abs, "rb")
+        return open(caminho_abs, "r", encoding="utf-8")
+
+    def estatisticas(self) -> dict:
+        """Resumo da varredura: o que foi indexado e o que foi podado (e por quê)."""
+        return {
+            "diretorios": len(self.diretorios),
+            "arquivos": len(self._arquivos),
+            "podados": dict(self.podados),
+            "exemplos_podados": list(self.exemplos_podados),
+            "truncado": self.truncado,
+        }
+
+    def caminho_absoluto(self, caminho_rel: str) -> str:
+        return self.repo_path if caminho_rel == "." else os.path.join(self.repo_path, caminho_rel)
+
+    def listar(self, caminho_rel: str = ".") -> list[Entrada]:
+        """Itens de um diretório visitado (lista vazia se não existir ou foi ignorado)."""
+        return self.diretorios.get(os.path.normpath(caminho_rel), [])
+
+    def nomes_arquivos(self, caminho_rel: str = ".") -> set[str]:
+        return {e.nome for e in self.listar(caminho_rel) if not e.e_diretorio}
+
+    def e_arquivo(self, caminho_rel: str) -> bool:
+        return os.path.normpath(caminho_rel) in self._arquivos
+
+    def tamanho(self, caminho_rel: str) -> int:
+        """
+        Tamanho de um arquivo em bytes. Calculado sob demanda (um stat) e memorizado,
+        para que a varredura não pague um stat por arquivo do repositório inteiro.
+        """
+        caminho_rel = os.path.normpath(caminho_rel)
+        if caminho_rel not in self._tamanhos:
+            try:
+                self._tamanhos[caminho_rel] = os.stat(self.caminho_absoluto(caminho_rel)).st_size
+            except OSError:
+                self._tamanhos[caminho_rel] = 0
+        return self._tamanhos[caminho_rel]
+
+
+class RepoIndexArvore(RepoIndex):
+    """
+    RepoIndex montado direto do banco de objetos do git, sem working tree:
+    a estrutura vem de um único 'git ls-tree -r -t' e o conteúdo dos
+    arquivos é lido sob demanda (só os manifestos e entry points escolhidos).
+    Funciona com um clone bare (cloner.MODO_ARVORE) ou um worktree sem checkout.
+    """
+
+    def __init__(self, repo_path: str, config: ConfigVarredura | None = None, revisao: str = "HEAD"):
+        # GitPython só é importado quando um índice do git é de fato aberto
+        from git import Repo
+        self.repo = Repo(repo_path)
+        self.revisao = revisao
+        self._conteudo: dict[str, list[tuple[str, bool, bool]]] = {".": []}
+        self._objetos: dict[str, str] = {}
+        # O 'cat-file --batch' persistente do GitPython não é thread-safe
+        self._lock_leitura = threading.Lock()
+        self._carregar_arvore()
+        super().__init__(repo_path, config)
+
+    def _carregar_arvore(self) -> None:
+        # Sem '-l': pedir os tamanhos obrigaria um clone sem blobs a baixar todos eles
+        saida = self.repo.git.ls_tree("-r", "-t", "-z", self.revisao)
+        for registro in saida.split("\0"):
+            if not registro:
+                continue
+            meta, caminho = registro.split("\t", 1)
+            _, tipo, objeto = meta.split()
+            pasta, _, nome = caminho.rpartition("/")
+            caminho_rel = os.path.normpath(caminho)
+            pasta_rel = os.path.normpath(pasta) if pasta else "."
+            # Submódulos (tipo 'commit') aparecem como pastas vazias, como num checkout
+            e_diretorio = tipo != "blob"
+            self._conteudo.setdefault(pasta_rel, []).append((nome, e_diretorio, tipo == "commit"))
+            if tipo == "tree":
+                self._conteudo.setdefault(caminho_rel, [])
+            elif tipo == "blob":
+                self._objetos[caminho_rel] = objeto
+
+    def _listar_pasta(self, caminho_rel: str) -> list[tuple[str, bool, bool]]:
+        return self._conteudo.get(caminho_rel, [])
+
+    def _padroes_exclude(self) -> ignorados.ConjuntoPadroes | None:
+        # Num worktree, o info/exclude fica no diretório comum do repositório
+        return ignorados.ler_arquivo_padroes(os.path.join(self.repo.common_dir, "info", "exclude"))
+
+    def _ler_padroes(self, caminho_rel: str, base: str) -> ignorados.ConjuntoPadroes | None:
+        try:
+            dados = self.ler_bytes(caminho_rel, ignorados.MAX_BYTES_PADROES + 1)
+        except (KeyError, ValueError):
+            return None
+        return ignorados.compilar_bytes(dados, base)
+
+    def ler_bytes(self, caminho_rel: str, limite: int | None = None) -> bytes:
+        """
+        Conteúdo de um arquivo, lido do blob (baixado sob demanda num clone parcial).
+        Com 'limite', guarda no máximo esse total de bytes na memória.
+        """
+        objeto = self._objetos[os.path.normpath(caminho_rel)]
+        with self._lock_leitura:
+            fluxo = self.repo.odb.stream(bytes.fromhex(objeto))
+            if limite is None:
+                return fluxo.read()
+            dados = fluxo.read(limite)
+            # O 'cat-file' é compartilhado: o resto do blob precisa ser consumido aqui
+            while fluxo.read(manifestos.TAMANHO_BLOCO):
+                pass
+            return dados
+
+    def abrir(self, caminho_rel: str, binario: bool = False, limite_bytes: int | None = None):
+        try:
+            dados = self.ler_bytes(caminho_rel, limite_bytes)
+        except KeyError:
+            raise FileNotFoundError(f"'{caminho_rel}' não existe em {self.revisao}") from None
+        if binario:
+            return io.BytesIO(dados)
+        # Um conteúdo cortado no limite pode terminar no meio de um caractere
+        return io.StringIO(codecs.getincrementaldecoder("utf-8")().decode(dados, final=False))
+
+    def tamanho(self, caminho_rel: str) -> int:
+        caminho_rel = os.path.normpath(caminho_rel)
+        if caminho_rel not in self._tamanhos:
+            objeto = self._objetos.get(caminho_rel)
+            if objeto is None:
+                self._tamanhos[caminho_rel] = 0
+            else:
+                with self._lock_leitura:
+                    self._tamanhos[caminho_rel] = self.repo.odb.info(bytes.fromhex(objeto)).size
+        return self._tamanhos[caminho_rel]
+
+
+class RepoIndexSobDemanda(RepoIndex):
+    """
+    RepoIndex do disco que não varre o repositório: cada pasta é listada
+    (um os.scandir) só quando consultada, sem .gitignore nem podas. Serve às
+    chamadas avulsas (mapear_estrutura, ler_codigo_principal...) feitas sem
+    um índice, que só olham algumas pastas.
+    """
+
+    def _varrer(self) -> None:
+        pass
+
+    def listar(self, caminho_rel: str = ".") -> list[Entrada]:
+        caminho_rel = os.path.normpath(caminho_rel)
+        if caminho_rel not in self.diretorios:
+            self.diretorios[caminho_rel] = [
+                Entrada(nome, e_diretorio) for nome, e_diretorio, _ in self._listar_pasta(caminho_rel)
+            ]
+        return self.diretorios[caminho_rel]
+
+    def e_arquivo(self, caminho_rel: str) -> bool:
+        return os.path.isfile(self.caminho_absoluto(os.path.normpath(caminho_rel)))
+
+
+def e_checkout(repo_path: str) -> bool:
+    """
+    Indica se 'repo_path' tem arquivos no disco para varrer. Um clone bare
+    ou um worktree sem checkout (só o arquivo '.git') são lidos pela árvore.
+    """
+    try:
+        with os.scandir(repo_path) as it:
+            nomes = {item.name for item in it}
+    except OSError:
+        return True
+    if ".git" not in nomes and {"HEAD", "objects", "refs"} <= nomes:
+        return False  # Repositório bare
+    return bool(nomes - {".git"})
+
+
+def abrir_indice(repo_path: str, config: ConfigVarredura | None = None) -> RepoIndex:
+    """Cria o índice adequado: do disco (checkout) ou da árvore do git (sem checkout)."""
+    if e_checkout(repo_path):
+        return RepoIndex(repo_path, config)
+    return RepoIndexArvore(repo_path, config)
+
+
+def abrir_indice_sob_demanda(repo_path: str, config: ConfigVarredura | None = None) -> RepoIndex:
+    """
+    Como abrir_indice, mas sem varrer um checkout (veja RepoIndexSobDemanda).
+    Para consultas a poucas pastas; para detectar stacks use abrir_indice.
+    """
+    if e_checkout(repo_path):
+        return RepoIndexSobDemanda(repo_path, config)
+    return RepoIndexArvore(repo_path, config)
+
+
+def _abrir_arquivo(repo_path: str, caminho_rel: str, indice: RepoIndex | None, binario: bool = False,
+                   limite_bytes: int | None = None):
+    """Abre pelo índice (que pode ler do banco de objetos) ou direto do disco."""
+    if indice is not None:
+        return indice.abrir(caminho_rel, binario, limite_bytes)
+    caminho_abs = Path(repo_path) / caminho_rel
+    return open(caminho_abs, 'rb') if binario else open(caminho_abs, 'r', encoding='utf-8')
+
+
 # --- FUNÇÕES ---
 
-def identificar_todas_stacks(repo_path: str) -> list[dict]:
+def _stack_na_pasta(indice: RepoIndex, caminho_str: str) -> dict | None:
+    """
+    Encontra o melhor arquivo de stack *neste diretório* (pela prioridade do
+    registro de manifestos). Retorna None se a pasta não tiver nenhum.
+    """
+    arquivo = manifestos.escolher_manifesto(indice.nomes_arquivos(caminho_str))
+    if arquivo is None:
+        return None
+    # caminho_str já é relativo ('.' para raiz, 'backend' para subpasta)
+    return {
+        "tecnologia": manifestos.parser_para(arquivo).tecnologia,
+        "arquivo": arquivo,
+        "caminho": caminho_str
+    }
+
+def identificar_todas_stacks(repo_path: str, indice: RepoIndex | None = None) -> list[dict]:
     """
     Varre o repositório inteiro (incluindo subpastas) em busca de stacks.
     Retorna uma lista de todas as stacks encontradas.
+    Se um RepoIndex for passado, a busca é feita em memória sobre ele.
     """
     print("Analisando todas as stacks no repositório...")
     stacks_encontradas = []
     
-    # Converte o repo_path para um objeto Path para facilitar
-    repo_path_obj = Path(repo_path)
+    if indice is None:
+        indice = abrir_indice(repo_path)
 
-    # os.walk() varre o diretório de cima para baixo
-    for dirpath, dirnames, filenames in os.walk(repo_path, topdown=True):
-        
-        # --- Lógica para Ignorar Pastas ---
-        # Modifica dirnames IN-PLACE para que os.walk() não entre nelas
-        dirnames[:] = [d for d in dirnames if d not in IGNORAR_DIRETORIOS]
-        
-        # Converte o caminho atual para um objeto Path
-        dirpath_obj = Path(dirpath)
-        
-        # Encontra o melhor arquivo de stack *neste diretório*
-        melhor_arquivo_stack_neste_dir = None
-        
-        arquivos_stack_neste_dir = set(filenames) & set(LISTA_PRIORIDADE)
-        
-        if not arquivos_stack_neste_dir:
-            continue # Nenhuma stack neste diretório, continua para o próximo
-            
-        # Aplica a lógica de prioridade
-        for arquivo_prioritario in LISTA_PRIORIDADE:
-            if arquivo_prioritario in arquivos_stack_neste_dir:
-                melhor_arquivo_stack_neste_dir = arquivo_prioritario
-                break # Achamos o melhor para este diretório
-        
-        if melhor_arquivo_stack_neste_dir:
-            # Calcula o caminho relativo (ex: 'backend' ou '.')
-            caminho_relativo = dirpath_obj.relative_to(repo_path_obj)
-            
-            # Converte para string ('.' para raiz, 'backend' para subpasta)
-            caminho_str = str(caminho_relativo)
-            
-            stack_info = {
-                "tecnologia": ARQUIVOS_CHAVE[melhor_arquivo_stack_neste_dir],
-                "arquivo": melhor_arquivo_stack_neste_dir,
-                "caminho": caminho_str
-            }
-            
+    # Os diretórios do índice já estão na ordem do os.walk() e sem as pastas ignoradas
+    for caminho_str in indice.diretorios:
+        stack_info = _stack_na_pasta(indice, caminho_str)
+        if stack_info:
             print(f"Stack encontrada: {stack_info['tecnologia']} em ./{caminho_str}")
             stacks_encontradas.append(stack_info)
 
@@ -109,55 +480,82 @@ def identificar_todas_stacks(repo_path: str) -> list[dict]:
         
     return stacks_encontradas
 
-def extrair_dependencias(repo_path: str, stack_info: dict) -> list:
+def _limitar_stacks(stacks: list[dict], config: ConfigVarredura) -> tuple[list[dict], int]:
     """
-    Extrai a lista de dependências com base na stack_info (que inclui o caminho).
+    Fica com as config.max_stacks stacks mais rasas (a da raiz primeiro, depois
+    pelo caminho), na ordem original. Retorna (stacks, quantas foram descartadas).
+    """
+    if not config.max_stacks or len(stacks) <= config.max_stacks:
+        return stacks, 0
+    print(f"Aviso: {len(stacks)} stacks encontradas; só as {config.max_stacks} mais rasas serão analisadas.")
+    def profundidade(stack):
+        return (0 if stack["caminho"] == "." else stack["caminho"].count(os.sep) + 1, stack["caminho"])
+    mantidas = {stack["caminho"] for stack in sorted(stacks, key=profundidade)[:config.max_stacks]}
+    return [stack for stack in stacks if stack["caminho"] in mantidas], len(stacks) - config.max_stacks
+
+def _resumir_parcial(contexto: dict, stacks_descartadas: int) -> dict | None:
+    """
+    O que um limite deixou de fora da análise (varredura interrompida, stacks
+    descartadas, manifestos truncados), ou None se a análise foi completa.
+    """
+    varredura = contexto["varredura"]
+    manifestos_truncados = [
+        stack["caminho"] for stack in contexto["stacks"] if stack.get("dependencias_truncadas")
+    ]
+    motivos = []
+    if varredura["truncado"]:
+        motivos.append("limite_entradas")
+    if stacks_descartadas:
+        motivos.append("limite_stacks")
+    if manifestos_truncados:
+        motivos.append("limite_bytes_manifesto")
+    if not motivos:
+        return None
+    return {
+        "motivos": motivos,
+        "pastas_nao_varridas": varredura["podados"]["limite_entradas"],
+        "stacks_descartadas": stacks_descartadas,
+        "manifestos_truncados": manifestos_truncados,
+    }
+
+def _extrair_dependencias(repo_path: str, stack_info: dict, indice: RepoIndex | None = None,
+                          limite_bytes: int = manifestos.MAX_BYTES_MANIFESTO) -> tuple[list, bool]:
+    """
+    Como extrair_dependencias, mas retorna (dependências, truncado): 'truncado'
+    indica que o manifesto passou de 'limite_bytes' e a lista está incompleta.
     """
     arquivo_stack = stack_info['arquivo']
     caminho_stack = stack_info['caminho']
-    
-    # Monta o caminho completo (ex: /caminho/clone/backend/requirements.txt)
-    caminho_arquivo_abs = Path(repo_path) / caminho_stack / arquivo_stack
-    
-    dependencias = []
+    caminho_arquivo_rel = os.path.join(caminho_stack, arquivo_stack)
+
+    print(f"Extraindo dependências de: {os.path.normpath(caminho_arquivo_rel)}")
 
-    print(f"Extraindo dependências de: {caminho_arquivo_abs.relative_to(repo_path)}")
+    parser = manifestos.parser_para(arquivo_stack)
+    if parser is None or parser.extrator is None:
+        return [], False
 
     try:
-        if arquivo_stack == "requirements.txt":
-            with open(caminho_arquivo_abs, 'r', encoding='utf-8') as f:
-                linhas = f.readlines()
-                for linha in linhas:
-                    linha = linha.strip()
-                    if linha and not linha.startswith(('#', '-')):
-                        dependencias.append(linha.split('==')[0].split('>=')[0].strip())
-
-        elif arquivo_stack == "package.json":
-            with open(caminho_arquivo_abs, 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-                deps = dados.get("dependencies", {})
-                dev_deps = dados.get("devDependencies", {})
-                dependencias = list(deps.keys()) + list(dev_deps.keys())
-
-        elif arquivo_stack == "pyproject.toml":
-            with open(caminho_arquivo_abs, 'rb') as f:
-                dados = tomli.load(f)
-                deps = dados.get("project", {}).get("dependencies", [])
-                if not deps:
-                    poetry_deps = dados.get("tool", {}).get("poetry", {}).get("dependencies", {})
-                    if isinstance(poetry_deps, dict):
-                        deps = list(poetry_deps.keys())
-                        deps = [d for d in deps if d.lower() != 'python']
-                dependencias = [d.split('==')[0].split('>=')[0].split('<=')[0].strip() for d in deps]
-
-        print(f"Encontradas {len(dependencias)} dependências para {caminho_stack}")
-        return dependencias
-    
+        # Os manifestos são lidos em partes (nunca o arquivo inteiro de uma vez)
+        with _abrir_arquivo(repo_path, caminho_arquivo_rel, indice, binario=True,
+                            limite_bytes=limite_bytes + 1) as f:
+            dependencias, truncado = parser.extrair(f, limite_bytes)
     except Exception as e:
-        print(f"Erro ao ler {caminho_arquivo_abs}: {e}")
-        return []
+        print(f"Erro ao ler {Path(repo_path) / caminho_arquivo_rel}: {e}")
+        return [], False
+
+    if truncado:
+        print(f"Aviso: {caminho_arquivo_rel} passa de {limite_bytes} bytes; lista de dependências truncada.")
+    print(f"Encontradas {len(dependencias)} dependências para {caminho_stack}")
+    return dependencias, truncado
 
-def mapear_estrutura(repo_path: str) -> list[str]:
+def extrair_dependencias(repo_path: str, stack_info: dict, indice: RepoIndex | None = None) -> list:
+    """
+    Extrai a lista de dependências com base na stack_info (que inclui o caminho).
+    Com 'indice', o manifesto é lido por ele (inclusive direto do banco de objetos).
+    """
+    return _extrair_dependencias(repo_path, stack_info, indice)[0]
+
+def mapear_estrutura(repo_path: str, indice: RepoIndex | None = None) -> list[str]:
     """
     Lista os principais arquivos e diretórios na raiz do repositório.
     (Esta função permanece focada na *raiz* para simplicidade)
@@ -166,12 +564,15 @@ def mapear_estrutura(repo_path: str) -> list[str]:
     estrutura = []
     
     try:
-        for item in os.listdir(repo_path):
-            if item in IGNORAR_DIRETORIOS or item.startswith('.'):
+        if indice is None:
+            indice = abrir_indice_sob_demanda(repo_path)
+
+        for entrada in indice.listar("."):
+            item = entrada.nome
+            if item in indice.config.ignorar_diretorios or item.startswith('.'):
                 continue
             
-            caminho_item = os.path.join(repo_path, item)
-            if os.path.isdir(caminho_item):
+            if entrada.e_diretorio:
                 estrutura.append(f"{item}/")
             else:
                 if not item.lower().startswith('readme') and \
@@ -184,7 +585,7 @@ def mapear_estrutura(repo_path: str) -> list[str]:
         print(f"Erro ao mapear estrutura: {e}")
         return []
 
-def ler_codigo_principal(repo_path: str, stack_info: dict) -> dict | None:
+def ler_codigo_principal(repo_path: str, stack_info: dict, indice: RepoIndex | None = None) -> dict | None:
     """
     Procura e lê o conteúdo de arquivos de código-fonte principais
     RELATIVO ao caminho da stack.
@@ -194,27 +595,25 @@ def ler_codigo_principal(repo_path: str, stack_info: dict) -> dict | None:
     
     print(f"Procurando código-fonte principal para {tecnologia} em ./{caminho_stack}...")
     
-    arquivos_alvo = ARQUIVOS_PRINCIPAIS.get(tecnologia, [])
+    parser = manifestos.parser_para(stack_info['arquivo'])
+    arquivos_alvo = parser.arquivos_principais if parser else []
     if not arquivos_alvo:
         print(f"Nenhum arquivo principal definido para a tecnologia: {tecnologia}")
         return None
 
     # Pastas de busca RELATIVAS ao caminho da stack
-    pastas_busca_relativas = ["", "src", "app", "lib", "cmd"]
-    
-    # Caminho absoluto da stack (ex: /caminho/clone/backend)
-    caminho_stack_abs = Path(repo_path) / caminho_stack
+    pastas_busca_relativas = PASTAS_BUSCA_CODIGO + parser.pastas_busca
     
+    if indice is None:
+        indice = abrir_indice_sob_demanda(repo_path)
+
     # Adiciona subpastas dinâmicas (ex: backend/app)
-    try:
-        for item in os.listdir(caminho_stack_abs):
-            caminho_item_abs = caminho_stack_abs / item
-            if os.path.isdir(caminho_item_abs) and \
-               item not in IGNORAR_DIRETORIOS and \
-               not item.startswith('.'):
-                pastas_busca_relativas.append(item)
-    except Exception:
-        pass 
+    for entrada in indice.listar(caminho_stack):
+        item = entrada.nome
+        if entrada.e_diretorio and \
+           item not in indice.config.ignorar_diretorios and \
+           not item.startswith('.'):
+            pastas_busca_relativas.append(item)
     
     pastas_busca_relativas = list(dict.fromkeys(pastas_busca_relativas)) 
     
@@ -225,12 +624,12 @@ def ler_codigo_principal(repo_path: str, stack_info: dict) -> dict | None:
             # Caminho absoluto (ex: /caminho/clone/backend/app/main.py)
             caminho_abs = Path(repo_path) / caminho_relativo_ao_repo
 
-            if os.path.exists(caminho_abs):
+            if indice.e_arquivo(str(caminho_relativo_ao_repo)):
                 print(f"Lendo código principal de: {caminho_relativo_ao_repo}")
                 try:
-                    with open(caminho_abs, 'r', encoding='utf-8') as f:
-                        conteudo = f.read(4000)
-                        if len(conteudo) == 4000:
+                    with indice.abrir(str(caminho_relativo_ao_repo), limite_bytes=MAX_BYTES_CODIGO) as f:
+                        conteudo = f.read(MAX_CARACTERES_CODIGO)
+                        if len(conteudo) == MAX_CARACTERES_CODIGO:
                             conteudo += "\n\n... (arquivo truncado para análise)"
                         
                         return {
@@ -241,4 +640,318 @@ def ler_codigo_principal(repo_path: str, stack_info: dict) -> dict | None:
                     print(f"Erro ao ler {caminho_abs}: {e}")
 
     print(f"Nenhum arquivo de código principal foi encontrado para {tecnologia} em ./{caminho_stack}")
-    return None
\ No newline at end of file
+    return None
+
+def _analisar_stack(repo_path: str, stack_info: dict, indice: RepoIndex) -> dict:
+    """
+    Monta o contexto completo de uma única stack (dependências + código principal).
+    """
+    with telemetria.span("analise.stack", caminho=stack_info["caminho"],
+                         tecnologia=stack_info["tecnologia"]) as s:
+        deps, truncadas = _extrair_dependencias(repo_path, stack_info, indice)
+        codigo = ler_codigo_principal(repo_path, stack_info, indice)
+        s.definir(dependencias=len(deps), dependencias_truncadas=truncadas,
+                  caracteres_codigo=len(codigo["conteudo"]) if codigo else 0)
+    resultado = {**stack_info, "dependencias": deps, "codigo_principal": codigo}
+    if truncadas:
+        resultado["dependencias_truncadas"] = True
+    return resultado
+
+def analisar_stacks(repo_path: str, stacks: list[dict], indice: RepoIndex | None = None,
+                    max_workers: int = MAX_WORKERS_STACKS) -> list[dict]:
+    """
+    Extrai dependências e código principal de todas as stacks em paralelo,
+    num pool de threads limitado a 'max_workers'.
+    Os resultados voltam na MESMA ordem de 'stacks'. Se uma stack falhar,
+    ela volta vazia e com a chave 'erro', sem derrubar as demais.
+    """
+    if not stacks:
+        return []
+    if indice is None:
+        indice = abrir_indice_sob_demanda(repo_path)
+
+    resultados = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(stacks)))) as executor:
+        # Cada tarefa leva uma cópia do contexto para herdar o span atual (telemetria)
+        futuros = [
+            executor.submit(telemetria.no_contexto_atual(_analisar_stack), repo_path, stack_info, indice)
+            for stack_info in stacks
+        ]
+
+        for stack_info, futuro in zip(stacks, futuros):
+            try:
+                resultados.append(futuro.result())
+            except Exception as e:
+                print(f"Erro ao analisar a stack em ./{stack_info['caminho']}: {e}")
+                resultados.append({
+                    **stack_info, "dependencias": [], "codigo_principal": None, "erro": str(e)
+                })
+
+    return resultados
+
+def obter_commit(repo_path: str) -> str | None:
+    """Retorna o sha do commit do HEAD, ou None se não for um repositório."""
+    try:
+        from git import Repo
+        return Repo(repo_path).git.rev_parse("HEAD")
+    except Exception:
+        return None
+
+def arquivos_alterados(repo_path: str, commit_anterior: str, commit_atual: str = "HEAD") -> list[str] | None:
+    """
+    Lista os arquivos (relativos ao repositório) que mudaram entre dois commits.
+    Num clone raso o commit anterior não está no disco: ele é buscado sozinho
+    (só commit e árvores). Retorna None se não for possível comparar.
+    """
+    from git import Repo, GitCommandError
+    repo = Repo(repo_path)
+    try:
+        repo.git.cat_file("-e", f"{commit_anterior}^{{commit}}")
+    except GitCommandError:
+        try:
+            repo.git.fetch("--depth=1", "--filter=blob:none", "--no-tags", "--no-write-fetch-head",
+                           "origin", commit_anterior)
+        except GitCommandError as e:
+            print(f"Commit anterior {commit_anterior[:12]} indisponível: {e.stderr.strip()}")
+            return None
+    try:
+        # Só compara árvores: não precisa de nenhum blob (nem detecção de renomeação)
+        saida = repo.git.diff_tree("-r", "--no-renames", "--name-only", "-z", commit_anterior, commit_atual)
+    except GitCommandError as e:
+        print(f"Não foi possível comparar os commits: {e.stderr.strip()}")
+        return None
+    return [os.path.normpath(caminho) for caminho in saida.split("\0") if caminho]
+
+def _afeta_stack(stack_info: dict, caminho_alterado: str) -> bool:
+    """
+    Indica se um arquivo alterado pode mudar a análise de uma stack: o próprio
+    manifesto, ou um candidato a código principal numa das pastas onde
+    ler_codigo_principal procura (a da stack, uma subpasta direta ou as
+    pastas próprias do formato).
+    """
+    caminho_stack = stack_info["caminho"]
+    if caminho_stack != ".":
+        prefixo = caminho_stack + os.sep
+        if not caminho_alterado.startswith(prefixo):
+            return False
+        caminho_alterado = caminho_alterado[len(prefixo):]
+    pasta, nome = os.path.split(caminho_alterado)
+    if not pasta and nome == stack_info["arquivo"]:
+        return True
+    parser = manifestos.parser_para(stack_info["arquivo"])
+    if parser is None or nome not in parser.arquivos_principais:
+        return False
+    return pasta.count(os.sep) == 0 or pasta in {os.path.normpath(p) for p in parser.pastas_busca}
+
+def resumir_mudancas(contexto_anterior: dict, contexto: dict) -> dict:
+    """
+    Compara duas análises do mesmo repositório: stacks adicionadas/removidas,
+    dependências que entraram/saíram, código principal e estrutura da raiz.
+    'relevante' é False quando nada do que vai para o README mudou.
+    """
+    def chave(stack):
+        return stack["caminho"], stack["tecnologia"]
+
+    anteriores = {chave(stack): stack for stack in contexto_anterior.get("stacks", [])}
+    atuais = {chave(stack): stack for stack in contexto.get("stacks", [])}
+
+    dependencias, codigo_alterado = {}, []
+    for k in anteriores.keys() & atuais.keys():
+        deps_antes, deps_agora = anteriores[k]["dependencias"], atuais[k]["dependencias"]
+        adicionadas = [d for d in deps_agora if d not in deps_antes]
+        removidas = [d for d in deps_antes if d not in deps_agora]
+        if adicionadas or removidas:
+            dependencias[k[0]] = {"adicionadas": adicionadas, "removidas": removidas}
+        if anteriores[k]["codigo_principal"] != atuais[k]["codigo_principal"]:
+            codigo_alterado.append(k[0])
+
+    raiz_antes = contexto_anterior.get("estrutura_arquivos_raiz", [])
+    raiz_agora = contexto.get("estrutura_arquivos_raiz", [])
+    mudancas = {
+        "commit_anterior": contexto_anterior.get("commit"),
+        "commit": contexto.get("commit"),
+        "stacks_adicionadas": [{"caminho": c, "tecnologia": t} for c, t in atuais.keys() - anteriores.keys()],
+        "stacks_removidas": [{"caminho": c, "tecnologia": t} for c, t in anteriores.keys() - atuais.keys()],
+        "dependencias": dependencias,
+        "codigo_alterado": sorted(codigo_alterado),
+        "estrutura_raiz": {
+            "adicionados": [item for item in raiz_agora if item not in raiz_antes],
+            "removidos": [item for item in raiz_antes if item not in raiz_agora],
+        },
+    }
+    mudancas["relevante"] = bool(
+        mudancas["stacks_adicionadas"] or mudancas["stacks_removidas"] or dependencias
+        or codigo_alterado or mudancas["estrutura_raiz"]["adicionados"] or mudancas["estrutura_raiz"]["removidos"]
+    )
+    return mudancas
+
+def reanalisar(repo_path: str, repo_url: str, contexto_anterior: dict, indice: RepoIndex,
+               max_workers: int = MAX_WORKERS_STACKS) -> dict | None:
+    """
+    Reanálise incremental: compara o commit da análise anterior com o HEAD e
+    refaz só o que foi tocado. As stacks são redetectadas apenas nas pastas com
+    arquivos alterados, e só as stacks com manifesto ou código principal
+    possivelmente alterados são analisadas de novo; as demais são reaproveitadas.
+    'contexto_anterior' deve ter sido gerado com a mesma ConfigVarredura.
+
+    Retorna None quando a reanálise não é segura (commit anterior indisponível,
+    .gitignore alterado, varredura truncada, análise anterior parcial ou limite
+    de stacks atingido); nesse caso faça a análise completa.
+    """
+    commit_anterior = contexto_anterior.get("commit")
+    if not commit_anterior or indice.truncado or contexto_anterior.get("varredura", {}).get("truncado"):
+        return None
+    if contexto_anterior.get("parcial"):
+        # Stacks descartadas antes nunca seriam reconsideradas pelas pastas tocadas
+        print("A análise anterior foi parcial: refazendo a análise completa.")
+        return None
+    alterados = arquivos_alterados(repo_path, commit_anterior)
+    if alterados is None:
+        return None
+    if any(os.path.basename(caminho) == ignorados.NOME_GITIGNORE for caminho in alterados):
+        print("Um .gitignore mudou: a poda da varredura pode ser outra, refazendo a análise completa.")
+        return None
+
+    print(f"Reanálise incremental: {len(alterados)} arquivos alterados desde {commit_anterior[:12]}.")
+    pastas_tocadas = {os.path.dirname(caminho) or "." for caminho in alterados}
+    stacks_anteriores = {stack["caminho"]: stack for stack in contexto_anterior["stacks"]}
+
+    with telemetria.span("analise.deteccao", incremental=True) as s_deteccao:
+        stacks_encontradas = []
+        for caminho_str in indice.diretorios:
+            if caminho_str in pastas_tocadas:
+                stack_info = _stack_na_pasta(indice, caminho_str)
+            else:
+                anterior = stacks_anteriores.get(caminho_str)
+                stack_info = {k: anterior[k] for k in ("tecnologia", "arquivo", "caminho")} if anterior else None
+            if stack_info:
+                stacks_encontradas.append(stack_info)
+        stacks_encontradas, stacks_descartadas = _limitar_stacks(stacks_encontradas, indice.config)
+        s_deteccao.definir(stacks=len(stacks_encontradas), pastas_tocadas=len(pastas_tocadas),
+                           stacks_descartadas=stacks_descartadas)
+    if stacks_descartadas:
+        print("Limite de stacks atingido: refazendo a análise completa.")
+        return None
+
+    reaproveitadas, pendentes = {}, []
+    for stack_info in stacks_encontradas:
+        anterior = stacks_anteriores.get(stack_info["caminho"])
+        if anterior is not None and not anterior.get("erro") and \
+           anterior["tecnologia"] == stack_info["tecnologia"] and anterior["arquivo"] == stack_info["arquivo"] and \
+           not any(_afeta_stack(stack_info, caminho) for caminho in alterados):
+            reaproveitadas[stack_info["caminho"]] = anterior
+        else:
+            pendentes.append(stack_info)
+
+    print(f"Stacks reaproveitadas: {len(reaproveitadas)}; reanalisadas: {len(pendentes)}.")
+    analisadas = {stack["caminho"]: stack for stack in analisar_stacks(repo_path, pendentes, indice, max_workers)}
+    contexto = {
+        "url_repo": repo_url,
+        "estrutura_arquivos_raiz": mapear_estrutura(repo_path, indice),
+        "stacks": [reaproveitadas.get(stack["caminho"]) or analisadas[stack["caminho"]]
+                   for stack in stacks_encontradas],
+        "varredura": indice.estatisticas(),
+        "incremental": {
+            "arquivos_alterados": len(alterados),
+            "stacks_reanalisadas": [stack["caminho"] for stack in pendentes],
+            "stacks_reaproveitadas": list(reaproveitadas),
+        },
+    }
+    parcial = _resumir_parcial(contexto, stacks_descartadas)
+    if parcial:
+        contexto["parcial"] = parcial
+    return contexto
+
+def montar_contexto(repo_path: str, repo_url: str, indice: RepoIndex | None = None,
+                    max_workers: int = MAX_WORKERS_STACKS,
+                    hash_arvore: str | None = None, usar_cache: bool = True,
+                    config: ConfigVarredura | None = None,
+                    contexto_anterior: dict | None = None) -> dict:
+    """
+    Ponto de entrada da fase de coleta: indexa o repositório uma vez,
+    detecta as stacks, mapeia a raiz e analisa as stacks em paralelo.
+    Retorna o 'contexto_para_ia' usado pelo generator.
+
+    Se 'hash_arvore' (hash da árvore do HEAD) for informado, o resultado é
+    guardado em cache por (hash_arvore, VERSAO_ANALISADOR); um acerto pula
+    a varredura e o parsing por completo. 'config' controla o que a
+    varredura poda (.gitignore, globs, profundidade e total de itens) e quantas
+    stacks são analisadas; se um limite cortar a análise, o contexto ganha a
+    chave 'parcial' (ver _resumir_parcial).
+
+    A entrada por árvore não guarda o commit (a mesma árvore pode vir de
+    outro commit ou de um fork); num acerto, o contexto recebe o commit do clone.
+    A última análise de cada URL (normalizada) fica guardada com o seu commit. Quando
+    o repositório muda, ela (ou 'contexto_anterior', se informado) é a base de
+    uma reanálise incremental (ver reanalisar) e o contexto ganha a chave
+    'mudancas' com o resumo do que mudou (ver resumir_mudancas).
+    """
+    if config is None:
+        config = indice.config if indice is not None else ConfigVarredura()
+    with telemetria.span("analise") as s:
+        chave = chave_ultima = None
+        if hash_arvore and usar_cache:
+            chave = cache.gerar_chave(hash_arvore, VERSAO_ANALISADOR, config.chave())
+            contexto_em_cache = _cache_analise.obter(chave)
+            if contexto_em_cache is not None:
+                print(f"Análise encontrada em cache (árvore {hash_arvore[:12]}).")
+                s.definir(cache="acerto", stacks=len(contexto_em_cache["stacks"]))
+                # A mesma árvore pode vir de outro commit (revert, fork): o commit é sempre o deste clone
+                contexto = {"url_repo": repo_url, **contexto_em_cache}
+                commit = obter_commit(repo_path)
+                if commit:
+                    contexto["commit"] = commit
+                return contexto
+            import cloner  # Import local: o cloner importa o analyzer
+            chave_ultima = cache.gerar_chave(cloner.normalizar_url(repo_url), VERSAO_ANALISADOR, config.chave())
+            if contexto_anterior is None:
+                contexto_anterior = _cache_ultima_analise.obter(chave_ultima)
+        s.definir(cache="falha" if chave else "desativado")
+
+        if indice is None:
+            indice = abrir_indice(repo_path, config)
+
+        commit = obter_commit(repo_path) if hash_arvore or contexto_anterior else None
+        if contexto_anterior is not None and contexto_anterior.get("commit") == commit:
+            contexto_anterior = None  # Mesmo commit: nada a comparar
+
+        contexto = None
+        if contexto_anterior is not None:
+            contexto = reanalisar(repo_path, repo_url, contexto_anterior, indice, max_workers)
+        s.definir(incremental=contexto is not None)
+
+        if contexto is None:
+            with telemetria.span("analise.deteccao") as s_deteccao:
+                stacks_encontradas, stacks_descartadas = _limitar_stacks(
+                    identificar_todas_stacks(repo_path, indice), config
+                )
+                s_deteccao.definir(stacks=len(stacks_encontradas), stacks_descartadas=stacks_descartadas)
+
+            contexto = {
+                "url_repo": repo_url,
+                "estrutura_arquivos_raiz": mapear_estrutura(repo_path, indice),
+                "stacks": analisar_stacks(repo_path, stacks_encontradas, indice, max_workers),
+                "varredura": indice.estatisticas(),
+            }
+            parcial = _resumir_parcial(contexto, stacks_descartadas)
+            if parcial:
+                contexto["parcial"] = parcial
+        if hash_arvore:
+            contexto["hash_arvore"] = hash_arvore
+        if commit:
+            contexto["commit"] = commit
+        if contexto_anterior is not None:
+            contexto["mudancas"] = resumir_mudancas(contexto_anterior, contexto)
+        s.definir(stacks=len(contexto["stacks"]), itens_raiz=len(contexto["estrutura_arquivos_raiz"]),
+                  parcial=bool(contexto.get("parcial")))
+
+        # Falhas podem ser transitórias: só guarda análises completas.
+        # O resumo de mudanças e os dados da reanálise valem só para esta execução.
+        if chave and not any(stack.get("erro") for stack in contexto["stacks"]):
+            guardado = {k: v for k, v in contexto.items()
+                        if k not in ("url_repo", "mudancas", "incremental", "commit")}
+            _cache_analise.gravar(chave, guardado)
+            if commit:
+                _cache_ultima_analise.gravar(chave_ultima, {**guardado, "commit": commit})
+
+        return contexto
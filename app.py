@@ -1,8 +1,6 @@
 import streamlit as st
 import cloner
-import analyzer
-import generator
-import time
+import jobs
 from pathlib import Path
 
 # --- 1. Configuração da Página ---
@@ -20,6 +18,19 @@ repo_url_input = st.text_input(
     "URL do Repositório GitHub",
     placeholder="Ex: github.com/mauricegss/travel-booking-app" 
 )
+with st.expander("Opções avançadas"):
+    clone_parcial = st.checkbox(
+        "Clone rápido (baixa apenas o último commit e os arquivos analisados)",
+        value=True
+    )
+    usar_espelho = st.checkbox(
+        "Reutilizar cache local do repositório (atualiza com fetch incremental)",
+        value=True
+    )
+    ignorar_cache = st.checkbox(
+        "Ignorar cache (refaz a análise e pede um novo README à IA)",
+        value=False
+    )
 gerar_btn = st.button("Gerar README")
 
 # Inicializa os estados da sessão
@@ -27,13 +38,21 @@ if "readme_gerado" not in st.session_state:
     st.session_state.readme_gerado = ""
 if "editor_content" not in st.session_state:
     st.session_state.editor_content = ""
+if "tempos_fases" not in st.session_state:
+    st.session_state.tempos_fases = []
+if "job_id" not in st.session_state:
+    st.session_state.job_id = None
 
 # --- 3. Lógica Principal (Quando o botão é clicado) ---
+# O trabalho pesado roda no pool de jobs (compartilhado por todas as sessões);
+# esta sessão só guarda o id do job e acompanha o progresso.
 if gerar_btn:
     
     # Limpa o editor antigo antes de gerar
+    st.session_state.erro_job = None
     st.session_state.editor_content = ""
     st.session_state.readme_gerado = ""
+    st.session_state.tempos_fases = []
     
     repo_url = repo_url_input.strip()
     if not repo_url:
@@ -48,61 +67,89 @@ if gerar_btn:
         st.stop()
 
     try:
-        with st.spinner("Analisando repositório (modo multi-stack)..."):
-            
-            # --- FASE 1: COLETA (Multi-Stack) ---
-            caminho_local = cloner.clonar_repositorio(repo_url)
-            if not caminho_local:
-                st.error("Falha ao clonar o repositório. Verifique a URL.")
-                st.stop() 
-
-            stacks_encontradas = analyzer.identificar_todas_stacks(caminho_local)
-            
-            if not stacks_encontradas:
-                st.error("Nenhuma stack de tecnologia conhecida foi encontrada.")
-                st.stop()
-
-            contexto_para_ia = {
-                "url_repo": repo_url,
-                "estrutura_arquivos_raiz": analyzer.mapear_estrutura(caminho_local),
-                "stacks": [] 
-            }
-
-            st.write(f"Encontradas {len(stacks_encontradas)} stacks:")
-            
-            for stack_info in stacks_encontradas:
-                stack_caminho = stack_info['caminho']
-                st.write(f"- **{stack_info['tecnologia']}** em `./{stack_caminho}`")
-                
-                deps = analyzer.extrair_dependencias(caminho_local, stack_info)
-                codigo = analyzer.ler_codigo_principal(caminho_local, stack_info)
-                
-                stack_contexto_completo = {**stack_info, "dependencias": deps, "codigo_principal": codigo}
-                contexto_para_ia["stacks"].append(stack_contexto_completo)
-            
-            st.success("Análise multi-stack concluída!")
-
-        # --- FASE 2: GERAÇÃO ---
-        with st.spinner("IA está escrevendo o README (modo multi-stack)..."):
-            time.sleep(2)
-            readme_texto = generator.gerar_readme(contexto_para_ia)
-            
-            # ATUALIZA OS DOIS ESTADOS: O original e o de edição
-            st.session_state.readme_gerado = readme_texto
-            st.session_state.editor_content = readme_texto
-            
-            st.success("README gerado!")
-            st.balloons() 
-
-    except Exception as e:
-        st.error(f"Ocorreu um erro inesperado: {e}")
-        import traceback
-        traceback.print_exc()
+        st.session_state.job_id = jobs.obter_gerenciador().submeter(
+            repo_url,
+            modo_clone=cloner.MODO_PARCIAL if clone_parcial else cloner.MODO_COMPLETO,
+            usar_espelho=usar_espelho,
+            usar_cache=not ignorar_cache,
+        )
+    except jobs.FilaCheia:
+        st.error("O servidor está ocupado com muitos repositórios. Tente novamente em instantes.")
+        st.stop()
+
+ICONES_STATUS = {jobs.NA_FILA: "⏳", jobs.EXECUTANDO: "🔄", jobs.OK: "✅", jobs.ERRO: "❌"}
+NOMES_FASES = {"clone": "Clone", "analise": "Análise multi-stack", "geracao": "Geração do README"}
+
+
+@st.fragment(run_every=1.0)
+def acompanhar_job():
+    """Reexecutado a cada segundo (só este trecho da página) enquanto o job roda."""
+    job = jobs.obter_gerenciador().obter(st.session_state.job_id)
+    if job is None:
+        st.session_state.job_id = None
+        st.rerun()
+    estado = job.instantaneo()
+
+    if estado["status"] == jobs.NA_FILA:
+        st.info("Na fila: aguardando um worker livre...")
+    for fase in jobs.FASES:
+        info = estado["fases"][fase]
+        duracao = f" ({info['duracao_s']}s)" if info["duracao_s"] is not None else ""
+        st.write(f"{ICONES_STATUS[info['status']]} {NOMES_FASES[fase]}{duracao}")
+
+    if estado["stacks"]:
+        st.write(f"Encontradas {len(estado['stacks'])} stacks:")
+        for stack in estado["stacks"]:
+            st.write(f"- **{stack['tecnologia']}** em `./{stack['caminho']}`")
+            if stack.get("erro"):
+                st.warning(f"Falha ao analisar `./{stack['caminho']}`: {stack['erro']}")
+    if estado["parcial"]:
+        st.warning("Repositório grande: a análise foi parcial "
+                   f"(limites atingidos: {', '.join(estado['parcial']['motivos'])}).")
+
+    if estado["status"] == jobs.ERRO:
+        st.session_state.erro_job = estado["erro"]
+        st.session_state.job_id = None
+        st.rerun()
+    elif estado["status"] == jobs.OK:
+        # ATUALIZA OS DOIS ESTADOS: O original e o de edição
+        st.session_state.readme_gerado = estado["readme"]
+        st.session_state.editor_content = estado["readme"]
+        st.session_state.tempos_fases = estado["tempos_fases"]
+        st.session_state.job_id = None
+        st.session_state.baloes = True
+        st.rerun()  # Sai do fragmento e mostra o editor
+    elif estado["readme"]:
+        # Mostra o README à medida que a IA responde
+        st.markdown(estado["readme"])
+
+
+if st.session_state.job_id:
+    acompanhar_job()
+
+if st.session_state.get("erro_job"):
+    st.error(st.session_state.pop("erro_job"))
+
+if st.session_state.pop("baloes", False):
+    st.success("README gerado!")
+    st.balloons()
 
 # --- 4. Exibição dos Resultados (Versão Simples) ---
 if st.session_state.editor_content:
     
     st.divider()
+
+    if st.session_state.tempos_fases:
+        with st.expander("⏱️ Tempos por fase"):
+            st.table([
+                {
+                    "Fase": linha["fase"],
+                    "Duração (s)": linha["duracao_s"],
+                    "Vezes": linha["vezes"],
+                    "Detalhes": ", ".join(f"{k}={v}" for k, v in linha["atributos"].items()),
+                }
+                for linha in st.session_state.tempos_fases
+            ])
     
     col_esquerda, col_direita = st.columns(2)
     
@@ -0,0 +1,451 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+import tracemalloc
+import contextlib
+from git import Repo
+import cloner
+import analyzer
+import generator
+import cliente_ia
+
+# Onde os repositórios sintéticos ficam (são reaproveitados entre execuções)
+PASTA_FIXTURES = os.getenv(
+    "README_AI_PASTA_FIXTURES",
+    os.path.join(tempfile.gettempdir(), "readme-ai-benchmark")
+)
+ARQUIVO_BASELINE = "benchmark_baseline.json"
+VERSAO_FIXTURES = 1
+
+REPETICOES = 3
+# Uma medida só é regressão se piorar mais que a tolerância E mais que o mínimo absoluto
+# (medidas de poucos milissegundos variam demais de uma execução para outra)
+TOLERANCIA_REGRESSAO = 0.25
+MIN_DIFERENCA_S = 0.005
+MIN_DIFERENCA_KB = 256
+# Sem os limites para repositórios grandes: as fixtures são medidas por inteiro
+# (com --escala, o monorepo passa de analyzer.VARREDURA_MAX_STACKS)
+CONFIG_SEM_LIMITES = analyzer.ConfigVarredura(max_entradas=None, max_stacks=None)
+
+# Pasta do projeto: os cenários de importação rodam nela, num interpretador novo
+PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+# Módulos pesados acompanhados nos cenários de importação
+MODULOS_PESADOS = ("google.generativeai", "git", "dotenv", "tomli")
+
+
+class _ModeloFalso:
+    """Stub do modelo de IA: responde na hora, sem rede, em alguns pedaços."""
+
+    model_name = "benchmark-stub"
+
+    class _Chunk:
+        def __init__(self, texto):
+            self.text = texto
+
+    def generate_content(self, prompt, stream=False):
+        partes = ["```markdown\n# Projeto\n\n", "Descrição gerada pelo stub.\n" * 20, "```"]
+        return [self._Chunk(p) for p in partes]
+
+
+def _cliente_sem_limite() -> cliente_ia.ClienteModelo:
+    """Cliente com o stub e sem limite de taxa (o map-reduce faz uma chamada por stack)."""
+    return cliente_ia.ClienteModelo(modelo=_ModeloFalso(), requisicoes_por_minuto=60_000_000, rajada=1_000_000)
+
+
+# --- Fixtures: repositórios git sintéticos ---
+
+def _escrever(caminho: str, conteudo: str) -> None:
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(conteudo)
+
+
+def _package_json(nome: str, n_deps: int) -> str:
+    deps = {f"dep-{nome}-{i}": f"^{i}.0.0" for i in range(n_deps)}
+    dev = {f"dev-{nome}-{i}": "^1.0.0" for i in range(n_deps // 2)}
+    return json.dumps({"name": nome, "version": "1.0.0", "dependencies": deps, "devDependencies": dev}, indent=2)
+
+
+def _pyproject(nome: str, n_deps: int) -> str:
+    deps = ",\n".join(f'    "pacote-{nome}-{i}>={i}.0"' for i in range(n_deps))
+    return f'[project]\nname = "{nome}"\nversion = "0.1.0"\ndependencies = [\n{deps}\n]\n'
+
+
+def _codigo_python(n_funcoes: int) -> str:
+    linhas = ['"""Módulo gerado para o benchmark."""', "import os", "import sys", ""]
+    for i in range(n_funcoes):
+        linhas += [f"def funcao_{i}(x):", f'    """Faz a etapa {i}."""', f"    return x + {i}", ""]
+    linhas += ['if __name__ == "__main__":', "    print(funcao_0(1))"]
+    return "\n".join(linhas) + "\n"
+
+
+def _codigo_js(n_funcoes: int) -> str:
+    linhas = ["const express = require('express');", "const app = express();", ""]
+    for i in range(n_funcoes):
+        linhas += [f"function rota{i}(req, res) {{", f"  res.send('{i}');", "}", f"app.get('/r{i}', rota{i});", ""]
+    linhas.append("app.listen(3000);")
+    return "\n".join(linhas) + "\n"
+
+
+def _gerar_plano(destino: str, escala: float) -> None:
+    """Muitos arquivos na raiz, uma única stack."""
+    _escrever(os.path.join(destino, "requirements.txt"),
+              "\n".join(f"pacote{i}=={i}.0" for i in range(40)) + "\n")
+    _escrever(os.path.join(destino, "main.py"), _codigo_python(200))
+    for i in range(int(3000 * escala)):
+        _escrever(os.path.join(destino, f"modulo_{i:05d}.py"), f"VALOR = {i}\n")
+
+
+def _gerar_profundo(destino: str, escala: float) -> None:
+    """Uma cadeia longa de pastas aninhadas, com a stack lá no fundo."""
+    caminho = destino
+    for nivel in range(int(60 * escala)):
+        caminho = os.path.join(caminho, f"nivel{nivel}")
+        for i in range(15):
+            _escrever(os.path.join(caminho, f"arquivo_{i}.txt"), f"{nivel}-{i}\n")
+    _escrever(os.path.join(caminho, "package.json"), _package_json("fundo", 30))
+    _escrever(os.path.join(caminho, "index.js"), _codigo_js(50))
+
+
+def _gerar_monorepo(destino: str, escala: float) -> None:
+    """Centenas de stacks (package.json e pyproject.toml) num mesmo repositório."""
+    _escrever(os.path.join(destino, "package.json"), _package_json("raiz", 10))
+    for i in range(int(300 * escala)):
+        pasta = os.path.join(destino, "packages", f"pkg-{i:04d}")
+        if i % 2:
+            _escrever(os.path.join(pasta, "pyproject.toml"), _pyproject(f"py{i}", 8))
+            _escrever(os.path.join(pasta, "src", "main.py"), _codigo_python(20))
+        else:
+            _escrever(os.path.join(pasta, "package.json"), _package_json(f"js{i}", 12))
+            _escrever(os.path.join(pasta, "src", "index.js"), _codigo_js(10))
+        _escrever(os.path.join(pasta, "README.md"), f"# pkg-{i}\n")
+
+
+def _gerar_node_modules(destino: str, escala: float) -> None:
+    """Um projeto pequeno com uma pasta node_modules enorme (deve ser ignorada)."""
+    _escrever(os.path.join(destino, "package.json"), _package_json("app", 25))
+    _escrever(os.path.join(destino, "index.js"), _codigo_js(30))
+    for i in range(int(2000 * escala)):
+        pasta = os.path.join(destino, "node_modules", f"modulo-{i:05d}")
+        _escrever(os.path.join(pasta, "package.json"), _package_json(f"m{i}", 3))
+        _escrever(os.path.join(pasta, "lib", "index.js"), f"module.exports = {i};\n")
+
+
+FIXTURES = {
+    "plano": _gerar_plano,
+    "profundo": _gerar_profundo,
+    "monorepo": _gerar_monorepo,
+    "node_modules": _gerar_node_modules,
+}
+
+
+def preparar_fixture(nome: str, escala: float = 1.0, pasta: str = PASTA_FIXTURES) -> str:
+    """
+    Gera (ou reaproveita) o repositório git sintético 'nome' e retorna o caminho.
+    O conteúdo é determinístico para cada (nome, escala, VERSAO_FIXTURES).
+    """
+    destino = os.path.join(pasta, f"{nome}-x{escala:g}-v{VERSAO_FIXTURES}")
+    marcador = os.path.join(destino, ".git", "readme-ai-fixture-ok")
+    if os.path.exists(marcador):
+        return destino
+
+    if os.path.exists(destino):
+        shutil.rmtree(destino, onerror=cloner.handle_remove_readonly)
+    print(f"Gerando fixture '{nome}' (escala {escala:g})...")
+    os.makedirs(destino)
+    FIXTURES[nome](destino, escala)
+
+    repo = Repo.init(destino)
+    # Permite que os clones 'file://' usem filter=blob:none (clone parcial)
+    repo.git.config("uploadpack.allowFilter", "true")
+    repo.git.add("-A")
+    repo.git(c=["user.name=Benchmark", "user.email=benchmark@localhost"]).commit("-q", "-m", "fixture")
+    open(marcador, "w").close()
+    return destino
+
+
+# --- Medição ---
+
+def medir(funcao, repeticoes: int = REPETICOES) -> dict:
+    """
+    Executa 'funcao' algumas vezes e retorna o menor tempo, a mediana e o
+    pico de memória (tracemalloc, numa execução separada para não distorcer o tempo).
+    """
+    tempos = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+
+        tracemalloc.start()
+        try:
+            funcao()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "tempo_s": round(min(tempos), 6),
+        "mediana_s": round(statistics.median(tempos), 6),
+        "pico_mem_kb": round(pico / 1024, 1),
+    }
+
+
+def _clonar_e_apagar(caminho_repo: str, modo: str) -> None:
+    pasta = tempfile.mkdtemp(prefix="readme-ai-bench-")
+    try:
+        destino = os.path.join(pasta, "repo")
+        if not cloner._clonar_em(f"file://{caminho_repo}", destino, modo, usar_espelho=False):
+            raise RuntimeError(f"Falha ao clonar {caminho_repo}")
+    finally:
+        shutil.rmtree(pasta, onerror=cloner.handle_remove_readonly)
+
+
+def executar_fixture(caminho: str, repeticoes: int = REPETICOES) -> dict:
+    """Mede cada etapa do pipeline sobre um repositório sintético."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        indice = analyzer.RepoIndex(caminho, CONFIG_SEM_LIMITES)
+        stacks = analyzer.identificar_todas_stacks(caminho, indice)
+        contexto = analyzer.montar_contexto(caminho, "file://" + caminho, usar_cache=False,
+                                            config=CONFIG_SEM_LIMITES)
+
+    def todas_dependencias():
+        for stack in stacks:
+            analyzer.extrair_dependencias(caminho, stack)
+
+    def todos_codigos():
+        for stack in stacks:
+            analyzer.ler_codigo_principal(caminho, stack, indice)
+
+    etapas = {
+        "indice": lambda: analyzer.RepoIndex(caminho, CONFIG_SEM_LIMITES),
+        "identificar_todas_stacks": lambda: analyzer.identificar_todas_stacks(
+            caminho, analyzer.RepoIndex(caminho, CONFIG_SEM_LIMITES)
+        ),
+        "mapear_estrutura": lambda: analyzer.mapear_estrutura(
+            caminho, analyzer.RepoIndex(caminho, CONFIG_SEM_LIMITES)
+        ),
+        "extrair_dependencias": todas_dependencias,
+        "ler_codigo_principal": todos_codigos,
+        "montar_contexto": lambda: analyzer.montar_contexto(caminho, "file://" + caminho, usar_cache=False,
+                                                            config=CONFIG_SEM_LIMITES),
+        "clone_completo": lambda: _clonar_e_apagar(caminho, cloner.MODO_COMPLETO),
+        "clone_parcial": lambda: _clonar_e_apagar(caminho, cloner.MODO_PARCIAL),
+        "construir_prompt": lambda: generator._construir_prompt(contexto),
+        "gerar_readme_stub": lambda: generator.gerar_readme(contexto, usar_cache=False, model=_ModeloFalso(),
+                                                            map_reduce=False),
+        "gerar_readme_stub_mr": lambda: generator.gerar_readme(
+            contexto, usar_cache=False, model=_ModeloFalso(), cliente=_cliente_sem_limite(), map_reduce=True
+        ),
+    }
+
+    resultados = {"stacks": len(stacks)}
+    for nome, funcao in etapas.items():
+        # Clones são bem mais lentos; uma repetição a menos já dá uma boa ideia
+        n = max(1, repeticoes - 1) if nome.startswith("clone") else repeticoes
+        resultados[nome] = medir(funcao, n)
+    return resultados
+
+
+# --- Tempo de importação (cold start) ---
+
+# Roda num processo novo: executa o código do cenário medindo o tempo (e, numa
+# segunda execução, o pico de memória) e imprime o resultado em JSON na última linha
+_SCRIPT_IMPORTACAO = """
+import io, sys, json, time, runpy, tracemalloc, contextlib
+codigo, medir_memoria, pesados = sys.argv[1], sys.argv[2] == "1", json.loads(sys.argv[3])
+sys.argv = sys.argv[4:] or ["main.py"]
+if medir_memoria:
+    tracemalloc.start()
+inicio = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+    try:
+        exec(codigo, {"runpy": runpy})
+    except SystemExit:
+        pass
+tempo = time.perf_counter() - inicio
+pico = tracemalloc.get_traced_memory()[1] if medir_memoria else 0
+print(json.dumps({"tempo_s": tempo, "pico": pico, "carregados": [m for m in pesados if m in sys.modules]}))
+"""
+
+_EXECUTAR_MAIN = "runpy.run_path('main.py', run_name='__main__')"
+
+
+def cenarios_importacao(caminho_fixture: str | None = None, pasta_saida: str | None = None) -> dict:
+    """
+    Cenários de cold start: nome -> (código, argv, módulos que NÃO podem ser carregados).
+    O CLI só de análise roda sobre 'caminho_fixture' (se houver) e grava em 'pasta_saida'.
+    """
+    cenarios = {
+        "import_main": ("import main", [], ("google.generativeai", "git", "dotenv")),
+        "import_jobs": ("import jobs", [], ("google.generativeai", "git", "dotenv")),
+        "import_servidor": ("import servidor", [], ("google.generativeai", "git", "dotenv")),
+        "cli_ajuda": (_EXECUTAR_MAIN, ["main.py", "--help"], ("google.generativeai", "git", "dotenv")),
+    }
+    if caminho_fixture:
+        cenarios["cli_so_analise"] = (
+            _EXECUTAR_MAIN,
+            ["main.py", "--so-analise", "--sem-cache", "-o", pasta_saida or tempfile.gettempdir(),
+             f"file://{caminho_fixture}"],
+            ("google.generativeai", "dotenv"),
+        )
+    # Referência: o custo que a geração paga ao carregar o SDK
+    cenarios["sdk_ia"] = ("import google.generativeai", [], ())
+    return cenarios
+
+
+def _executar_cenario(codigo: str, argv: list[str], medir_memoria: bool) -> dict:
+    processo = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_IMPORTACAO, codigo, "1" if medir_memoria else "0",
+         json.dumps(MODULOS_PESADOS), *argv],
+        cwd=PASTA_PROJETO, capture_output=True, text=True,
+    )
+    linhas = processo.stdout.strip().splitlines()
+    if processo.returncode != 0 or not linhas:
+        raise RuntimeError(f"Cenário '{codigo}' falhou: {processo.stderr.strip()[-500:]}")
+    return json.loads(linhas[-1])
+
+
+def executar_importacao(caminho_fixture: str | None = None, repeticoes: int = REPETICOES) -> tuple[dict, list[str]]:
+    """
+    Mede o tempo de importação de cada cenário, sempre num interpretador novo.
+    Retorna (resultados, violações), onde uma violação é um módulo pesado
+    carregado num cenário que não deveria carregá-lo.
+    """
+    resultados = {}
+    violacoes = []
+    pasta_saida = tempfile.mkdtemp(prefix="readme-ai-bench-")
+    try:
+        for nome, (codigo, argv, proibidos) in cenarios_importacao(caminho_fixture, pasta_saida).items():
+            try:
+                execucoes = [_executar_cenario(codigo, argv, False) for _ in range(repeticoes)]
+                memoria = _executar_cenario(codigo, argv, True)
+            except RuntimeError as e:
+                print(f"  {e}")
+                continue
+            tempos = [e["tempo_s"] for e in execucoes]
+            resultados[nome] = {
+                "tempo_s": round(min(tempos), 6),
+                "mediana_s": round(statistics.median(tempos), 6),
+                "pico_mem_kb": round(memoria["pico"] / 1024, 1),
+                "modulos_pesados": memoria["carregados"],
+            }
+            violacoes += [f"{nome} importou '{modulo}'" for modulo in memoria["carregados"] if modulo in proibidos]
+    finally:
+        shutil.rmtree(pasta_saida, ignore_errors=True)
+    return resultados, violacoes
+
+
+# --- Baseline e regressões ---
+
+def comparar(atual: dict, baseline: dict, tolerancia: float = TOLERANCIA_REGRESSAO) -> list[str]:
+    """Retorna uma linha de descrição para cada medida que piorou além da tolerância."""
+    regressoes = []
+    for fixture, etapas in atual.items():
+        for etapa, medida in etapas.items():
+            base = baseline.get(fixture, {}).get(etapa)
+            if not isinstance(medida, dict) or not isinstance(base, dict):
+                continue
+            for campo, minimo in (("tempo_s", MIN_DIFERENCA_S), ("pico_mem_kb", MIN_DIFERENCA_KB)):
+                valor, referencia = medida[campo], base.get(campo)
+                if referencia is None:
+                    continue
+                if valor > referencia * (1 + tolerancia) and valor - referencia > minimo:
+                    variacao = (valor / referencia - 1) * 100 if referencia else float("inf")
+                    regressoes.append(f"{fixture}/{etapa} {campo}: {referencia} -> {valor} (+{variacao:.0f}%)")
+    return regressoes
+
+
+def _imprimir_tabela(resultados: dict, baseline: dict) -> None:
+    for fixture, etapas in resultados.items():
+        print(f"\n{fixture} ({etapas['stacks']} stacks)" if "stacks" in etapas else f"\n{fixture}")
+        print(f"  {'etapa':<26}{'tempo (ms)':>12}{'base (ms)':>12}{'pico (KB)':>12}")
+        for etapa, medida in etapas.items():
+            if not isinstance(medida, dict):
+                continue
+            base = baseline.get(fixture, {}).get(etapa, {})
+            base_ms = f"{base['tempo_s'] * 1000:.1f}" if "tempo_s" in base else "-"
+            print(f"  {etapa:<26}{medida['tempo_s'] * 1000:>12.1f}{base_ms:>12}{medida['pico_mem_kb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="README-AI: benchmark do analyzer, do clone, do prompt e do tempo de importação "
+                    "com repositórios sintéticos (offline)."
+    )
+    parser.add_argument("--fixtures", default=",".join(FIXTURES),
+                        help=f"Fixtures a medir, separadas por vírgula (padrão: {','.join(FIXTURES)}).")
+    parser.add_argument("--escala", type=float, default=1.0, help="Multiplica o tamanho das fixtures.")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES)
+    parser.add_argument("--baseline", default=ARQUIVO_BASELINE, help="Arquivo JSON com a baseline.")
+    parser.add_argument("--salvar-baseline", action="store_true",
+                        help="Grava os resultados desta execução como a nova baseline.")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_REGRESSAO,
+                        help="Piora relativa aceita antes de acusar regressão (padrão: 0.25 = 25%%).")
+    parser.add_argument("--pasta-fixtures", default=PASTA_FIXTURES)
+    parser.add_argument("--saida", help="Grava também os resultados brutos neste arquivo JSON.")
+    parser.add_argument("--sem-importacao", action="store_true",
+                        help="Não mede o tempo de importação (cold start do CLI e do app).")
+    args = parser.parse_args()
+
+    nomes = [n.strip() for n in args.fixtures.split(",") if n.strip()]
+    invalidas = [n for n in nomes if n not in FIXTURES]
+    if invalidas:
+        parser.error(f"Fixtures desconhecidas: {', '.join(invalidas)}. Use: {', '.join(FIXTURES)}.")
+
+    resultados = {}
+    for nome in nomes:
+        caminho = preparar_fixture(nome, args.escala, args.pasta_fixtures)
+        print(f"Medindo '{nome}'...")
+        resultados[nome] = executar_fixture(caminho, args.repeticoes)
+
+    violacoes = []
+    if not args.sem_importacao:
+        print("Medindo o tempo de importação...")
+        caminho = preparar_fixture(nomes[0], args.escala, args.pasta_fixtures) if nomes else None
+        resultados["importacao"], violacoes = executar_importacao(caminho, args.repeticoes)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        if dados.get("escala") == args.escala:
+            baseline = dados.get("resultados", {})
+        else:
+            print(f"Baseline ignorada: gerada com escala {dados.get('escala')}, não {args.escala:g}.")
+
+    _imprimir_tabela(resultados, baseline)
+
+    registro = {"escala": args.escala, "python": sys.version.split()[0], "resultados": resultados}
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(registro, f, indent=2)
+
+    if args.salvar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(registro, f, indent=2)
+        print(f"\nBaseline salva em {args.baseline}.")
+        sys.exit(0)
+
+    if violacoes:
+        print("\nMódulos pesados carregados sem necessidade:")
+        for linha in violacoes:
+            print(f"  - {linha}")
+
+    regressoes = comparar(resultados, baseline, args.tolerancia) if baseline else []
+    if regressoes:
+        print("\nRegressões encontradas:")
+        for linha in regressoes:
+            print(f"  - {linha}")
+        sys.exit(1)
+    if violacoes:
+        sys.exit(1)
+    print("\nNenhuma regressão." if baseline else "\nSem baseline para comparar (use --salvar-baseline).")
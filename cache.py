@@ -0,0 +1,183 @@
+import os
+import json
+import gzip
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+
+# Pasta raiz dos caches em disco (cada cache usa uma subpasta = namespace)
+PASTA_CACHE = os.getenv(
+    "README_AI_PASTA_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "readme-ai", "cache")
+)
+
+EXTENSAO = ".json.gz"
+
+
+def gerar_chave(*partes) -> str:
+    """
+    Gera uma chave estável (sha256) a partir de várias partes.
+    """
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(str(parte).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class CacheDisco:
+    """
+    Cache chave -> valor (JSON comprimido com gzip) persistido em disco.
+    - Cada entrada é um arquivo; a escrita é atômica (arquivo temporário + os.replace),
+      então vários processos podem ler e gravar no mesmo cache.
+    - O mtime de cada arquivo marca o último uso; ao passar do limite de tamanho,
+      as entradas menos usadas (LRU) são removidas.
+    - Com 'ttl_segundos', entradas mais antigas que o TTL (desde a gravação) expiram.
+    - Conta acertos e falhas (hits/misses) desta instância.
+    """
+
+    def __init__(self, namespace: str, max_mb: float = 100, pasta: str = PASTA_CACHE,
+                 ttl_segundos: float | None = None):
+        self.namespace = namespace
+        self.pasta = os.path.join(pasta, namespace)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl_segundos = ttl_segundos
+        self.acertos = 0
+        self.falhas = 0
+        self._lock_contadores = threading.Lock()
+
+    def _contar(self, acerto: bool) -> None:
+        with self._lock_contadores:
+            if acerto:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.pasta, chave + EXTENSAO)
+
+    def obter(self, chave: str):
+        """Retorna o valor guardado ou None se não existir, expirou ou está corrompido."""
+        caminho = self._caminho(chave)
+        try:
+            with gzip.open(caminho, "rt", encoding="utf-8") as f:
+                entrada = json.load(f)
+            criado_em, valor = entrada["criado_em"], entrada["valor"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self._contar(acerto=False)
+            return None
+
+        if self.ttl_segundos is not None and time.time() - criado_em > self.ttl_segundos:
+            self.remover(chave)
+            self._contar(acerto=False)
+            return None
+
+        try:
+            os.utime(caminho)  # Marca o uso para a política LRU
+        except OSError:
+            pass
+        self._contar(acerto=True)
+        return valor
+
+    def gravar(self, chave: str, valor) -> None:
+        os.makedirs(self.pasta, exist_ok=True)
+        caminho = self._caminho(chave)
+        caminho_tmp = f"{caminho}.tmp-{os.getpid()}-{time.monotonic_ns()}"
+        with gzip.open(caminho_tmp, "wt", encoding="utf-8") as f:
+            json.dump({"criado_em": time.time(), "valor": valor}, f,
+                      ensure_ascii=False, separators=(",", ":"))
+        os.replace(caminho_tmp, caminho)
+        self.podar()
+
+    def remover(self, chave: str) -> None:
+        try:
+            os.remove(self._caminho(chave))
+        except OSError:
+            pass
+
+    def _entradas(self) -> list[tuple[float, int, str]]:
+        """Lista (mtime, tamanho, caminho) das entradas, da menos para a mais usada."""
+        entradas = []
+        try:
+            with os.scandir(self.pasta) as it:
+                for item in it:
+                    if item.name.endswith(EXTENSAO):
+                        try:
+                            info = item.stat()
+                        except OSError:
+                            continue
+                        entradas.append((info.st_mtime, info.st_size, item.path))
+        except OSError:
+            pass
+        return sorted(entradas)
+
+    def podar(self, max_bytes: int | None = None) -> int:
+        """
+        Remove as entradas menos usadas até o cache caber em 'max_bytes'.
+        Retorna quantas entradas foram removidas.
+        """
+        limite = self.max_bytes if max_bytes is None else max_bytes
+        entradas = self._entradas()
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        removidas = 0
+        for _, tamanho, caminho in entradas:
+            if total <= limite:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+            removidas += 1
+        return removidas
+
+    def limpar(self) -> None:
+        if os.path.isdir(self.pasta):
+            shutil.rmtree(self.pasta, ignore_errors=True)
+
+    def estatisticas(self) -> dict:
+        entradas = self._entradas()
+        return {
+            "namespace": self.namespace,
+            "pasta": self.pasta,
+            "entradas": len(entradas),
+            "bytes": sum(tamanho for _, tamanho, _ in entradas),
+            "max_bytes": self.max_bytes,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+        }
+
+
+def _namespaces(pasta: str) -> list[str]:
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(n for n in os.listdir(pasta) if os.path.isdir(os.path.join(pasta, n)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="README-AI: inspeciona e poda os caches em disco.")
+    parser.add_argument("comando", choices=["listar", "podar", "limpar"])
+    parser.add_argument("--namespace", help="Aplica apenas a um cache (ex: 'analise').")
+    parser.add_argument("--max-mb", type=float, default=100,
+                        help="Tamanho máximo a manter ao podar (padrão: 100, o limite normal do cache).")
+    parser.add_argument("--pasta", default=PASTA_CACHE, help="Pasta raiz dos caches.")
+    args = parser.parse_args()
+
+    namespaces = [args.namespace] if args.namespace else _namespaces(args.pasta)
+    if not namespaces:
+        print(f"Nenhum cache encontrado em {args.pasta}.")
+
+    for namespace in namespaces:
+        cache = CacheDisco(namespace, pasta=args.pasta)
+        if args.comando == "listar":
+            info = cache.estatisticas()
+            print(f"{namespace}: {info['entradas']} entradas, "
+                  f"{info['bytes'] / 1024:.1f} KB em {info['pasta']}")
+        elif args.comando == "podar":
+            removidas = cache.podar(int(args.max_mb * 1024 * 1024))
+            print(f"{namespace}: {removidas} entradas removidas.")
+        else:
+            cache.limpar()
+            print(f"{namespace}: cache apagado.")
@@ -0,0 +1,329 @@
+import os
+import time
+import random
+import asyncio
+import weakref
+import threading
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Iterator
+
+# Limites padrão de uso da API do Gemini (ajustáveis pelo .env)
+REQUISICOES_POR_MINUTO = float(os.getenv("README_AI_IA_RPM", "10"))
+RAJADA_MAXIMA = int(os.getenv("README_AI_IA_RAJADA", "3"))
+MAX_CHAMADAS_SIMULTANEAS = int(os.getenv("README_AI_IA_MAX_SIMULTANEAS", "4"))
+MAX_TENTATIVAS = int(os.getenv("README_AI_IA_MAX_TENTATIVAS", "5"))
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 30.0
+
+# Códigos HTTP que indicam falha temporária (vale a pena tentar de novo)
+CODIGOS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+# Nomes das exceções equivalentes do google.api_core (sem precisar importá-lo)
+EXCECOES_TRANSITORIAS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "InternalServerError", "DeadlineExceeded", "GatewayTimeout", "Aborted",
+}
+
+
+def e_erro_transitorio(erro: Exception) -> bool:
+    """
+    Indica se o erro é temporário (429, 5xx, timeout, conexão) e pode ser repetido.
+    """
+    if isinstance(erro, (ConnectionError, TimeoutError)):
+        return True
+    codigo = getattr(erro, "code", None)
+    if isinstance(codigo, int) and codigo in CODIGOS_TRANSITORIOS:
+        return True
+    return type(erro).__name__ in EXCECOES_TRANSITORIAS
+
+
+class BaldeTokens:
+    """
+    Limitador de taxa do tipo "token bucket" (thread-safe): permite rajadas
+    de até 'capacidade' chamadas e, depois, 'taxa_por_segundo' chamadas por segundo.
+    """
+
+    def __init__(self, taxa_por_segundo: float, capacidade: int):
+        self.taxa_por_segundo = taxa_por_segundo
+        self.capacidade = max(1, capacidade)
+        self._tokens = float(self.capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tentar_adquirir(self) -> float:
+        """
+        Tenta pegar um token sem bloquear. Retorna 0 se conseguiu ou,
+        caso contrário, quantos segundos esperar antes de tentar de novo.
+        """
+        with self._lock:
+            agora = time.monotonic()
+            self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa_por_segundo)
+            self._ultimo = agora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.taxa_por_segundo
+
+    def adquirir(self) -> float:
+        """Bloqueia até haver um token disponível. Retorna o tempo esperado (s)."""
+        esperado = 0.0
+        while (espera := self.tentar_adquirir()) > 0:
+            time.sleep(espera)
+            esperado += espera
+        return esperado
+
+    async def adquirir_async(self) -> float:
+        """Como adquirir(), mas cede o event loop enquanto espera."""
+        esperado = 0.0
+        while (espera := self.tentar_adquirir()) > 0:
+            await asyncio.sleep(espera)
+            esperado += espera
+        return esperado
+
+
+class ClienteModelo:
+    """
+    Cliente compartilhado do modelo de IA:
+    - configura o modelo uma única vez (via 'fabrica_modelo');
+    - limita a taxa de requisições (BaldeTokens) e as chamadas simultâneas;
+    - repete erros transitórios (429/5xx) com backoff exponencial e jitter;
+    - agrupa prompts idênticos em andamento: só uma requisição por prompt,
+      as demais chamadas esperam e recebem o mesmo texto.
+
+    Para testes, passe 'modelo' (qualquer objeto com generate_content) ou uma
+    'fabrica_modelo' que aponte para um servidor falso.
+    """
+
+    def __init__(self, fabrica_modelo: Callable | None = None, modelo=None,
+                 requisicoes_por_minuto: float = REQUISICOES_POR_MINUTO,
+                 rajada: int = RAJADA_MAXIMA,
+                 max_simultaneas: int = MAX_CHAMADAS_SIMULTANEAS,
+                 max_tentativas: int = MAX_TENTATIVAS,
+                 backoff_base_s: float = BACKOFF_BASE_S,
+                 backoff_max_s: float = BACKOFF_MAX_S):
+        self._fabrica_modelo = fabrica_modelo
+        self._modelo = modelo
+        self._lock_modelo = threading.Lock()
+        self.balde = BaldeTokens(requisicoes_por_minuto / 60, rajada)
+        self._semaforo = threading.BoundedSemaphore(max_simultaneas)
+        self.max_tentativas = max(1, max_tentativas)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._em_andamento: dict[str, Future] = {}
+        self._lock_em_andamento = threading.Lock()
+        self.requisicoes = 0
+        self.retentativas = 0
+        self.agrupadas = 0
+
+    def obter_modelo(self):
+        """Cria o modelo na primeira chamada e o reutiliza nas seguintes."""
+        if self._modelo is None:
+            with self._lock_modelo:
+                if self._modelo is None and self._fabrica_modelo:
+                    self._modelo = self._fabrica_modelo()
+        return self._modelo
+
+    @property
+    def nome_modelo(self) -> str | None:
+        return getattr(self._modelo, "model_name", None)
+
+    def _espera_backoff(self, tentativa: int) -> float:
+        # "Full jitter": espera aleatória entre 0 e o teto exponencial
+        teto = min(self.backoff_max_s, self.backoff_base_s * 2 ** (tentativa - 1))
+        return random.uniform(0, teto)
+
+    def _registrar(self, prompt: str) -> tuple[Future, bool]:
+        """Retorna (futuro, dono). Só o dono faz a requisição; os demais esperam."""
+        with self._lock_em_andamento:
+            futuro = self._em_andamento.get(prompt)
+            if futuro is not None:
+                self.agrupadas += 1
+                return futuro, False
+            futuro = Future()
+            self._em_andamento[prompt] = futuro
+            return futuro, True
+
+    def _concluir(self, prompt: str, futuro: Future, texto: str | None = None,
+                  erro: BaseException | None = None) -> None:
+        with self._lock_em_andamento:
+            self._em_andamento.pop(prompt, None)
+        if erro is None:
+            futuro.set_result(texto)
+        else:
+            if not isinstance(erro, Exception):  # ex: GeneratorExit de um stream abandonado
+                erro = RuntimeError("A geração foi interrompida.")
+            futuro.set_exception(erro)
+
+    def _stream_com_retentativas(self, prompt: str) -> Iterator[str]:
+        for tentativa in range(1, self.max_tentativas + 1):
+            self.balde.adquirir()
+            emitiu = False
+            with self._semaforo:
+                try:
+                    self.requisicoes += 1
+                    for chunk in self.obter_modelo().generate_content(prompt, stream=True):
+                        try:
+                            texto_chunk = chunk.text
+                        except ValueError:
+                            continue  # Pedaço sem texto (ex: apenas o motivo de término)
+                        emitiu = True
+                        yield texto_chunk
+                    return
+                except Exception as e:
+                    # Depois que parte do texto já saiu, repetir duplicaria a resposta
+                    if emitiu or not e_erro_transitorio(e) or tentativa == self.max_tentativas:
+                        raise
+                    espera = self._espera_backoff(tentativa)
+                    print(f"Falha temporária da IA ({e}). Tentativa {tentativa + 1} "
+                          f"de {self.max_tentativas} em {espera:.1f}s...")
+            self.retentativas += 1
+            time.sleep(espera)
+
+    def gerar_stream(self, prompt: str) -> Iterator[str]:
+        """
+        Gera a resposta em pedaços. Se o mesmo prompt já estiver em andamento,
+        espera por ele e devolve o texto completo de uma vez.
+        """
+        futuro, dono = self._registrar(prompt)
+        if not dono:
+            yield futuro.result()
+            return
+
+        partes = []
+        try:
+            for texto_chunk in self._stream_com_retentativas(prompt):
+                partes.append(texto_chunk)
+                yield texto_chunk
+        except BaseException as e:
+            self._concluir(prompt, futuro, erro=e)
+            raise
+        self._concluir(prompt, futuro, texto="".join(partes))
+
+    def gerar(self, prompt: str) -> str:
+        """Gera a resposta completa (com os mesmos limites, retentativas e agrupamento)."""
+        return "".join(self.gerar_stream(prompt))
+
+    def estatisticas(self) -> dict:
+        return {
+            "requisicoes": self.requisicoes,
+            "retentativas": self.retentativas,
+            "agrupadas": self.agrupadas,
+        }
+
+
+class ClienteModeloAsync:
+    """
+    Versão asyncio do ClienteModelo, para backends assíncronos: usa
+    generate_content_async, asyncio.Semaphore e asyncio.sleep, sem ocupar
+    uma thread por requisição. Pode compartilhar o BaldeTokens de um
+    ClienteModelo para que as duas versões respeitem a mesma cota.
+    """
+
+    def __init__(self, fabrica_modelo: Callable | None = None, modelo=None,
+                 balde: BaldeTokens | None = None,
+                 max_simultaneas: int = MAX_CHAMADAS_SIMULTANEAS,
+                 max_tentativas: int = MAX_TENTATIVAS,
+                 backoff_base_s: float = BACKOFF_BASE_S,
+                 backoff_max_s: float = BACKOFF_MAX_S):
+        self._fabrica_modelo = fabrica_modelo
+        self._modelo = modelo
+        self._lock_modelo = threading.Lock()
+        self.balde = balde or BaldeTokens(REQUISICOES_POR_MINUTO / 60, RAJADA_MAXIMA)
+        self.max_simultaneas = max_simultaneas
+        # Semáforos e futures pertencem a um único event loop: um conjunto por loop
+        # (o cliente é compartilhado pelo processo e pode servir vários loops)
+        self._semaforos: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = \
+            weakref.WeakKeyDictionary()
+        self._lock_loops = threading.Lock()
+        self.max_tentativas = max(1, max_tentativas)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._em_andamento: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Future]] = \
+            weakref.WeakKeyDictionary()
+        self.requisicoes = 0
+        self.retentativas = 0
+        self.agrupadas = 0
+
+    def obter_modelo(self):
+        if self._modelo is None:
+            with self._lock_modelo:
+                if self._modelo is None and self._fabrica_modelo:
+                    self._modelo = self._fabrica_modelo()
+        return self._modelo
+
+    def _semaforo(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock_loops:
+            if loop not in self._semaforos:
+                self._semaforos[loop] = asyncio.Semaphore(self.max_simultaneas)
+            return self._semaforos[loop]
+
+    def _em_andamento_no_loop(self) -> dict[str, asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        with self._lock_loops:
+            return self._em_andamento.setdefault(loop, {})
+
+    async def _stream_com_retentativas(self, prompt: str) -> AsyncIterator[str]:
+        for tentativa in range(1, self.max_tentativas + 1):
+            await self.balde.adquirir_async()
+            emitiu = False
+            async with self._semaforo():
+                try:
+                    self.requisicoes += 1
+                    resposta = await self.obter_modelo().generate_content_async(prompt, stream=True)
+                    async for chunk in resposta:
+                        try:
+                            texto_chunk = chunk.text
+                        except ValueError:
+                            continue
+                        emitiu = True
+                        yield texto_chunk
+                    return
+                except Exception as e:
+                    if emitiu or not e_erro_transitorio(e) or tentativa == self.max_tentativas:
+                        raise
+                    espera = min(self.backoff_max_s, self.backoff_base_s * 2 ** (tentativa - 1))
+                    espera = random.uniform(0, espera)
+                    print(f"Falha temporária da IA ({e}). Tentativa {tentativa + 1} "
+                          f"de {self.max_tentativas} em {espera:.1f}s...")
+            self.retentativas += 1
+            await asyncio.sleep(espera)
+
+    async def gerar_stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Gera a resposta em pedaços. Se o mesmo prompt já estiver em andamento
+        (neste event loop), espera por ele e devolve o texto completo de uma vez.
+        """
+        em_andamento = self._em_andamento_no_loop()
+        futuro = em_andamento.get(prompt)
+        if futuro is not None:
+            self.agrupadas += 1
+            yield await asyncio.shield(futuro)
+            return
+
+        futuro = asyncio.get_running_loop().create_future()
+        em_andamento[prompt] = futuro
+        partes = []
+        try:
+            async for texto_chunk in self._stream_com_retentativas(prompt):
+                partes.append(texto_chunk)
+                yield texto_chunk
+        except BaseException as e:
+            if not futuro.done():
+                futuro.set_exception(e if isinstance(e, Exception) else
+                                     RuntimeError("A geração foi interrompida."))
+                futuro.exception()  # Evita aviso de "exception never retrieved"
+            raise
+        else:
+            futuro.set_result("".join(partes))
+        finally:
+            em_andamento.pop(prompt, None)
+
+    async def gerar(self, prompt: str) -> str:
+        return "".join([trecho async for trecho in self.gerar_stream(prompt)])
+
+    def estatisticas(self) -> dict:
+        return {
+            "requisicoes": self.requisicoes,
+            "retentativas": self.retentativas,
+            "agrupadas": self.agrupadas,
+        }
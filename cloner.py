@@ -1,11 +1,73 @@
 import os
+import re
+import json
+import time
+import hashlib
+import posixpath
 import shutil
+import tempfile
+import threading
+import subprocess
 import stat  # Precisamos desta nova importação
-from git import Repo
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+import analyzer
+import ignorados
+import manifestos
+import telemetria
+
+# GitPython é importado dentro das funções que clonam: o import custa dezenas de
+# milissegundos (e roda 'git version'), o que pesa no '--help' e no app
+if TYPE_CHECKING:
+    from git import Repo
 
 # Diretório local para onde os repositórios serão clonados
 PASTA_CLONE = "cloned_repo"
 
+# Modos de clone suportados
+# - completo: histórico inteiro e todos os blobs (comportamento original)
+# - parcial: depth=1 + filter=blob:none + sparse checkout, baixando apenas
+#   os blobs que o analyzer realmente lê
+# - arvore: clone bare (depth=1 + filter=blob:none), sem checkout; o analyzer
+#   lê a árvore e os blobs direto do banco de objetos (analyzer.RepoIndexArvore)
+MODO_COMPLETO = "completo"
+MODO_PARCIAL = "parcial"
+MODO_ARVORE = "arvore"
+MODOS_CLONE = (MODO_COMPLETO, MODO_PARCIAL, MODO_ARVORE)
+
+# Máximo de objetos pedidos por comando 'git fetch' na busca em lote de blobs
+MAX_OBJETOS_POR_FETCH = 500
+
+# Pasta base dos workspaces temporários de cada job (None = temp do sistema)
+PASTA_TRABALHO = os.getenv("README_AI_PASTA_TRABALHO") or None
+
+# Pasta onde ficam os espelhos (clones bare) reaproveitados entre execuções
+PASTA_ESPELHOS = os.getenv(
+    "README_AI_PASTA_ESPELHOS",
+    os.path.join(os.path.expanduser("~"), ".cache", "readme-ai", "espelhos")
+)
+# Orçamento de disco dos espelhos; ao estourar, os menos usados (LRU) são removidos
+ORCAMENTO_ESPELHOS_MB = int(os.getenv("README_AI_ESPELHOS_MAX_MB", "2048"))
+# Metadados de uso gravados dentro de cada espelho
+ARQUIVO_USO_ESPELHO = "readme-ai-uso.json"
+
+# Limites de cada clone (0 desativa). Um clone completo ou parcial que passar
+# de bytes/objetos é refeito no modo árvore; o prazo vale para todas as tentativas.
+CLONE_MAX_MB = float(os.getenv("README_AI_CLONE_MAX_MB", "1024"))
+CLONE_MAX_OBJETOS = int(os.getenv("README_AI_CLONE_MAX_OBJETOS", "0"))
+CLONE_TIMEOUT_S = float(os.getenv("README_AI_CLONE_TIMEOUT_S", "300"))
+# De quanto em quanto tempo o tamanho da pasta do clone é medido
+INTERVALO_MEDICAO_CLONE_S = 1.0
+# Prazo do 'git ls-remote' que consulta o commit do HEAD sem clonar
+TIMEOUT_LS_REMOTE_S = float(os.getenv("README_AI_LS_REMOTE_TIMEOUT_S", "30"))
+
+# Progresso do git (stderr): 'Receiving objects:  45% (450/1000), 1.20 MiB | ...'
+_RE_PROGRESSO = re.compile(
+    r"(?:remote: )?(?:Enumerating|Counting|Receiving) objects:\s+(?:\d+% \((\d+)/(\d+)\)|(\d+))"
+    r"(?:.*?, ([\d.]+) (bytes|KiB|MiB|GiB))?"
+)
+_UNIDADES = {"bytes": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3}
+
 def handle_remove_readonly(func, path, exc_info):
     """
     Manipulador de erros para shutil.rmtree.
@@ -30,32 +92,755 @@ def handle_remove_readonly(func, path, exc_info):
         raise exc_value
 
 
-def clonar_repositorio(repo_url: str) -> str | None:
+def _escapar_padrao_sparse(caminho: str) -> str:
     """
-    Clona um repositório para a pasta local './cloned_repo'.
-    Limpa a pasta se ela já existir, lidando com erros de permissão.
+    Escapa os caracteres especiais de padrões gitignore para que o caminho
+    seja tratado literalmente no arquivo de sparse-checkout.
     """
-    
-    caminho_local = os.path.abspath(PASTA_CLONE)
-    
+    for caractere in ("\\", "*", "?", "[", "!", "#"):
+        caminho = caminho.replace(caractere, "\\" + caractere)
+    return "/" + caminho
+
+
+def _selecionar_caminhos_necessarios(arquivos: list[str]) -> tuple[list[str], set[str]]:
+    """
+    A partir da lista de arquivos do commit (caminhos POSIX relativos),
+    escolhe apenas o que o analyzer realmente lê:
+    - o manifesto prioritário de cada diretório (extrair_dependencias);
+    - os candidatos a entry point de cada stack (ler_codigo_principal);
+    - os arquivos da raiz (mapear_estrutura);
+    - os .gitignore (usados para podar a varredura).
+    Retorna (arquivos a baixar, diretórios do esqueleto).
+    """
+    arquivos_por_dir = {}
+    diretorios = set()
+
+    for caminho in arquivos:
+        partes = caminho.split("/")
+        # Mesmas pastas que o os.walk() do analyzer ignora
+        if any(parte in analyzer.IGNORAR_DIRETORIOS for parte in partes[:-1]):
+            continue
+        pasta = "/".join(partes[:-1]) or "."
+        arquivos_por_dir.setdefault(pasta, set()).add(partes[-1])
+        for i in range(1, len(partes)):
+            diretorios.add("/".join(partes[:i]))
+
+    necessarios = {caminho for caminho in arquivos if "/" not in caminho}
+    # Os .gitignore também são lidos: a varredura do analyzer poda o que eles ignoram
+    necessarios.update(
+        posixpath.normpath(posixpath.join(pasta, ignorados.NOME_GITIGNORE))
+        for pasta, nomes in arquivos_por_dir.items() if ignorados.NOME_GITIGNORE in nomes
+    )
+
+    for pasta, nomes in arquivos_por_dir.items():
+        # Mesma desambiguação de identificar_todas_stacks
+        arquivo_stack = manifestos.escolher_manifesto(nomes)
+        if not arquivo_stack:
+            continue
+        necessarios.add(posixpath.normpath(posixpath.join(pasta, arquivo_stack)))
+
+        parser = manifestos.parser_para(arquivo_stack)
+        arquivos_alvo = parser.arquivos_principais
+        if not arquivos_alvo:
+            continue
+
+        # Mesmas pastas de busca de ler_codigo_principal
+        prefixo = "" if pasta == "." else pasta + "/"
+        pastas_busca = analyzer.PASTAS_BUSCA_CODIGO + parser.pastas_busca
+        for diretorio in diretorios:
+            if diretorio.startswith(prefixo) and "/" not in diretorio[len(prefixo):]:
+                item = diretorio[len(prefixo):]
+                if item and not item.startswith('.'):
+                    pastas_busca.append(item)
+
+        for pasta_rel in dict.fromkeys(pastas_busca):
+            for arquivo in arquivos_alvo:
+                candidato = posixpath.normpath(posixpath.join(pasta, pasta_rel, arquivo))
+                if arquivo in arquivos_por_dir.get(posixpath.dirname(candidato) or ".", ()):
+                    necessarios.add(candidato)
+
+    return sorted(necessarios), diretorios
+
+
+class LimiteClone(RuntimeError):
+    """O clone passou de um limite do OrcamentoClone ('motivo': tempo, bytes ou objetos)."""
+
+    def __init__(self, motivo: str, mensagem: str):
+        super().__init__(mensagem)
+        self.motivo = motivo
+
+
+class OrcamentoClone:
+    """
+    Limites de um clone: bytes (recebidos ou já gravados na pasta), objetos
+    (o total anunciado pelo servidor, antes do download) e prazo. O prazo
+    conta a partir da criação e vale para todas as tentativas do mesmo clone.
+    'estouros' guarda a mensagem de cada limite atingido.
+    """
+
+    def __init__(self, max_mb: float = CLONE_MAX_MB, max_objetos: int = CLONE_MAX_OBJETOS,
+                 timeout_s: float = CLONE_TIMEOUT_S):
+        self.max_mb = max_mb
+        self.max_bytes = int(max_mb * 1024 * 1024) or None
+        self.max_objetos = max_objetos or None
+        self.timeout_s = timeout_s or None
+        self.prazo = time.monotonic() + timeout_s if timeout_s else None
+        self.estouros: list[str] = []
+
+    def restante(self) -> float | None:
+        """Segundos até o prazo (None = sem prazo)."""
+        if self.prazo is None:
+            return None
+        return max(0.0, self.prazo - time.monotonic())
+
+    def _estourar(self, motivo: str, mensagem: str) -> LimiteClone:
+        self.estouros.append(mensagem)
+        telemetria.definir(limite_clone=motivo)
+        return LimiteClone(motivo, mensagem)
+
+    def verificar(self, bytes_usados: int = 0, objetos: int = 0) -> None:
+        """Levanta LimiteClone se algum limite foi ultrapassado."""
+        if self.prazo is not None and time.monotonic() >= self.prazo:
+            raise self._estourar("tempo", f"O clone passou do prazo de {self.timeout_s:g}s.")
+        if self.max_objetos and objetos > self.max_objetos:
+            raise self._estourar("objetos", f"O repositório tem {objetos} objetos "
+                                            f"(limite: {self.max_objetos}).")
+        if self.max_bytes and bytes_usados > self.max_bytes:
+            raise self._estourar("bytes", f"O clone passou de {self.max_mb:g} MB.")
+
+    def opcoes_git(self) -> dict:
+        """Opções do GitPython que matam um comando que passe do prazo."""
+        self.verificar()
+        restante = self.restante()
+        return {} if restante is None else {"kill_after_timeout": restante}
+
+
+def _opcoes_prazo(orcamento: OrcamentoClone | None) -> dict:
+    return orcamento.opcoes_git() if orcamento is not None else {}
+
+
+def _clone_limitado(repo_url: str, caminho_local: str, orcamento: OrcamentoClone | None,
+                    **opcoes) -> "Repo":
+    """
+    Repo.clone_from sob um OrcamentoClone: o 'git clone' roda como processo
+    e é morto assim que passa do prazo, do total de objetos anunciado pelo
+    servidor ou de bytes (os recebidos, pelo progresso, ou os já gravados na
+    pasta, que incluem o checkout). Levanta LimiteClone nesses casos e
+    GitCommandError se o git falhar.
+    """
+    from git import Git, Repo, GitCommandError
+    if orcamento is None:
+        return Repo.clone_from(repo_url, caminho_local, **opcoes)
+
+    orcamento.verificar()
+    Git.check_unsafe_protocols(repo_url)
+    # O invólucro (AutoInterrupt) mata o processo ao ser coletado: manter a referência
+    execucao = Git().clone("--", repo_url, caminho_local, as_process=True, universal_newlines=True,
+                           progress=True, v=True, **opcoes)
+    processo = execucao.proc
+    progresso = {"objetos": 0, "bytes": 0}
+    mensagens = []
+
+    def ler_progresso():
+        # universal_newlines transforma os '\r' do progresso em quebras de linha
+        for linha in processo.stderr:
+            m = _RE_PROGRESSO.search(linha)
+            if m is None:
+                mensagens.append(linha)
+                continue
+            progresso["objetos"] = max(progresso["objetos"], int(m.group(2) or m.group(3) or 0))
+            if m.group(4):
+                progresso["bytes"] = int(float(m.group(4)) * _UNIDADES[m.group(5)])
+
+    leitor = threading.Thread(target=ler_progresso, daemon=True)
+    leitor.start()
+    bytes_disco, proxima_medicao = 0, time.monotonic() + INTERVALO_MEDICAO_CLONE_S
     try:
-        # Limpa o diretório de clone anterior, se existir
+        while True:
+            try:
+                processo.wait(timeout=0.1)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if time.monotonic() >= proxima_medicao:
+                bytes_disco = _tamanho_pasta(caminho_local)
+                proxima_medicao = time.monotonic() + INTERVALO_MEDICAO_CLONE_S
+            orcamento.verificar(max(progresso["bytes"], bytes_disco), progresso["objetos"])
+    except BaseException:
+        processo.kill()
+        processo.wait()
+        raise
+    finally:
+        leitor.join(timeout=5)
+        if processo.stdout:
+            processo.stdout.close()
+
+    telemetria.definir(objetos_anunciados=progresso["objetos"])
+    if processo.returncode != 0:
+        raise GitCommandError(["git", "clone", repo_url], processo.returncode, "".join(mensagens[-20:]))
+    # Um clone rápido pode terminar entre duas medições
+    orcamento.verificar(_tamanho_pasta(caminho_local), progresso["objetos"])
+    return Repo(caminho_local)
+
+
+def _clonar_parcial(repo_url: str, caminho_local: str, orcamento: OrcamentoClone | None = None) -> None:
+    """
+    Clone raso (depth=1) e parcial (filter=blob:none), sem checkout.
+    Em seguida faz um sparse checkout apenas dos arquivos que o analyzer lê,
+    o que dispara um único fetch em lote dos blobs necessários.
+    Se o servidor recusar o clone parcial, cai para o clone completo.
+    """
+    from git import GitCommandError
+    try:
+        repo = _clone_limitado(
+            repo_url, caminho_local, orcamento,
+            depth=1, filter="blob:none", no_checkout=True
+        )
+    except GitCommandError as e:
+        print(f"Clone parcial recusado pelo servidor ({e.stderr.strip()}). Usando clone completo...")
         if os.path.exists(caminho_local):
-            print(f"Limpando pasta existente: {PASTA_CLONE}...")
-            # Adicionamos o 'onerror' aqui
             shutil.rmtree(caminho_local, onerror=handle_remove_readonly)
-        
-        print(f"Clonando {repo_url}...")
-        
-        # Executa o clone
-        Repo.clone_from(repo_url, caminho_local)
-        
-        print(f"Clone concluído com sucesso em: {caminho_local}")
-        return caminho_local
-
-    except Exception as e:
-        print(f"Erro ao clonar o repositório: {e}")
+        _clone_limitado(repo_url, caminho_local, orcamento)
+        return
+
+    _checkout_esparso(repo, caminho_local, orcamento)
+
+
+def _clonar_arvore(repo_url: str, caminho_local: str, orcamento: OrcamentoClone | None = None) -> None:
+    """
+    Clone bare, raso e sem blobs: só commits e árvores. Depois baixa, num
+    único lote, os blobs que o analyzer vai ler. Nada é escrito como
+    working tree. Se o servidor recusar o filtro, faz um clone bare raso comum.
+    """
+    from git import GitCommandError
+    try:
+        repo = _clone_limitado(repo_url, caminho_local, orcamento, bare=True, depth=1, filter="blob:none")
+    except GitCommandError as e:
+        print(f"Clone parcial recusado pelo servidor ({e.stderr.strip()}). Usando clone bare completo...")
+        if os.path.exists(caminho_local):
+            shutil.rmtree(caminho_local, onerror=handle_remove_readonly)
+        _clone_limitado(repo_url, caminho_local, orcamento, bare=True, depth=1)
+        return
+
+    _buscar_blobs_necessarios(repo, orcamento)
+
+
+def _oids_necessarios(saida_ls_tree: str) -> list[str]:
+    """
+    A partir da saída de 'git ls-tree -r -z', retorna os ids dos blobs que o
+    analyzer lê (mesma seleção do clone parcial).
+    """
+    objetos = {}
+    for registro in saida_ls_tree.split("\0"):
+        if registro:
+            meta, caminho = registro.split("\t", 1)
+            _, tipo, objeto = meta.split()[:3]
+            if tipo == "blob":
+                objetos[caminho] = objeto
+
+    necessarios, _ = _selecionar_caminhos_necessarios(list(objetos))
+    print(f"Modo árvore: baixando {len(necessarios)} de {len(objetos)} blobs (sem checkout)...")
+    telemetria.definir(arquivos_baixados=len(necessarios), arquivos_no_commit=len(objetos))
+    return sorted({objetos[caminho] for caminho in necessarios})
+
+
+def _buscar_blobs_necessarios(repo: "Repo", orcamento: OrcamentoClone | None = None) -> None:
+    """
+    Num clone parcial (promisor), baixa de uma vez os blobs que o analyzer lê.
+    Sem isso cada leitura dispararia um fetch próprio. Se o servidor não
+    aceitar pedidos por objeto, as leituras ainda funcionam (uma a uma).
+    """
+    from git import GitCommandError
+    if repo.git.config("--get", "remote.origin.promisor", with_exceptions=False).strip() != "true":
+        return  # Clone completo: os blobs já estão no disco
+
+    oids = _oids_necessarios(repo.git.ls_tree("-r", "-z", "HEAD"))
+    try:
+        for i in range(0, len(oids), MAX_OBJETOS_POR_FETCH):
+            repo.git(c="fetch.negotiationAlgorithm=noop").fetch(
+                "--no-tags", "--no-write-fetch-head", "origin", *oids[i:i + MAX_OBJETOS_POR_FETCH],
+                **_opcoes_prazo(orcamento)
+            )
+    except GitCommandError as e:
+        if orcamento is not None:
+            orcamento.verificar()  # Morto pelo prazo: não adianta ler os blobs um a um
+        print(f"Busca em lote dos blobs recusada ({e.stderr.strip()}). Eles serão lidos sob demanda.")
+
+
+def _escrever_sparse_checkout(git_dir: str, arquivos: list[str]) -> tuple[list[str], set[str]]:
+    """
+    Grava em '<git_dir>/info/sparse-checkout' os padrões dos arquivos que o
+    analyzer lê. Retorna (arquivos a baixar, diretórios do esqueleto).
+    """
+    necessarios, diretorios = _selecionar_caminhos_necessarios(arquivos)
+    print(f"Clone parcial: baixando {len(necessarios)} de {len(arquivos)} arquivos...")
+    telemetria.definir(arquivos_baixados=len(necessarios), arquivos_no_commit=len(arquivos))
+
+    caminho_sparse = os.path.join(git_dir, "info", "sparse-checkout")
+    os.makedirs(os.path.dirname(caminho_sparse), exist_ok=True)
+    with open(caminho_sparse, "w", encoding="utf-8") as f:
+        f.write("\n".join(_escapar_padrao_sparse(c) for c in necessarios) + "\n")
+    return necessarios, diretorios
+
+
+def _criar_esqueleto(caminho_local: str, diretorios: set[str]) -> None:
+    """
+    Recria o esqueleto de diretórios para que a varredura e o mapeamento
+    da raiz enxerguem a mesma estrutura de um clone completo.
+    """
+    for diretorio in diretorios:
+        os.makedirs(os.path.join(caminho_local, diretorio), exist_ok=True)
+
+
+def _checkout_esparso(repo: "Repo", caminho_local: str, orcamento: OrcamentoClone | None = None) -> None:
+    """
+    Faz o checkout (sem checkout prévio) apenas dos arquivos que o analyzer lê.
+    Funciona tanto para clones normais quanto para worktrees de um espelho,
+    pois o arquivo de sparse-checkout fica no git_dir de cada um.
+    """
+    arquivos = [a for a in repo.git.ls_tree("-r", "--name-only", "-z", "HEAD").split("\0") if a]
+    _, diretorios = _escrever_sparse_checkout(repo.git_dir, arquivos)
+    # '-c' em vez de 'git config' para não afetar outros worktrees do mesmo espelho
+    repo.git(c="core.sparseCheckout=true").read_tree("-mu", "HEAD", **_opcoes_prazo(orcamento))
+    _criar_esqueleto(caminho_local, diretorios)
+
+
+def normalizar_url(repo_url: str) -> str:
+    """
+    Normaliza a URL para que variações equivalentes (http/https/ssh,
+    barra final, sufixo .git, maiúsculas no host) apontem para o mesmo espelho.
+    """
+    url = repo_url.strip()
+    scp = re.match(r"^[\w.-]+@([^:/]+):(.+)$", url)  # ex: git@github.com:dono/repo.git
+    if scp:
+        host, caminho = scp.group(1), "/" + scp.group(2)
+    else:
+        partes = urlsplit(url)
+        if not partes.hostname:
+            return url.rstrip("/").removesuffix(".git")
+        host, caminho = partes.hostname, partes.path
+
+    host = host.lower()
+    caminho = caminho.rstrip("/").removesuffix(".git").rstrip("/")
+    if host == "github.com":
+        caminho = caminho.lower()  # O GitHub não diferencia maiúsculas
+    return f"{host}{caminho}"
+
+
+def obter_commit_remoto(repo_url: str, timeout_s: float = TIMEOUT_LS_REMOTE_S) -> str | None:
+    """
+    Commit do HEAD do repositório remoto, via 'git ls-remote' (sem clonar
+    nada). Retorna None se o repositório não responder ou estiver vazio.
+    """
+    from git import Git
+    try:
+        Git.check_unsafe_protocols(repo_url)
+        saida = Git().ls_remote("--", repo_url, "HEAD", kill_after_timeout=timeout_s,
+                                env={"GIT_TERMINAL_PROMPT": "0"})
+    except Exception:
+        return None
+    partes = saida.split()
+    return partes[0] if partes else None
+
+
+class _TravaArquivo:
+    """
+    Trava exclusiva entre processos (e threads) baseada em arquivo.
+    Usa fcntl.flock no Linux/macOS e msvcrt.locking no Windows.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._arquivo = None
+
+    def adquirir(self, bloquear: bool = True) -> bool:
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        self._arquivo = open(self.caminho, "a+b")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                while True:
+                    try:
+                        self._arquivo.seek(0)
+                        msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not bloquear:
+                            raise
+                        time.sleep(0.1)
+            else:
+                import fcntl
+                flags = fcntl.LOCK_EX if bloquear else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(self._arquivo.fileno(), flags)
+            return True
+        except OSError:
+            self._arquivo.close()
+            self._arquivo = None
+            return False
+
+    def liberar(self) -> None:
+        if not self._arquivo:
+            return
+        if os.name == "nt":
+            import msvcrt
+            self._arquivo.seek(0)
+            msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_UN)
+        self._arquivo.close()
+        self._arquivo = None
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, *exc):
+        self.liberar()
+
+
+def _tamanho_pasta(caminho: str) -> int:
+    """
+    Soma o tamanho (em bytes) de todos os arquivos de uma pasta. Pastas e
+    arquivos que ainda não existem (o git falhou antes de criá-los) ou que
+    sumiram durante a medição (temporários do git) contam como 0.
+    """
+    total = 0
+    pendentes = [caminho]
+    while pendentes:
+        try:
+            with os.scandir(pendentes.pop()) as entradas:
+                for entrada in entradas:
+                    if entrada.is_dir(follow_symlinks=False):
+                        pendentes.append(entrada.path)
+                    elif entrada.is_file(follow_symlinks=False):
+                        total += entrada.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            continue
+    return total
+
+
+class LojaEspelhos:
+    """
+    Cache persistente de espelhos (clones bare, sem blobs) endereçados pela
+    URL normalizada. Numa repetição, faz apenas um 'git fetch' incremental e
+    um 'git worktree add' em vez de um novo clone.
+    Cada espelho tem seu próprio arquivo de trava, então execuções
+    concorrentes compartilham o mesmo espelho com segurança.
+    """
+
+    def __init__(self, raiz: str = PASTA_ESPELHOS, orcamento_mb: int = ORCAMENTO_ESPELHOS_MB):
+        self.raiz = os.path.abspath(raiz)
+        self.orcamento_bytes = orcamento_mb * 1024 * 1024
+
+    def _chave(self, repo_url: str) -> str:
+        return hashlib.sha256(normalizar_url(repo_url).encode("utf-8")).hexdigest()[:32]
+
+    def caminho_espelho(self, repo_url: str) -> str:
+        return os.path.join(self.raiz, self._chave(repo_url) + ".git")
+
+    def _trava(self, chave: str) -> _TravaArquivo:
+        return _TravaArquivo(os.path.join(self.raiz, chave + ".lock"))
+
+    def _atualizar(self, repo_url: str, orcamento: OrcamentoClone | None = None) -> "Repo":
+        """Cria o espelho ou faz um fetch incremental. Deve ser chamada com a trava."""
+        from git import Repo, GitCommandError
+        caminho = self.caminho_espelho(repo_url)
+
+        if os.path.exists(caminho):
+            print(f"Atualizando espelho em cache de {repo_url}...")
+            espelho = Repo(caminho)
+            espelho.git.fetch("--prune", "origin", **_opcoes_prazo(orcamento))
+            return espelho
+
+        print(f"Criando espelho em cache de {repo_url}...")
+        caminho_tmp = f"{caminho}.tmp-{os.getpid()}"
+        if os.path.exists(caminho_tmp):
+            shutil.rmtree(caminho_tmp, onerror=handle_remove_readonly)
+        try:
+            try:
+                espelho = _clone_limitado(repo_url, caminho_tmp, orcamento, bare=True, filter="blob:none")
+            except GitCommandError as e:
+                print(f"Clone parcial recusado pelo servidor ({e.stderr.strip()}). Espelhando tudo...")
+                if os.path.exists(caminho_tmp):
+                    shutil.rmtree(caminho_tmp, onerror=handle_remove_readonly)
+                espelho = _clone_limitado(repo_url, caminho_tmp, orcamento, bare=True)
+        except LimiteClone:
+            # Um espelho incompleto não serve para nada: não deixa lixo no cache
+            if os.path.exists(caminho_tmp):
+                shutil.rmtree(caminho_tmp, onerror=handle_remove_readonly)
+            raise
+        # Clones bare não configuram refspec; sem ela o 'fetch' não atualiza as branches
+        espelho.git.config("remote.origin.fetch", "+refs/heads/*:refs/heads/*")
+        os.replace(caminho_tmp, caminho)
+        return Repo(caminho)
+
+    def _registrar_uso(self, repo_url: str) -> None:
+        caminho = self.caminho_espelho(repo_url)
+        uso = {
+            "url": normalizar_url(repo_url),
+            "bytes": _tamanho_pasta(caminho),
+            "ultimo_uso": time.time(),
+        }
+        with open(os.path.join(caminho, ARQUIVO_USO_ESPELHO), "w", encoding="utf-8") as f:
+            json.dump(uso, f)
+
+    def preparar_worktree(self, repo_url: str, destino: str, modo: str = MODO_COMPLETO,
+                          orcamento: OrcamentoClone | None = None) -> None:
+        """
+        Atualiza (ou cria) o espelho e faz o checkout do HEAD em 'destino'
+        como um worktree destacado. No modo parcial, usa sparse checkout.
+        Com 'orcamento', a criação do espelho segue os seus limites e os
+        demais comandos git, o prazo.
+        """
+        from git import Repo
+        chave = self._chave(repo_url)
+        with self._trava(chave):
+            with telemetria.span("clone.espelho") as s:
+                existia = os.path.exists(self.caminho_espelho(repo_url))
+                espelho = self._atualizar(repo_url, orcamento)
+                s.definir(fetch_incremental=existia)
+            with telemetria.span("clone.worktree"):
+                # Remove registros de worktrees cujas pastas já foram apagadas
+                espelho.git.worktree("prune")
+                if modo == MODO_PARCIAL:
+                    espelho.git.worktree("add", "--detach", "--no-checkout", destino, "HEAD")
+                    _checkout_esparso(Repo(destino), destino, orcamento)
+                elif modo == MODO_ARVORE:
+                    # Worktree vazio: só registra o HEAD (e protege o espelho da poda)
+                    espelho.git.worktree("add", "--detach", "--no-checkout", destino, "HEAD")
+                    _buscar_blobs_necessarios(Repo(destino), orcamento)
+                else:
+                    espelho.git.worktree("add", "--detach", destino, "HEAD", **_opcoes_prazo(orcamento))
+                    if orcamento is not None:
+                        # O checkout não é medido enquanto é escrito; confere o total no fim
+                        orcamento.verificar(_tamanho_pasta(destino))
+            self._registrar_uso(repo_url)
+
+        self.podar(preservar=chave)
+
+    def liberar_worktree(self, repo_url: str, destino: str) -> None:
+        """Apaga um worktree criado por preparar_worktree e remove seu registro no espelho."""
+        from git import Repo
+        with self._trava(self._chave(repo_url)):
+            if os.path.exists(destino):
+                shutil.rmtree(destino, onerror=handle_remove_readonly)
+            caminho = self.caminho_espelho(repo_url)
+            if os.path.exists(caminho):
+                Repo(caminho).git.worktree("prune")
+
+    def _tem_worktrees_ativos(self, caminho_espelho: str) -> bool:
+        pasta_worktrees = os.path.join(caminho_espelho, "worktrees")
+        if not os.path.isdir(pasta_worktrees):
+            return False
+        for nome in os.listdir(pasta_worktrees):
+            try:
+                with open(os.path.join(pasta_worktrees, nome, "gitdir"), encoding="utf-8") as f:
+                    if os.path.exists(f.read().strip()):
+                        return True
+            except OSError:
+                continue
+        return False
+
+    def listar(self) -> list[dict]:
+        """Lista os espelhos com URL, tamanho e último uso (mais antigo primeiro)."""
+        espelhos = []
+        if not os.path.isdir(self.raiz):
+            return espelhos
+        for nome in os.listdir(self.raiz):
+            if not nome.endswith(".git"):
+                continue
+            try:
+                with open(os.path.join(self.raiz, nome, ARQUIVO_USO_ESPELHO), encoding="utf-8") as f:
+                    uso = json.load(f)
+            except (OSError, ValueError):
+                continue
+            espelhos.append({"chave": nome.removesuffix(".git"), **uso})
+        return sorted(espelhos, key=lambda e: e["ultimo_uso"])
+
+    def podar(self, orcamento_bytes: int | None = None, preservar: str | None = None) -> int:
+        """
+        Remove os espelhos menos usados até caber no orçamento de disco.
+        Espelhos travados por outra execução ou com worktrees ativos são mantidos.
+        Retorna quantos espelhos foram removidos.
+        """
+        orcamento = self.orcamento_bytes if orcamento_bytes is None else orcamento_bytes
+        espelhos = self.listar()
+        total = sum(e["bytes"] for e in espelhos)
+        removidos = 0
+
+        for espelho in espelhos:
+            if total <= orcamento:
+                break
+            if espelho["chave"] == preservar:
+                continue
+            trava = self._trava(espelho["chave"])
+            if not trava.adquirir(bloquear=False):
+                continue
+            try:
+                caminho = os.path.join(self.raiz, espelho["chave"] + ".git")
+                if self._tem_worktrees_ativos(caminho):
+                    continue
+                print(f"Removendo espelho pouco usado: {espelho['url']}")
+                shutil.rmtree(caminho, onerror=handle_remove_readonly)
+                total -= espelho["bytes"]
+                removidos += 1
+            finally:
+                trava.liberar()
+
+        return removidos
+
+
+def _clonar_em(repo_url: str, caminho_local: str, modo: str, usar_espelho: bool,
+               orcamento: OrcamentoClone | None = None) -> str | None:
+    """
+    Executa o clone no modo pedido para 'caminho_local' (que não deve existir).
+    Se passar do limite de bytes ou de objetos do 'orcamento', refaz no modo
+    árvore (só árvores e os blobs lidos pela análise), que cabe mesmo em
+    repositórios enormes. Em caso de falha (inclusive o prazo), remove o que
+    foi criado e retorna None.
+    """
+    if modo not in MODOS_CLONE:
+        raise ValueError(f"Modo de clone inválido: {modo}. Use um de {MODOS_CLONE}.")
+    if orcamento is None:
+        orcamento = OrcamentoClone()
+
+    with telemetria.span("clone", modo=modo, espelho=usar_espelho) as s:
+        try:
+            print(f"Clonando {repo_url} (modo {modo})...")
+
+            # Executa o clone
+            try:
+                if usar_espelho:
+                    LojaEspelhos().preparar_worktree(repo_url, caminho_local, modo, orcamento)
+                elif modo == MODO_PARCIAL:
+                    _clonar_parcial(repo_url, caminho_local, orcamento)
+                elif modo == MODO_ARVORE:
+                    _clonar_arvore(repo_url, caminho_local, orcamento)
+                else:
+                    _clone_limitado(repo_url, caminho_local, orcamento)
+            except LimiteClone as e:
+                if e.motivo == "tempo" or (modo == MODO_ARVORE and not usar_espelho):
+                    raise
+                print(f"{e} Refazendo o clone no modo {MODO_ARVORE}...")
+                if os.path.exists(caminho_local):
+                    shutil.rmtree(caminho_local, onerror=handle_remove_readonly)
+                s.definir(modo_efetivo=MODO_ARVORE)
+                _clonar_arvore(repo_url, caminho_local, orcamento)
+
+            print(f"Clone concluído com sucesso em: {caminho_local}")
+            s.definir(bytes=_tamanho_pasta(caminho_local))
+            return caminho_local
+
+        except Exception as e:
+            s.marcar_erro(e)
+            print(f"Erro ao clonar o repositório: {e}")
         # Garante a limpeza em caso de falha (também com 'onerror')
         if os.path.exists(caminho_local):
             shutil.rmtree(caminho_local, onerror=handle_remove_readonly)
         return None
+
+
+def obter_hash_arvore(caminho_local: str) -> str | None:
+    """
+    Retorna o hash da árvore (tree) do HEAD do checkout, ou None se não for um repositório.
+    Dois commits com o mesmo conteúdo têm a mesma árvore, então ela serve de chave de cache.
+    """
+    try:
+        from git import Repo
+        return Repo(caminho_local).git.rev_parse("HEAD^{tree}")
+    except Exception:
+        return None
+
+
+def clonar_repositorio(repo_url: str, modo: str = MODO_COMPLETO,
+                       usar_espelho: bool = False) -> str | None:
+    """
+    Clona um repositório para a pasta local './cloned_repo'.
+    Limpa a pasta se ela já existir, lidando com erros de permissão.
+    Com modo="parcial", baixa apenas o último commit e os blobs usados na análise.
+    Com usar_espelho=True, reaproveita o espelho local (fetch incremental + worktree).
+
+    Atenção: a pasta é compartilhada; para análises concorrentes use AreaTrabalho.
+    """
+    
+    caminho_local = os.path.abspath(PASTA_CLONE)
+    
+    # Limpa o diretório de clone anterior, se existir
+    if os.path.exists(caminho_local):
+        print(f"Limpando pasta existente: {PASTA_CLONE}...")
+        # Adicionamos o 'onerror' aqui
+        shutil.rmtree(caminho_local, onerror=handle_remove_readonly)
+    
+    return _clonar_em(repo_url, caminho_local, modo, usar_espelho)
+
+
+class AreaTrabalho:
+    """
+    Pasta temporária exclusiva de um job de análise.
+    Cada instância clona em seu próprio diretório (tempfile.mkdtemp), então
+    várias análises podem rodar em paralelo sem apagar o checkout umas das outras.
+    A limpeza é garantida ao sair do bloco 'with' (mesmo com exceção).
+    O clone segue um OrcamentoClone (o informado ou um com os limites padrão,
+    criado ao clonar); os limites atingidos ficam em 'orcamento.estouros'.
+
+    Uso:
+        with AreaTrabalho(repo_url, modo=MODO_PARCIAL) as area:
+            if area.caminho:
+                stacks = analyzer.identificar_todas_stacks(area.caminho)
+    """
+
+    def __init__(self, repo_url: str, modo: str = MODO_COMPLETO,
+                 usar_espelho: bool = False, pasta_base: str | None = PASTA_TRABALHO,
+                 orcamento: OrcamentoClone | None = None):
+        self.repo_url = repo_url
+        self.modo = modo
+        self.usar_espelho = usar_espelho
+        self.pasta_base = pasta_base
+        self.orcamento = orcamento
+        self.pasta_temporaria = None
+        self.caminho = None
+        self.hash_arvore = None
+
+    def destino(self) -> str:
+        """Cria (uma vez) a pasta temporária e retorna onde o clone deve ficar."""
+        if self.pasta_temporaria is None:
+            if self.pasta_base:
+                os.makedirs(self.pasta_base, exist_ok=True)
+            self.pasta_temporaria = tempfile.mkdtemp(prefix="readme-ai-", dir=self.pasta_base)
+        return os.path.join(self.pasta_temporaria, "repo")
+
+    def clonar(self) -> str | None:
+        """Cria a pasta temporária e clona nela. Retorna o caminho ou None."""
+        destino = self.destino()
+        if self.orcamento is None:
+            # Criado aqui, e não no __init__, para o prazo não contar a espera na fila
+            self.orcamento = OrcamentoClone()
+        self.caminho = _clonar_em(self.repo_url, destino, self.modo, self.usar_espelho, self.orcamento)
+        if self.caminho:
+            self.hash_arvore = obter_hash_arvore(self.caminho)
+        return self.caminho
+
+    def limpar(self) -> None:
+        """Remove a pasta do job. Pode ser chamada mais de uma vez."""
+        if self.pasta_temporaria is None:
+            return
+        destino = os.path.join(self.pasta_temporaria, "repo")
+        if self.usar_espelho and os.path.exists(destino):
+            LojaEspelhos().liberar_worktree(self.repo_url, destino)
+        if os.path.exists(self.pasta_temporaria):
+            shutil.rmtree(self.pasta_temporaria, onerror=handle_remove_readonly)
+        self.pasta_temporaria = None
+        self.caminho = None
+        self.hash_arvore = None
+
+    def __enter__(self):
+        try:
+            self.clonar()
+        except BaseException:
+            self.limpar()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self.limpar()
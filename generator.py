@@ -1,15 +1,93 @@
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-from pathlib import Path # Importa o pathlib
+import re
+import ast
+import copy
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator
+import cache
+import cliente_ia
+import manifestos
+import telemetria
 
-# Carrega as variáveis de ambiente (o arquivo .env)
-load_dotenv()
+# Modelo e configurações de geração (ambos fazem parte da chave do cache de respostas)
+NOME_MODELO = 'gemini-2.5-flash'
+CONFIG_GERACAO = {}
+# Versão dos textos dos prompts. Faz parte de chave_prompt (a ETag do /gerar):
+# incremente sempre que mudar algo que altere os prompts montados.
+VERSAO_PROMPTS = 1
+# Endpoint alternativo da API (ex: um servidor falso local para testes)
+ENDPOINT_GEMINI = os.getenv("README_AI_GEMINI_ENDPOINT")
+
+# Cliente compartilhado (rate limit, retentativas e agrupamento), criado sob demanda
+_cliente_padrao = None
+_cliente_async_padrao = None
+_lock_cliente = threading.Lock()
+
+# Cache de respostas da IA, indexado pelo hash do prompt + modelo + configurações
+CACHE_RESPOSTAS_TTL_HORAS = float(os.getenv("README_AI_CACHE_RESPOSTAS_TTL_HORAS", "24"))
+CACHE_RESPOSTAS_MAX_MB = float(os.getenv("README_AI_CACHE_RESPOSTAS_MAX_MB", "50"))
+_cache_respostas = cache.CacheDisco(
+    "respostas",
+    max_mb=CACHE_RESPOSTAS_MAX_MB,
+    ttl_segundos=CACHE_RESPOSTAS_TTL_HORAS * 3600,
+)
+
+# Geração em duas etapas (map-reduce) para repositórios com muitas stacks: cada
+# stack é resumida numa chamada própria, em paralelo, e uma chamada final monta o
+# README a partir dos resumos. Automática a partir de MIN_STACKS_MAP_REDUCE (0 desliga)
+MIN_STACKS_MAP_REDUCE = int(os.getenv("README_AI_MAP_REDUCE_MIN_STACKS", "6"))
+MAX_RESUMOS_SIMULTANEOS = int(os.getenv("README_AI_MAX_RESUMOS_SIMULTANEOS", "4"))
+# Orçamento do prompt de cada stack e tamanho máximo de cada resumo no prompt final
+ORCAMENTO_TOKENS_RESUMO = int(os.getenv("README_AI_ORCAMENTO_TOKENS_RESUMO", "3000"))
+MAX_PALAVRAS_RESUMO = 120
+MAX_TOKENS_RESUMO = 300
+# Resumos por stack, indexados pelo hash do prompt da stack (que só usa dados dela)
+_cache_resumos = cache.CacheDisco(
+    "resumos",
+    max_mb=CACHE_RESPOSTAS_MAX_MB,
+    ttl_segundos=CACHE_RESPOSTAS_TTL_HORAS * 3600,
+)
+
+# Orçamento total do prompt, em tokens (estimados por ~4 caracteres/token)
+ORCAMENTO_TOKENS_PROMPT = int(os.getenv("README_AI_ORCAMENTO_TOKENS", "12000"))
+CARACTERES_POR_TOKEN = 4
+MAX_DEPENDENCIAS_POR_STACK = 15
+MAX_ITENS_ESTRUTURA = 50
+# Abaixo disso, uma amostra de código não ajuda a IA e é descartada
+MIN_TOKENS_AMOSTRA = 40
+
+# Linhas "estruturais" mantidas no resumo de código que não é Python válido
+# (JS/TS, Go, Java... ou Python truncado): imports, exports, assinaturas e rotas
+_RE_LINHA_ESTRUTURAL = re.compile(
+    r"^\s*(import\b|from\s+\S+\s+import\b|export\b|(async\s+)?def\b|class\b|"
+    r"(async\s+)?function\b|(const|let|var)\s+\w+\s*=\s*(require\(|(async\s*)?\(|new\s|\w+\()|"
+    r"module\.exports|\w+\.(get|post|put|patch|delete|use|listen|route)\(|@\w|"
+    r"package\b|func\b|public\b|interface\b|type\s+\w+|if\s+__name__)"
+)
+_RE_INICIO_DOC = re.compile(r'^\s*("""|\'\'\'|/\*\*)')
+
+# Textos devolvidos no lugar do README quando a geração falha
+ERRO_CONFIGURACAO = "Erro: Não foi possível configurar o modelo de IA."
+TITULO_ERRO = "# Erro ao gerar README"
+
+# Cerca de código que a IA às vezes coloca em volta do README
+PREFIXO_CERCA = "```markdown"
+SUFIXO_CERCA = "```"
+# Final do texto que ainda pode virar a cerca de fechamento (espaços + até 3 crases + espaços)
+_RE_CAUDA_CERCA = re.compile(r"\s*`{0,3}\s*\Z")
 
 def _configurar_ia():
     """
-    Configura e retorna o modelo generativo do Gemini.
+    Configura e retorna o modelo generativo do Gemini. O SDK (google.generativeai)
+    só é importado aqui, na primeira geração: importá-lo leva quase um segundo,
+    e quem só analisa (ou só pede --help) não deve pagar esse custo.
     """
+    # O .env também só é lido aqui, junto com o SDK (python-dotenv é outro import pesado)
+    from dotenv import load_dotenv
+    load_dotenv()
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise EnvironmentError(
@@ -18,42 +96,270 @@ def _configurar_ia():
         )
         
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        import google.generativeai as genai
+        if ENDPOINT_GEMINI:
+            genai.configure(api_key=api_key, transport="rest",
+                            client_options={"api_endpoint": ENDPOINT_GEMINI})
+        else:
+            genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(NOME_MODELO, generation_config=CONFIG_GERACAO or None)
         return model
     except Exception as e:
         print(f"Erro ao configurar a API do Gemini: {e}")
         return None
 
+def obter_cliente() -> cliente_ia.ClienteModelo:
+    """
+    Retorna o cliente compartilhado do Gemini. O modelo é configurado uma
+    única vez, na primeira geração, e reaproveitado pelas seguintes.
+    """
+    global _cliente_padrao
+    with _lock_cliente:
+        if _cliente_padrao is None:
+            _cliente_padrao = cliente_ia.ClienteModelo(fabrica_modelo=_configurar_ia)
+        return _cliente_padrao
+
+def obter_cliente_async() -> cliente_ia.ClienteModeloAsync:
+    """
+    Versão asyncio de obter_cliente. Usa o mesmo modelo e o mesmo limitador
+    de taxa do cliente síncrono, então as duas versões dividem a cota da API.
+    """
+    global _cliente_async_padrao
+    cliente_sync = obter_cliente()
+    with _lock_cliente:
+        if _cliente_async_padrao is None:
+            _cliente_async_padrao = cliente_ia.ClienteModeloAsync(
+                fabrica_modelo=cliente_sync.obter_modelo, balde=cliente_sync.balde
+            )
+        return _cliente_async_padrao
+
 def _get_comando_instalacao(stack_info: dict) -> str:
     """
-    Helper para determinar o comando de instalação correto baseado na stack.
+    Helper para determinar o comando de instalação correto baseado na stack
+    (cada formato do registro de manifestos define o seu).
     """
     arquivo_stack = stack_info.get('arquivo')
     caminho_stack = stack_info.get('caminho', '.')
+
+    parser = manifestos.parser_para(arquivo_stack) if arquivo_stack else None
+    comando = parser.comando(caminho_stack, arquivo_stack) if parser else None
+    return comando or "Comando de instalação não determinado."
+
+
+def estimar_tokens(texto: str) -> int:
+    """
+    Estimativa barata do número de tokens (~4 caracteres por token).
+    """
+    return (len(texto) + CARACTERES_POR_TOKEN - 1) // CARACTERES_POR_TOKEN
+
+def _truncar_para_tokens(texto: str, max_tokens: int) -> str:
+    """
+    Corta o texto em fim de linha para caber em 'max_tokens'.
+    """
+    if estimar_tokens(texto) <= max_tokens:
+        return texto
+    aviso = "\n... (resumo truncado)"
+    limite = max(0, max_tokens * CARACTERES_POR_TOKEN - len(aviso))
+    corte = texto.rfind("\n", 0, limite)
+    return texto[:corte if corte > 0 else limite] + aviso
+
+def _resumir_python(conteudo: str) -> str | None:
+    """
+    Reduz código Python aos imports, assinaturas (com decorators), docstrings
+    (primeira linha) e atribuições de topo (ex: 'app = FastAPI()').
+    Retorna None se o código não for Python válido (ex: arquivo truncado).
+    """
+    try:
+        arvore = ast.parse(conteudo)
+    except (SyntaxError, ValueError):
+        return None
+
+    linhas = []
+
+    def primeira_linha_doc(no, indentacao):
+        doc = ast.get_docstring(no)
+        if doc:
+            linhas.append(f'{indentacao}"""{doc.strip().splitlines()[0]}"""')
+
+    def visitar(nos, indentacao):
+        for no in nos:
+            if isinstance(no, (ast.Import, ast.ImportFrom)):
+                linhas.append(indentacao + ast.unparse(no))
+            elif isinstance(no, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                cabecalho = copy.copy(no)
+                cabecalho.body = [ast.Expr(ast.Constant(...))]
+                texto = ast.unparse(cabecalho).rsplit("\n", 1)[0]
+                if not isinstance(no, ast.ClassDef):
+                    texto += " ..."
+                linhas.extend(indentacao + linha for linha in texto.splitlines())
+                primeira_linha_doc(no, indentacao + "    ")
+                if isinstance(no, ast.ClassDef):
+                    visitar(no.body, indentacao + "    ")
+            elif not indentacao and isinstance(no, (ast.Assign, ast.AnnAssign)):
+                linhas.append(ast.unparse(no).splitlines()[0][:120])
+            elif not indentacao and isinstance(no, ast.If) and "__name__" in ast.unparse(no.test):
+                linhas.append(f"if {ast.unparse(no.test)}: ...")
+
+    primeira_linha_doc(arvore, "")
+    visitar(arvore.body, "")
+    return "\n".join(linhas)
+
+def _resumir_codigo(arquivo: str, conteudo: str) -> str:
+    """
+    Resume uma amostra de código a imports, assinaturas e docstrings,
+    em vez de enviar o arquivo bruto para a IA.
+    """
+    resumo = _resumir_python(conteudo) if arquivo.endswith(".py") else None
+
+    if resumo is None:
+        linhas = [
+            linha.rstrip() for linha in conteudo.splitlines()
+            if _RE_LINHA_ESTRUTURAL.match(linha) or _RE_INICIO_DOC.match(linha)
+        ]
+        resumo = "\n".join(linhas)
+
+    # Arquivos sem nenhuma estrutura reconhecível (ex: scripts curtos) vão como estão
+    return resumo.strip() or conteudo.strip()
+
+def _ordenar_por_importancia(stacks: list[dict]) -> list[dict]:
+    """
+    Stack da raiz primeiro; depois as que têm mais dependências.
+    Empates mantêm a ordem original (ordem da varredura).
+    """
+    return sorted(stacks, key=lambda stack: (stack['caminho'] != ".", -len(stack['dependencias'])))
+
+def _linhas_base_stack(i: int, stack: dict) -> list[str]:
+    """
+    Cabeçalho, tecnologia, comando de instalação e dependências de uma stack.
+    """
+    caminho_stack = stack['caminho']
+    if caminho_stack == ".":
+        nome_stack_display = "Raiz (Frontend)" # Suposição
+    else:
+        nome_stack_display = f"{caminho_stack.capitalize()} (Backend)" # Suposição
+
+    linhas = [
+        f"\n--- Detalhes da Stack {i} ({nome_stack_display}) ---",
+        f"- **Tecnologia:** {stack['tecnologia']}",
+    ]
     
-    if arquivo_stack == "package.json":
-        return "`npm install`"
-    elif arquivo_stack == "pyproject.toml":
-        # Se estiver numa subpasta, 'pip install ./subpasta'
-        return f"`pip install ./{caminho_stack}`"
-    elif arquivo_stack == "requirements.txt":
-        # Constrói o caminho relativo para o arquivo
-        caminho_req = Path(caminho_stack) / arquivo_stack
-        return f"`pip install -r {caminho_req.as_posix()}`" # as_posix() usa /
-    elif arquivo_stack == "pom.xml":
-        return "`mvn install`"
-    elif arquivo_stack == "build.gradle":
-        return "`./gradlew build`"
-    return "Comando de instalação não determinado."
-
-
-def _construir_prompt(contexto: dict) -> str:
-    """
-    Monta o "Prompt Mestre" (multi-stack) que será enviado para a IA.
+    # 1. Comando de Instalação
+    comando_instalacao = _get_comando_instalacao(stack)
+    linhas.append(f"- **Comando de Instalação Sugerido:** {comando_instalacao}")
+
+    # 2. Dependências
+    if stack['dependencias']:
+        deps_str = ", ".join(stack['dependencias'][:MAX_DEPENDENCIAS_POR_STACK])
+        if len(stack['dependencias']) > MAX_DEPENDENCIAS_POR_STACK or stack.get('dependencias_truncadas'):
+            deps_str += ", ... (e mais)"
+        linhas.append(f"- **Principais Dependências:** {deps_str}")
+    return linhas
+
+def _construir_prompt(contexto: dict, orcamento_tokens: int = ORCAMENTO_TOKENS_PROMPT,
+                      readme_anterior: str | None = None, resumos: dict[str, str] | None = None) -> str:
+    """
+    Monta o prompt (veja _montar_prompt) medindo tempo e tamanho para a telemetria.
+    Com 'readme_anterior' e um contexto com 'mudancas' (reanálise), monta o
+    prompt de atualização (veja _montar_prompt_atualizacao).
+    Com 'resumos' (caminho da stack -> resumo, do map-reduce), os resumos
+    entram no lugar das amostras de código.
+    """
+    atualizacao = _e_atualizacao(contexto, readme_anterior)
+    with telemetria.span("prompt", orcamento_tokens=orcamento_tokens, atualizacao=atualizacao,
+                         map_reduce=resumos is not None):
+        if atualizacao:
+            return _montar_prompt_atualizacao(contexto, readme_anterior, orcamento_tokens, resumos)
+        return _montar_prompt(contexto, orcamento_tokens, resumos)
+
+def _e_atualizacao(contexto: dict, readme_anterior: str | None) -> bool:
+    return bool(readme_anterior) and "mudancas" in contexto
+
+def _linhas_mudancas(mudancas: dict) -> list[str]:
+    """Descreve para a IA o resumo de analyzer.resumir_mudancas."""
+    linhas = []
+    for stack in mudancas["stacks_adicionadas"]:
+        linhas.append(f"- Nova stack: {stack['tecnologia']} em ./{stack['caminho']}")
+    for stack in mudancas["stacks_removidas"]:
+        linhas.append(f"- Stack removida: {stack['tecnologia']} em ./{stack['caminho']}")
+    for caminho, deps in mudancas["dependencias"].items():
+        if deps["adicionadas"]:
+            linhas.append(f"- Dependências novas em ./{caminho}: {', '.join(deps['adicionadas'])}")
+        if deps["removidas"]:
+            linhas.append(f"- Dependências removidas em ./{caminho}: {', '.join(deps['removidas'])}")
+    for caminho in mudancas["codigo_alterado"]:
+        linhas.append(f"- O código principal da stack em ./{caminho} mudou (veja a amostra acima).")
+    estrutura = mudancas["estrutura_raiz"]
+    if estrutura["adicionados"]:
+        linhas.append(f"- Novos itens na raiz: {', '.join(estrutura['adicionados'])}")
+    if estrutura["removidos"]:
+        linhas.append(f"- Itens removidos da raiz: {', '.join(estrutura['removidos'])}")
+    return linhas
+
+def _truncar_readme(readme: str, max_tokens: int) -> str:
+    """
+    Corta o README para caber em 'max_tokens', descartando seções inteiras
+    do final (ou linhas, se nem a primeira seção couber).
+    """
+    if estimar_tokens(readme) <= max_tokens:
+        return readme
+    aviso = "\n\n... (README truncado por tamanho: as seções seguintes foram omitidas)"
+    limite = max(0, max_tokens * CARACTERES_POR_TOKEN - len(aviso))
+    secoes = [m.start() for m in re.finditer(r"^#", readme, re.M) if 0 < m.start() <= limite]
+    corte = secoes[-1] if secoes else readme.rfind("\n", 0, limite)
+    return readme[:corte if corte > 0 else limite].rstrip() + aviso
+
+def _montar_prompt_atualizacao(contexto: dict, readme_anterior: str, orcamento_tokens: int,
+                               resumos: dict[str, str] | None = None) -> str:
+    """
+    Prompt para atualizar um README existente: as informações atuais do
+    repositório (o mesmo prompt de _montar_prompt), o README atual e as
+    mudanças desde a última análise. A IA reescreve só as seções afetadas e
+    copia as demais. Tudo cabe em 'orcamento_tokens': o README atual fica com
+    no máximo metade do que sobra das instruções (cortado por seções, veja
+    _truncar_readme) e o contexto com o resto.
+    """
+    def montar_extra(readme: str) -> str:
+        return "\n".join([
+            "\n---",
+            "**ATUALIZAÇÃO (substitui a tarefa acima):**",
+            "Este repositório já tem o README abaixo, gerado a partir de uma versão anterior do código.",
+            "**Mudanças desde então:**",
+            *_linhas_mudancas(contexto["mudancas"]),
+            "\n**README atual:**",
+            readme,
+            "\n**Sua Tarefa (Atualizar o README):**",
+            "Reescreva SOMENTE as seções afetadas pelas mudanças (ex: Stack de Tecnologias, Instalação, "
+            "Como Usar), usando as Informações Coletadas acima. Copie as demais seções exatamente como estão. "
+            "Devolva o README.md completo, sem preâmbulo.",
+        ])
+
+    # +1: a quebra de linha entre o contexto e a atualização
+    disponivel = max(0, orcamento_tokens - estimar_tokens(montar_extra("")) - 1)
+    readme = _truncar_readme(readme_anterior, disponivel - disponivel // 2)
+    prompt_contexto = _montar_prompt(contexto, disponivel - estimar_tokens(readme), resumos)
+    # O contexto pode passar da sua parte (as instruções fixas não encolhem): o README cede o excesso
+    excesso = estimar_tokens(prompt_contexto) + 1 + estimar_tokens(montar_extra(readme)) - orcamento_tokens
+    if excesso > 0:
+        readme = _truncar_readme(readme, max(0, estimar_tokens(readme) - excesso))
+    return prompt_contexto + "\n" + montar_extra(readme)
+
+def _montar_prompt(contexto: dict, orcamento_tokens: int, resumos: dict[str, str] | None = None) -> str:
+    """
+    Monta o "Prompt Mestre" (multi-stack) que será enviado para a IA,
+    respeitando um orçamento global de tokens:
+    - as stacks são ordenadas por importância (raiz primeiro, depois por nº de dependências);
+    - cada stack recebe seus dados básicos (tecnologia, instalação, dependências);
+    - o que sobra do orçamento é dividido entre as amostras de código, já
+      resumidas a imports, assinaturas e docstrings (no map-reduce, entre os
+      resumos de cada stack; uma stack sem resumo volta a usar a amostra).
     """
     print("Construindo prompt multi-stack para a IA...")
     
+    estrutura = contexto['estrutura_arquivos_raiz']
+    estrutura_str = ', '.join(estrutura[:MAX_ITENS_ESTRUTURA])
+    if len(estrutura) > MAX_ITENS_ESTRUTURA:
+        estrutura_str += f", ... (+{len(estrutura) - MAX_ITENS_ESTRUTURA} itens)"
+
     # --- Persona e Regras (Sem mudança) ---
     prompt_lines = [
         "Você é um Engenheiro de Software Sênior e um excelente escritor técnico.",
@@ -69,46 +375,13 @@ def _construir_prompt(contexto: dict) -> str:
         "\n---",
         "**Informações Coletadas (Geral):**",
         f"- **URL:** {contexto['url_repo']}",
-        f"- **Estrutura da Raiz:** {', '.join(contexto['estrutura_arquivos_raiz'])}",
+        f"- **Estrutura da Raiz:** {estrutura_str}",
         f"- **Stacks Encontradas:** {len(contexto['stacks'])} (Este é um projeto multi-stack, "
         "provavelmente com frontend e backend.)"
     ]
 
-    # --- LÓGICA MULTI-STACK (A GRANDE MUDANÇA) ---
-    # Itera por cada stack (ex: Frontend, Backend)
-    for i, stack in enumerate(contexto['stacks'], 1):
-        
-        caminho_stack = stack['caminho']
-        if caminho_stack == ".":
-            nome_stack_display = "Raiz (Frontend)" # Suposição
-        else:
-            nome_stack_display = f"{caminho_stack.capitalize()} (Backend)" # Suposição
-
-        prompt_lines.append(f"\n--- Detalhes da Stack {i} ({nome_stack_display}) ---")
-        prompt_lines.append(f"- **Tecnologia:** {stack['tecnologia']}")
-        
-        # 1. Comando de Instalação
-        comando_instalacao = _get_comando_instalacao(stack)
-        prompt_lines.append(f"- **Comando de Instalação Sugerido:** {comando_instalacao}")
-
-        # 2. Dependências
-        if stack['dependencias']:
-            deps_str = ", ".join(stack['dependencias'][:15]) # Limita a 15 por stack
-            if len(stack['dependencias']) > 15:
-                deps_str += ", ... (e mais)"
-            prompt_lines.append(f"- **Principais Dependências:** {deps_str}")
-        
-        # 3. Código Principal
-        if stack.get('codigo_principal'):
-            arquivo_lido = stack['codigo_principal']['arquivo']
-            conteudo_codigo = stack['codigo_principal']['conteudo']
-            prompt_lines.append(
-                f"\n- **Amostra do Código-Fonte (`{arquivo_lido}`):**\n"
-                f"```\n{conteudo_codigo}\n```"
-            )
-
     # --- Tarefa Final (Instruções Multi-Stack) ---
-    prompt_lines.extend([
+    linhas_tarefa = [
         "\n---",
         "**Sua Tarefa (Gerar o README):**",
         "Agora, gere o arquivo README.md completo. O README deve conter:",
@@ -121,34 +394,453 @@ def _construir_prompt(contexto: dict) -> str:
         "Use o 'Comando de Instalação Sugerido' para cada stack.)",
         "6.  **Como Usar** (Crie subseções, ex: `### Rodando o Frontend` e `### Rodando o Backend`. "
         "Tente inferir os comandos, como `npm run dev` ou `uvicorn app.main:api`).",
-    ])
-    
-    return "\n".join(prompt_lines)
+    ]
+
+    restante = orcamento_tokens - estimar_tokens("\n".join(prompt_lines + linhas_tarefa))
+
+    # --- LÓGICA MULTI-STACK (com orçamento) ---
+    # 1. Dados básicos de cada stack, por ordem de importância
+    stacks_ordenadas = _ordenar_por_importancia(contexto['stacks'])
+    blocos = []
+    omitidas = []
+    for stack in stacks_ordenadas:
+        linhas = _linhas_base_stack(len(blocos) + 1, stack)
+        custo = estimar_tokens("\n".join(linhas))
+        if custo > restante:
+            omitidas.append(stack)
+            continue
+        restante -= custo
+        blocos.append((stack, linhas))
+
+    # 2. Amostras de código (ou resumos): cada stack pode usar sua fatia do que
+    #    sobrou; o que uma stack não usa fica para as seguintes
+    resumos = resumos or {}
+    com_codigo = [(stack, linhas) for stack, linhas in blocos
+                  if stack['caminho'] in resumos or stack.get('codigo_principal')]
+    for posicao, (stack, linhas) in enumerate(com_codigo):
+        resumo_stack = resumos.get(stack['caminho'])
+        if resumo_stack:
+            cabecalho, rodape = "\n- **Resumo da Stack:**\n", ""
+        else:
+            arquivo_lido = stack['codigo_principal']['arquivo']
+            cabecalho = f"\n- **Amostra do Código-Fonte (`{arquivo_lido}`, resumida):**\n```\n"
+            rodape = "\n```"
+        fatia = restante // (len(com_codigo) - posicao)
+        disponivel = fatia - estimar_tokens(cabecalho + rodape)
+        if disponivel < MIN_TOKENS_AMOSTRA:
+            continue
+
+        if resumo_stack:
+            resumo, disponivel = resumo_stack, min(disponivel, MAX_TOKENS_RESUMO)
+        else:
+            resumo = _resumir_codigo(arquivo_lido, stack['codigo_principal']['conteudo'])
+        amostra = cabecalho + _truncar_para_tokens(resumo, disponivel) + rodape
+        linhas.append(amostra)
+        restante -= estimar_tokens(amostra)
+
+    for _, linhas in blocos:
+        prompt_lines.extend(linhas)
+
+    if omitidas:
+        titulo = f"\n- **Outras {len(omitidas)} stacks (sem detalhes, por limite de tamanho)**"
+        resumo_omitidas = ", ".join(f"{s['tecnologia']} em ./{s['caminho']}" for s in omitidas)
+        disponivel = restante - estimar_tokens(titulo)
+        if disponivel >= MIN_TOKENS_AMOSTRA:
+            titulo += ": " + _truncar_para_tokens(resumo_omitidas, disponivel)
+        prompt_lines.append(titulo)
+
+    prompt_lines.extend(linhas_tarefa)
+    prompt = "\n".join(prompt_lines)
+
+    tokens = estimar_tokens(prompt)
+    telemetria.definir(caracteres=len(prompt), tokens_estimados=tokens,
+                       stacks_detalhadas=len(blocos), stacks_omitidas=len(omitidas))
+    print(f"Prompt final: ~{tokens} tokens (orçamento: {orcamento_tokens}).")
+    return prompt
 
-def gerar_readme(contexto: dict) -> str:
+def _usar_map_reduce(contexto: dict, map_reduce: bool | None) -> bool:
+    """None = automático: map-reduce a partir de MIN_STACKS_MAP_REDUCE stacks."""
+    if map_reduce is None:
+        return 0 < MIN_STACKS_MAP_REDUCE <= len(contexto['stacks'])
+    return map_reduce
+
+def _montar_prompt_resumo(url_repo: str, stack: dict, orcamento_tokens: int = ORCAMENTO_TOKENS_RESUMO) -> str:
     """
-    Função principal: configura a IA, constrói o prompt e gera o README.
+    Prompt da primeira etapa do map-reduce: resume UMA stack. Usa só os dados
+    da própria stack (e a URL), então o resumo em cache continua valendo
+    enquanto a stack não mudar, mesmo que o resto do repositório mude.
+    """
+    linhas = [
+        "Você é um Engenheiro de Software Sênior e um excelente escritor técnico.",
+        f"Estou escrevendo o README do repositório {url_repo}, que tem várias stacks. "
+        "Resuma a stack abaixo; o resumo será usado depois para montar o README.",
+        f"\n--- Stack em ./{stack['caminho']} ---",
+        *_linhas_base_stack(1, stack)[1:],
+    ]
+    linhas_tarefa = [
+        "\n**Sua Tarefa (Resumir a Stack):**",
+        f"Em no máximo {MAX_PALAVRAS_RESUMO} palavras, em tópicos Markdown, descreva o papel desta stack "
+        "no projeto, as principais funcionalidades que o código sugere e como instalá-la e rodá-la. "
+        "Baseie-se **estritamente** nas informações acima. Sem título e sem preâmbulo.",
+    ]
+
+    codigo = stack.get('codigo_principal')
+    if codigo:
+        cabecalho = f"\n- **Amostra do Código-Fonte (`{codigo['arquivo']}`, resumida):**\n```\n"
+        rodape = "\n```"
+        disponivel = orcamento_tokens - estimar_tokens("\n".join(linhas + linhas_tarefa) + cabecalho + rodape)
+        if disponivel >= MIN_TOKENS_AMOSTRA:
+            resumo = _resumir_codigo(codigo['arquivo'], codigo['conteudo'])
+            linhas.append(cabecalho + _truncar_para_tokens(resumo, disponivel) + rodape)
+
+    return "\n".join(linhas + linhas_tarefa)
+
+def _limpar_resposta(texto: str) -> str:
+    """Tira as cercas de ```markdown de uma resposta completa."""
+    removedor = _RemovedorCercas()
+    return (removedor.alimentar(texto) + removedor.finalizar()).strip()
+
+def _preparar_resumos(contexto: dict, nome_modelo: str, usar_cache: bool) -> tuple[dict, dict]:
     """
-    model = _configurar_ia()
-    if not model:
-        return "Erro: Não foi possível configurar o modelo de IA."
+    Monta o prompt de cada stack e consulta o cache de resumos.
+    Retorna (resumos em cache, {caminho: (prompt, chave)} das stacks a resumir).
+    """
+    resumos = {}
+    pendentes = {}
+    for stack in contexto['stacks']:
+        prompt = _montar_prompt_resumo(contexto['url_repo'], stack)
+        chave = _chave_resposta(prompt, nome_modelo)
+        em_cache = _cache_resumos.obter(chave) if usar_cache else None
+        if em_cache is not None:
+            resumos[stack['caminho']] = em_cache
+        else:
+            pendentes[stack['caminho']] = (prompt, chave)
+    if pendentes:
+        print(f"Resumindo {len(pendentes)} stacks em paralelo ({len(resumos)} resumos em cache)...")
+    else:
+        print(f"Resumos das {len(resumos)} stacks encontrados em cache.")
+    return resumos, pendentes
+
+def _gerar_resumo(cliente: cliente_ia.ClienteModelo, caminho: str, prompt: str, chave: str) -> str | None:
+    """Resume uma stack (numa thread do pool). Retorna None se a IA falhar."""
+    with telemetria.span("geracao.resumo", caminho=caminho, tokens_prompt=estimar_tokens(prompt)) as s:
+        try:
+            resumo = _limpar_resposta(cliente.gerar(prompt))
+        except Exception as e:
+            print(f"Falha ao resumir a stack ./{caminho}: {e}")
+            s.marcar_erro(e)
+            return None
+        s.definir(caracteres_resposta=len(resumo))
+    if not resumo:
+        return None
+    _cache_resumos.gravar(chave, resumo)
+    return resumo
+
+def _resumir_stacks(contexto: dict, cliente: cliente_ia.ClienteModelo, nome_modelo: str,
+                    usar_cache: bool = True) -> dict[str, str]:
+    """
+    Primeira etapa do map-reduce: um resumo curto por stack (caminho -> resumo).
+    As chamadas rodam em paralelo (até MAX_RESUMOS_SIMULTANEOS, além dos
+    limites do cliente), então o tempo é o da stack mais lenta, e não a soma.
+    Stacks cujo resumo falhar ficam de fora: o prompt final usa a amostra de código delas.
+    """
+    with telemetria.span("geracao.resumos", stacks=len(contexto['stacks'])) as s:
+        resumos, pendentes = _preparar_resumos(contexto, nome_modelo, usar_cache)
+        s.definir(resumos_em_cache=len(resumos), chamadas=len(pendentes))
+        if pendentes and cliente.obter_modelo():
+            with ThreadPoolExecutor(max_workers=max(1, min(MAX_RESUMOS_SIMULTANEOS, len(pendentes))),
+                                    thread_name_prefix="readme-ai-resumo") as executor:
+                futuros = {
+                    caminho: executor.submit(telemetria.no_contexto_atual(_gerar_resumo),
+                                             cliente, caminho, prompt, chave)
+                    for caminho, (prompt, chave) in pendentes.items()
+                }
+                for caminho, futuro in futuros.items():
+                    resumo = futuro.result()
+                    if resumo:
+                        resumos[caminho] = resumo
+        s.definir(falhas=len(contexto['stacks']) - len(resumos))
+    return resumos
+
+async def _resumir_stacks_async(contexto: dict, cliente: cliente_ia.ClienteModeloAsync, nome_modelo: str,
+                                usar_cache: bool = True) -> dict[str, str]:
+    """Versão asyncio de _resumir_stacks (tarefas com um asyncio.Semaphore no lugar do pool)."""
+    with telemetria.span("geracao.resumos", stacks=len(contexto['stacks'])) as s:
+        resumos, pendentes = await asyncio.to_thread(_preparar_resumos, contexto, nome_modelo, usar_cache)
+        s.definir(resumos_em_cache=len(resumos), chamadas=len(pendentes))
+        if pendentes and await asyncio.to_thread(cliente.obter_modelo):
+            semaforo = asyncio.Semaphore(max(1, MAX_RESUMOS_SIMULTANEOS))
+
+            async def resumir(caminho: str, prompt: str, chave: str) -> tuple[str, str | None]:
+                async with semaforo:
+                    with telemetria.span("geracao.resumo", caminho=caminho,
+                                         tokens_prompt=estimar_tokens(prompt)) as s_resumo:
+                        try:
+                            resumo = _limpar_resposta(await cliente.gerar(prompt))
+                        except Exception as e:
+                            print(f"Falha ao resumir a stack ./{caminho}: {e}")
+                            s_resumo.marcar_erro(e)
+                            return caminho, None
+                        s_resumo.definir(caracteres_resposta=len(resumo))
+                if resumo:
+                    await asyncio.to_thread(_cache_resumos.gravar, chave, resumo)
+                return caminho, resumo or None
+
+            for caminho, resumo in await asyncio.gather(
+                *(resumir(caminho, prompt, chave) for caminho, (prompt, chave) in pendentes.items())
+            ):
+                if resumo:
+                    resumos[caminho] = resumo
+        s.definir(falhas=len(contexto['stacks']) - len(resumos))
+    return resumos
+
+def _chave_resposta(prompt: str, nome_modelo: str = NOME_MODELO, config: dict | None = None) -> str:
+    """
+    Chave do cache de respostas: o mesmo prompt, no mesmo modelo e com as
+    mesmas configurações de geração, produz a mesma chave.
+    """
+    config_str = json.dumps(CONFIG_GERACAO if config is None else config, sort_keys=True)
+    return cache.gerar_chave(nome_modelo, config_str, prompt)
+
+def chave_prompt(contexto: dict, nome_modelo: str = NOME_MODELO, map_reduce: bool | None = None) -> str:
+    """
+    Hash das entradas que determinam a geração: o modo (uma etapa ou
+    map-reduce), o hash de cada stack, a raiz, os orçamentos, VERSAO_PROMPTS,
+    o modelo e as configurações. Se ele não mudou, o README gerado também não
+    mudaria. Não monta nenhum prompt: o final do map-reduce depende dos
+    resumos, que só existem depois de chamar a IA.
+    """
+    usar_map_reduce = _usar_map_reduce(contexto, map_reduce)
+    orcamentos = (ORCAMENTO_TOKENS_PROMPT, ORCAMENTO_TOKENS_RESUMO if usar_map_reduce else None)
+    stacks = [cache.gerar_chave(json.dumps(stack, sort_keys=True)) for stack in contexto['stacks']]
+    return cache.gerar_chave(
+        nome_modelo, json.dumps(CONFIG_GERACAO, sort_keys=True), VERSAO_PROMPTS,
+        "map_reduce" if usar_map_reduce else "unica", orcamentos, contexto['url_repo'],
+        json.dumps(contexto['estrutura_arquivos_raiz']), *stacks,
+    )
+
+def estatisticas_cache() -> dict:
+    """Acertos, falhas e tamanho do cache de respostas da IA."""
+    return _cache_respostas.estatisticas()
+
+class _RemovedorCercas:
+    """
+    Versão incremental de
+        texto.strip().removeprefix("```markdown").removesuffix("```").strip()
+    para respostas que chegam em pedaços: segura o começo até saber se é a
+    cerca de abertura e segura o final que ainda pode ser a cerca de fechamento.
+    """
+
+    def __init__(self):
+        self._pendente = ""
+        self._inicio_resolvido = False
+        self._aguardando_conteudo = True
+
+    def alimentar(self, trecho: str) -> str:
+        """Recebe um pedaço da resposta e devolve o que já pode ser exibido."""
+        self._pendente += trecho
+
+        if not self._inicio_resolvido:
+            texto = self._pendente.lstrip()
+            if len(texto) < len(PREFIXO_CERCA) and PREFIXO_CERCA.startswith(texto):
+                self._pendente = texto
+                return ""  # Ainda pode ser a cerca de abertura
+            self._pendente = texto.removeprefix(PREFIXO_CERCA)
+            self._inicio_resolvido = True
+
+        if self._aguardando_conteudo:
+            self._pendente = self._pendente.lstrip()
+            if not self._pendente:
+                return ""
+            self._aguardando_conteudo = False
 
-    prompt_mestre = _construir_prompt(contexto)
+        corte = _RE_CAUDA_CERCA.search(self._pendente).start()
+        saida, self._pendente = self._pendente[:corte], self._pendente[corte:]
+        return saida
+
+    def finalizar(self) -> str:
+        """Devolve o que restou, já sem a cerca de fechamento."""
+        texto = self._pendente.lstrip() if self._aguardando_conteudo else self._pendente
+        self._pendente = ""
+        return texto.rstrip().removesuffix(SUFIXO_CERCA).rstrip()
+
+
+def gerar_readme_stream(contexto: dict, usar_cache: bool = True, model=None,
+                        cliente: cliente_ia.ClienteModelo | None = None,
+                        readme_anterior: str | None = None, map_reduce: bool | None = None) -> Iterator[str]:
+    """
+    Versão em streaming de gerar_readme: devolve o README em pedaços, à medida
+    que a IA responde, já sem as cercas de ```markdown.
+    Respostas são reaproveitadas do cache quando o prompt é idêntico
+    (use usar_cache=False para forçar uma nova geração).
+    A chamada passa pelo cliente compartilhado (obter_cliente), que limita a
+    taxa, repete falhas temporárias e agrupa prompts idênticos em andamento.
+    'model' (um stub com generate_content) ou 'cliente' permitem testes offline.
+
+    Com 'readme_anterior' e um contexto reanalisado (chave 'mudancas'), a IA
+    só reescreve as seções afetadas; se nada relevante mudou, o README
+    anterior é devolvido sem chamar a IA.
+
+    Com 'map_reduce' (None = automático, veja MIN_STACKS_MAP_REDUCE), cada
+    stack é resumida antes, em paralelo (_resumir_stacks), e o README sai de
+    uma chamada final menor, montada com os resumos.
+    """
+    if _e_atualizacao(contexto, readme_anterior) and not contexto["mudancas"]["relevante"]:
+        print("Nenhuma mudança relevante para o README: mantendo o atual.")
+        telemetria.iniciar_span("geracao", cache="inalterado", caracteres_resposta=len(readme_anterior)).finalizar()
+        yield readme_anterior
+        return
+
+    nome_modelo = getattr(model, "model_name", None) or NOME_MODELO
+    if cliente is None:
+        cliente = cliente_ia.ClienteModelo(modelo=model) if model is not None else obter_cliente()
+
+    resumos = None
+    if _usar_map_reduce(contexto, map_reduce):
+        resumos = _resumir_stacks(contexto, cliente, nome_modelo, usar_cache)
+
+    prompt_mestre = _construir_prompt(contexto, readme_anterior=readme_anterior, resumos=resumos)
     
     # Descomente para depurar o prompt gigante que estamos enviando
     # print("\n--- PROMPT ENVIADO À IA ---")
     # print(prompt_mestre)
     # print("----------------------------\n")
+
+    chave = _chave_resposta(prompt_mestre, nome_modelo)
+    if usar_cache:
+        readme_em_cache = _cache_respostas.obter(chave)
+        if readme_em_cache is not None:
+            print("README encontrado em cache (prompt idêntico já gerado).")
+            telemetria.iniciar_span("geracao", cache="acerto", caracteres_resposta=len(readme_em_cache)).finalizar()
+            yield readme_em_cache
+            return
+
+    if not cliente.obter_modelo():
+        yield ERRO_CONFIGURACAO
+        return
     
     print("Gerando README... (Isso pode levar alguns segundos)")
     
+    removedor = _RemovedorCercas()
+    partes = []
+    # Span manual (sem virar o span atual): este é um gerador
+    s = telemetria.iniciar_span("geracao", cache="falha" if usar_cache else "desativado",
+                                modelo=nome_modelo, tokens_prompt=estimar_tokens(prompt_mestre))
     try:
-        response = model.generate_content(prompt_mestre)
-        
-        readme_texto = response.text.strip().removeprefix("```markdown").removesuffix("```").strip()
-        
-        return readme_texto
+        for texto_chunk in cliente.gerar_stream(prompt_mestre):
+            if "tempo_primeiro_trecho_s" not in s.atributos:
+                s.definir(tempo_primeiro_trecho_s=round(s.decorrido(), 3))
+            trecho = removedor.alimentar(texto_chunk)
+            if trecho:
+                partes.append(trecho)
+                yield trecho
+
+        trecho = removedor.finalizar()
+        if trecho:
+            partes.append(trecho)
+            yield trecho
     
     except Exception as e:
         print(f"Erro ao gerar conteúdo pela IA: {e}")
-        return f"# Erro ao gerar README\n\nInfelizmente, a API do Gemini falhou.\nDetalhe: {e}"
\ No newline at end of file
+        s.marcar_erro(e)
+        separador = "\n\n" if partes else ""
+        yield f"{separador}{TITULO_ERRO}\n\nInfelizmente, a API do Gemini falhou.\nDetalhe: {e}"
+        return
+    finally:
+        s.definir(caracteres_resposta=sum(len(p) for p in partes))
+        s.finalizar()
+
+    # Uma resposta vazia (ou só com as cercas) não é um README: não vai para o cache
+    readme = "".join(partes)
+    if readme.strip():
+        _cache_respostas.gravar(chave, readme)
+
+async def gerar_readme_stream_async(contexto: dict, usar_cache: bool = True, model=None,
+                                    cliente: cliente_ia.ClienteModeloAsync | None = None,
+                                    readme_anterior: str | None = None,
+                                    map_reduce: bool | None = None) -> AsyncIterator[str]:
+    """
+    Versão asyncio de gerar_readme_stream (mesmo prompt, cache e tratamento
+    de erros). A montagem do prompt e o acesso ao cache em disco rodam numa
+    thread para não travar o event loop.
+    'model' (um stub com generate_content_async) ou 'cliente' permitem testes offline.
+    """
+    if _e_atualizacao(contexto, readme_anterior) and not contexto["mudancas"]["relevante"]:
+        print("Nenhuma mudança relevante para o README: mantendo o atual.")
+        telemetria.iniciar_span("geracao", cache="inalterado", caracteres_resposta=len(readme_anterior)).finalizar()
+        yield readme_anterior
+        return
+
+    nome_modelo = getattr(model, "model_name", None) or NOME_MODELO
+    if cliente is None:
+        cliente = cliente_ia.ClienteModeloAsync(modelo=model) if model is not None else obter_cliente_async()
+
+    resumos = None
+    if _usar_map_reduce(contexto, map_reduce):
+        resumos = await _resumir_stacks_async(contexto, cliente, nome_modelo, usar_cache)
+
+    prompt_mestre = await asyncio.to_thread(_construir_prompt, contexto, ORCAMENTO_TOKENS_PROMPT,
+                                            readme_anterior, resumos)
+
+    chave = _chave_resposta(prompt_mestre, nome_modelo)
+    if usar_cache:
+        readme_em_cache = await asyncio.to_thread(_cache_respostas.obter, chave)
+        if readme_em_cache is not None:
+            print("README encontrado em cache (prompt idêntico já gerado).")
+            telemetria.iniciar_span("geracao", cache="acerto", caracteres_resposta=len(readme_em_cache)).finalizar()
+            yield readme_em_cache
+            return
+
+    if not await asyncio.to_thread(cliente.obter_modelo):
+        yield ERRO_CONFIGURACAO
+        return
+
+    print("Gerando README... (Isso pode levar alguns segundos)")
+
+    removedor = _RemovedorCercas()
+    partes = []
+    # Span manual (sem virar o span atual): este é um gerador
+    s = telemetria.iniciar_span("geracao", cache="falha" if usar_cache else "desativado",
+                                modelo=nome_modelo, tokens_prompt=estimar_tokens(prompt_mestre))
+    try:
+        async for texto_chunk in cliente.gerar_stream(prompt_mestre):
+            if "tempo_primeiro_trecho_s" not in s.atributos:
+                s.definir(tempo_primeiro_trecho_s=round(s.decorrido(), 3))
+            trecho = removedor.alimentar(texto_chunk)
+            if trecho:
+                partes.append(trecho)
+                yield trecho
+
+        trecho = removedor.finalizar()
+        if trecho:
+            partes.append(trecho)
+            yield trecho
+
+    except Exception as e:
+        print(f"Erro ao gerar conteúdo pela IA: {e}")
+        s.marcar_erro(e)
+        separador = "\n\n" if partes else ""
+        yield f"{separador}{TITULO_ERRO}\n\nInfelizmente, a API do Gemini falhou.\nDetalhe: {e}"
+        return
+    finally:
+        s.definir(caracteres_resposta=sum(len(p) for p in partes))
+        s.finalizar()
+
+    readme = "".join(partes)
+    if readme.strip():
+        await asyncio.to_thread(_cache_respostas.gravar, chave, readme)
+
+def readme_falhou(readme_texto: str) -> bool:
+    """Indica se o texto gerado é uma mensagem de erro (ou vazio) em vez de um README."""
+    return not readme_texto.strip() or readme_texto.startswith((ERRO_CONFIGURACAO, TITULO_ERRO)) or \
+        f"\n\n{TITULO_ERRO}\n\nInfelizmente" in readme_texto
+
+def gerar_readme(contexto: dict, usar_cache: bool = True, model=None,
+                 cliente: cliente_ia.ClienteModelo | None = None,
+                 readme_anterior: str | None = None, map_reduce: bool | None = None) -> str:
+    """
+    Função principal: configura a IA, constrói o prompt e gera o README.
+    Retorna o texto completo (veja gerar_readme_stream para receber em pedaços).
+    """
+    return "".join(gerar_readme_stream(contexto, usar_cache=usar_cache, model=model, cliente=cliente,
+                                       readme_anterior=readme_anterior, map_reduce=map_reduce))
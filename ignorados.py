@@ -0,0 +1,196 @@
+import os
+import re
+
+# Arquivos de padrões lidos durante a varredura
+NOME_GITIGNORE = ".gitignore"
+CAMINHO_EXCLUDE = os.path.join(".git", "info", "exclude")
+# Limite de leitura por arquivo de padrões; o que passar disso é ignorado
+MAX_BYTES_PADROES = int(float(os.getenv("README_AI_MAX_GITIGNORE_KB", "256")) * 1024)
+
+_CARACTERES_CORINGA = re.compile(r"[*?\[\\]")
+
+
+def _traduzir(padrao: str) -> str:
+    """
+    Converte um padrão no formato do .gitignore (sem '!' e sem a barra final)
+    para uma expressão regular: '*' e '?' não atravessam '/', '**' atravessa.
+    """
+    partes = []
+    i, n = 0, len(padrao)
+    while i < n:
+        c = padrao[i]
+        if c == "*":
+            if padrao.startswith("**", i):
+                inicio_segmento = i == 0 or padrao[i - 1] == "/"
+                if inicio_segmento and padrao[i + 2:i + 3] == "/":
+                    partes.append("(?:.*/)?")  # '**/' = zero ou mais pastas
+                    i += 3
+                    continue
+                if inicio_segmento and i + 2 == n:
+                    partes.append(".*")  # '/**' no final = tudo dentro da pasta
+                    i += 2
+                    continue
+            while i < n and padrao[i] == "*":
+                i += 1
+            partes.append("[^/]*")
+            continue
+        if c == "?":
+            partes.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and padrao[j] in "!^":
+                j += 1
+            if j < n and padrao[j] == "]":
+                j += 1
+            fim = padrao.find("]", j)
+            if fim == -1:
+                partes.append(re.escape(c))
+            else:
+                classe = padrao[i + 1:fim].replace("\\", "\\\\")
+                if classe[:1] in ("!", "^"):
+                    classe = "^" + classe[1:]
+                partes.append(f"[{classe}]")
+                i = fim
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            partes.append(re.escape(padrao[i]))
+        else:
+            partes.append(re.escape(c))
+        i += 1
+    return "".join(partes)
+
+
+class Padrao:
+    """Uma linha do .gitignore já compilada."""
+
+    __slots__ = ("texto", "negado", "so_diretorio", "ancorado", "literal", "regex")
+
+    def __init__(self, texto: str, negado: bool, so_diretorio: bool, ancorado: bool, corpo: str):
+        self.texto = texto
+        self.negado = negado
+        self.so_diretorio = so_diretorio
+        self.ancorado = ancorado
+        # Padrões sem curinga e sem barra (ex: 'target') viram comparação direta com o nome
+        self.literal = corpo if not ancorado and not _CARACTERES_CORINGA.search(corpo) else None
+        self.regex = None if self.literal is not None else re.compile(_traduzir(corpo) + r"\Z")
+
+    def casa(self, caminho: str, nome: str) -> bool:
+        if self.literal is not None:
+            return nome == self.literal
+        return self.regex.match(caminho if self.ancorado else nome) is not None
+
+
+def compilar_linha(linha: str) -> Padrao | None:
+    """Compila uma linha do .gitignore. Retorna None para linhas vazias e comentários."""
+    linha = linha.rstrip("\r\n")
+    if not linha or linha.startswith("#"):
+        return None
+    # Espaços no final são ignorados, a não ser que escapados com '\'
+    while linha.endswith(" ") and not linha.endswith("\\ "):
+        linha = linha[:-1]
+    negado = linha.startswith("!")
+    if negado:
+        linha = linha[1:]
+    elif linha.startswith(("\\!", "\\#")):
+        linha = linha[1:]
+    so_diretorio = linha.endswith("/")
+    linha = linha.rstrip("/")
+    if not linha:
+        return None
+    # Uma barra no início ou no meio prende o padrão à pasta do .gitignore
+    ancorado = "/" in linha
+    texto = ("!" if negado else "") + linha + ("/" if so_diretorio else "")
+    return Padrao(texto, negado, so_diretorio, ancorado, linha.lstrip("/"))
+
+
+class ConjuntoPadroes:
+    """
+    Os padrões de um arquivo (.gitignore, .git/info/exclude) ou de uma lista
+    configurada, válidos a partir da pasta 'base' (POSIX, '' para a raiz).
+
+    Sem negações ('!'), a ordem não importa: os nomes literais viram um set e
+    os demais padrões são unidos numa única regex por tipo, então cada caminho
+    custa uma consulta ao set e no máximo duas buscas de regex.
+    Com negações, vale a regra do git: o último padrão que casar decide.
+    """
+
+    def __init__(self, linhas, base: str = ""):
+        self.base = base
+        self.padroes = [p for p in map(compilar_linha, linhas) if p is not None]
+        self.tem_negacao = any(p.negado for p in self.padroes)
+        if not self.tem_negacao:
+            self._compilar_uniao()
+
+    def _compilar_uniao(self) -> None:
+        self._literais = {p.literal for p in self.padroes if p.literal is not None and not p.so_diretorio}
+        self._literais_dir = {p.literal for p in self.padroes if p.literal is not None and p.so_diretorio}
+        self._uniao = {}
+        for so_diretorio in (False, True):
+            for ancorado in (False, True):
+                regexes = [p.regex.pattern for p in self.padroes
+                           if p.regex is not None and p.so_diretorio == so_diretorio and p.ancorado == ancorado]
+                if regexes:
+                    self._uniao[(so_diretorio, ancorado)] = re.compile("|".join(f"(?:{r})" for r in regexes))
+
+    def __bool__(self) -> bool:
+        return bool(self.padroes)
+
+    def decidir(self, caminho: str, nome: str, e_diretorio: bool) -> bool | None:
+        """
+        True se o caminho (POSIX, relativo à raiz do repositório) for ignorado,
+        False se for reincluído por uma negação, None se nenhum padrão casar.
+        """
+        if self.base:
+            if not caminho.startswith(self.base + "/"):
+                return None
+            caminho = caminho[len(self.base) + 1:]
+
+        if not self.tem_negacao:
+            if nome in self._literais or (e_diretorio and nome in self._literais_dir):
+                return True
+            for (so_diretorio, ancorado), regex in self._uniao.items():
+                if so_diretorio and not e_diretorio:
+                    continue
+                if regex.match(caminho if ancorado else nome):
+                    return True
+            return None
+
+        for padrao in reversed(self.padroes):
+            if padrao.so_diretorio and not e_diretorio:
+                continue
+            if padrao.casa(caminho, nome):
+                return not padrao.negado
+        return None
+
+
+def compilar_bytes(dados: bytes, base: str = "") -> ConjuntoPadroes | None:
+    """
+    Compila o conteúdo de um arquivo de padrões, lido até MAX_BYTES_PADROES + 1
+    bytes. Se passar do limite, a última linha (cortada) e o resto são ignorados.
+    Retorna None se não houver padrões.
+    """
+    if len(dados) > MAX_BYTES_PADROES:
+        dados = dados[:MAX_BYTES_PADROES].rpartition(b"\n")[0]
+    return ConjuntoPadroes(dados.decode("utf-8", errors="replace").splitlines(), base) or None
+
+
+def ler_arquivo_padroes(caminho: str, base: str = "") -> ConjuntoPadroes | None:
+    """Lê um arquivo de padrões. Retorna None se não existir ou não tiver padrões."""
+    try:
+        with open(caminho, "rb") as f:
+            dados = f.read(MAX_BYTES_PADROES + 1)
+    except OSError:
+        return None
+    return compilar_bytes(dados, base)
+
+
+def esta_ignorado(conjuntos, caminho: str, nome: str, e_diretorio: bool) -> bool:
+    """
+    Aplica os conjuntos em ordem de precedência (o último da lista, ou seja,
+    o .gitignore mais próximo do caminho, tem a palavra final).
+    """
+    for conjunto in reversed(conjuntos):
+        decisao = conjunto.decidir(caminho, nome, e_diretorio)
+        if decisao is not None:
+            return decisao
+    return False
@@ -0,0 +1,436 @@
+# Ingestão de um repositório a partir de um arquivo compactado (.zip, .tar.gz),
+# local ou por URL (ex: https://codeload.github.com/dono/repo/zip/refs/heads/main),
+# sem git e sem gravar nada no disco.
+#
+# - zip: o índice vem do diretório central, no fim do arquivo. Por HTTP, ele e
+#   cada arquivo que o analyzer abre são buscados com requisições Range; o resto
+#   do arquivo nunca é baixado.
+# - tar.gz: não tem índice. O fluxo é lido uma única vez, guardando na memória
+#   só os candidatos (manifestos, entry points e .gitignore), com limite por arquivo.
+import io
+import os
+import re
+import abc
+import codecs
+import tarfile
+import zipfile
+import threading
+from urllib.parse import urlsplit
+import analyzer
+import ignorados
+import manifestos
+import telemetria
+
+# Extensões reconhecidas como arquivo compactado (além das URLs do codeload do GitHub)
+EXTENSOES_ARQUIVO = (".zip", ".tar.gz", ".tgz", ".tar")
+_RE_CODELOAD = re.compile(r"^https?://codeload\.github\.com/[^/]+/[^/]+/(legacy\.)?(zip|tar\.gz)/", re.I)
+
+# Limite do que é baixado/lido do arquivo compactado (protege contra arquivos enormes)
+MAX_ARQUIVO_MB = float(os.getenv("README_AI_INGESTAO_MAX_MB", "500"))
+MAX_BYTES_ARQUIVO = int(MAX_ARQUIVO_MB * 1024 * 1024)
+TIMEOUT_HTTP_S = float(os.getenv("README_AI_INGESTAO_TIMEOUT_S", "30"))
+# Tamanho de cada requisição Range (e do buffer de leitura do zip remoto)
+TAMANHO_BLOCO_HTTP = 64 * 1024
+FORMATO_ZIP = "zip"
+FORMATO_TAR = "tar"
+
+
+def e_arquivo_compactado(origem: str) -> bool:
+    """Indica se 'origem' (caminho ou URL) aponta para um .zip/.tar.gz em vez de um repositório git."""
+    caminho = urlsplit(origem).path if "://" in origem else origem
+    return caminho.lower().endswith(EXTENSOES_ARQUIVO) or bool(_RE_CODELOAD.match(origem))
+
+
+def _e_url(origem: str) -> bool:
+    return origem.lower().startswith(("http://", "https://"))
+
+
+def _requisitar(url: str, intervalo: str | None = None, timeout: float = TIMEOUT_HTTP_S):
+    """GET em 'url' (com 'intervalo', ex: '0-3', vira um pedido Range)."""
+    # urllib.request (http.client, ssl, email...) só é importado ao baixar algo:
+    # o main importa este módulo em toda execução para reconhecer arquivos compactados
+    import urllib.request
+    cabecalhos = {"Range": f"bytes={intervalo}"} if intervalo else {}
+    return urllib.request.urlopen(urllib.request.Request(url, headers=cabecalhos), timeout=timeout)
+
+
+def _formato(cabecalho: bytes) -> str:
+    """Formato pelo início do arquivo (zip: 'PK'); o resto é tentado como tar (gz, bz2, xz ou puro)."""
+    return FORMATO_ZIP if cabecalho.startswith(b"PK") else FORMATO_TAR
+
+
+def _normalizar_nome(nome: str) -> str:
+    nome = nome.replace("\\", "/")
+    while nome.startswith(("./", "/")):
+        nome = nome[1:] if nome.startswith("/") else nome[2:]
+    return nome
+
+
+def _prefixo_comum(nomes: list[str]) -> str:
+    """
+    A pasta única no topo do arquivo (ex: 'repo-main/' nos arquivos do GitHub),
+    que vira a raiz do repositório. '' se houver mais de um item no topo.
+    """
+    topos = set()
+    tem_subitens = False
+    for nome in nomes:
+        topo, _, resto = nome.partition("/")
+        topos.add(topo)
+        if len(topos) > 1:
+            return ""
+        tem_subitens = tem_subitens or bool(resto.strip("/"))
+    return f"{topos.pop()}/" if topos and tem_subitens else ""
+
+
+class _FluxoLimitado:
+    """Repassa as leituras de 'fluxo', contando os bytes; acima de 'limite', levanta ValueError."""
+
+    def __init__(self, fluxo, limite: int = MAX_BYTES_ARQUIVO):
+        self._fluxo = fluxo
+        self.limite = limite
+        self.lidos = 0
+
+    def read(self, n: int = -1) -> bytes:
+        dados = self._fluxo.read(n)
+        self.lidos += len(dados)
+        if self.lidos > self.limite:
+            raise ValueError(f"O arquivo compactado passa do limite de {MAX_ARQUIVO_MB:g} MB.")
+        return dados
+
+
+class ArquivoHTTP(io.RawIOBase):
+    """
+    Arquivo remoto somente leitura, com seek, lido por requisições HTTP Range.
+    Só os trechos pedidos são baixados. Use dentro de um io.BufferedReader
+    (veja abrir_url_com_seek), que junta as leituras pequenas em blocos.
+    """
+
+    def __init__(self, url: str, tamanho: int, timeout: float = TIMEOUT_HTTP_S):
+        self.url = url
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self._posicao = 0
+        self.requisicoes = 0
+        self.bytes_baixados = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def seek(self, deslocamento: int, de_onde: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._posicao, io.SEEK_END: self.tamanho}[de_onde]
+        self._posicao = max(0, base + deslocamento)
+        return self._posicao
+
+    def readinto(self, destino) -> int:
+        if self._posicao >= self.tamanho or not len(destino):
+            return 0
+        fim = min(self._posicao + len(destino), self.tamanho) - 1
+        with _requisitar(self.url, f"{self._posicao}-{fim}", self.timeout) as resposta:
+            if resposta.status != 206:
+                raise OSError(f"O servidor ignorou o cabeçalho Range (HTTP {resposta.status}).")
+            dados = resposta.read(fim - self._posicao + 1)
+        self.requisicoes += 1
+        self.bytes_baixados += len(dados)
+        destino[:len(dados)] = dados
+        self._posicao += len(dados)
+        return len(dados)
+
+    def readall(self) -> bytes:
+        # Uma única requisição até o fim (o padrão leria em pedaços de 8 KB)
+        destino = bytearray(max(0, self.tamanho - self._posicao))
+        lidos = self.readinto(destino)
+        return bytes(destino[:lidos])
+
+
+def _sondar_url(url: str):
+    """
+    Pede os primeiros bytes com Range. Retorna (formato, tamanho total ou None,
+    resposta): com Range aceito (206) a resposta já vem fechada; senão (200), ela
+    fica aberta, posicionada logo após os bytes já lidos do início do arquivo.
+    """
+    resposta = _requisitar(url, "0-3")
+    cabecalho = resposta.read(4)
+    if resposta.status == 206:
+        intervalo = resposta.headers.get("Content-Range", "")
+        resposta.close()
+        total = intervalo.rpartition("/")[2]
+        return _formato(cabecalho), int(total) if total.isdigit() else None, None
+    return _formato(cabecalho), None, _FluxoComInicio(cabecalho, resposta)
+
+
+class _FluxoComInicio:
+    """Devolve 'inicio' (bytes já lidos para descobrir o formato) e depois o resto de 'fluxo'."""
+
+    def __init__(self, inicio: bytes, fluxo):
+        self._inicio = inicio
+        self._fluxo = fluxo
+
+    def read(self, n: int = -1) -> bytes:
+        if self._inicio:
+            if n is None or n < 0:
+                dados, self._inicio = self._inicio + self._fluxo.read(), b""
+                return dados
+            dados, self._inicio = self._inicio[:n], self._inicio[n:]
+            return dados
+        return self._fluxo.read(n)
+
+    def close(self) -> None:
+        self._fluxo.close()
+
+
+class RepoIndexCompactado(analyzer.RepoIndex, abc.ABC):
+    """
+    RepoIndex montado a partir da lista de membros de um arquivo compactado
+    (sem working tree e sem git). A pasta única no topo (ex: 'repo-main/')
+    vira a raiz. As subclasses dizem como ler o conteúdo de um membro (_ler).
+    """
+
+    formato = None
+
+    def __init__(self, origem: str, membros: list[tuple[str, bool, int]],
+                 config: analyzer.ConfigVarredura | None = None):
+        self.origem = origem
+        self._conteudo: dict[str, list[tuple[str, bool, bool]]] = {".": []}
+        self._membros: dict[str, str] = {}
+        self._tamanhos_membros: dict[str, int] = {}
+        self.bytes_lidos = 0
+        self.arquivos_lidos = 0
+        self._lock_leitura = threading.Lock()
+
+        prefixo = _prefixo_comum([nome for nome, _, _ in membros])
+        for nome, e_diretorio, tamanho in membros:
+            caminho = nome[len(prefixo):].strip("/")
+            partes = caminho.split("/")
+            # Entradas como '../x' ou 'a//b' não têm lugar num checkout
+            if not caminho or any(parte in ("", ".", "..") for parte in partes):
+                continue
+            self._registrar(caminho, e_diretorio, tamanho, nome)
+        super().__init__(origem, config)
+
+    def _registrar(self, caminho: str, e_diretorio: bool, tamanho: int = 0, nome_membro: str | None = None) -> None:
+        pasta, _, nome = caminho.rpartition("/")
+        pasta_rel = os.path.normpath(pasta) if pasta else "."
+        # Nem todo arquivo compactado lista as pastas: elas são criadas a partir dos caminhos
+        if pasta_rel not in self._conteudo:
+            self._registrar(pasta, True)
+        caminho_rel = os.path.normpath(caminho)
+        if e_diretorio:
+            if caminho_rel in self._conteudo:
+                return
+            self._conteudo[caminho_rel] = []
+        else:
+            if caminho_rel in self._membros:
+                return
+            self._membros[caminho_rel] = nome_membro
+            self._tamanhos_membros[caminho_rel] = tamanho
+        self._conteudo[pasta_rel].append((nome, e_diretorio, False))
+
+    def _listar_pasta(self, caminho_rel: str) -> list[tuple[str, bool, bool]]:
+        return self._conteudo.get(caminho_rel, [])
+
+    def _padroes_exclude(self) -> ignorados.ConjuntoPadroes | None:
+        return None  # Arquivos compactados não trazem o .git/info/exclude
+
+    def _ler_padroes(self, caminho_rel: str, base: str) -> ignorados.ConjuntoPadroes | None:
+        try:
+            dados = self.ler_bytes(caminho_rel, ignorados.MAX_BYTES_PADROES + 1)
+        except (KeyError, OSError):
+            return None
+        return ignorados.compilar_bytes(dados, base)
+
+    @abc.abstractmethod
+    def _ler(self, nome_membro: str, limite: int | None) -> bytes:
+        """Conteúdo de um membro (chamado com o lock de leitura)."""
+
+    def ler_bytes(self, caminho_rel: str, limite: int | None = None) -> bytes:
+        """Conteúdo de um membro (no máximo 'limite' bytes, se informado)."""
+        nome_membro = self._membros[os.path.normpath(caminho_rel)]
+        with self._lock_leitura:
+            dados = self._ler(nome_membro, limite)
+            self.arquivos_lidos += 1
+            self.bytes_lidos += len(dados)
+        return dados
+
+    def abrir(self, caminho_rel: str, binario: bool = False, limite_bytes: int | None = None):
+        try:
+            dados = self.ler_bytes(caminho_rel, limite_bytes)
+        except KeyError:
+            raise FileNotFoundError(f"'{caminho_rel}' não existe em {self.origem}") from None
+        if binario:
+            return io.BytesIO(dados)
+        # Um conteúdo cortado no limite pode terminar no meio de um caractere
+        return io.StringIO(codecs.getincrementaldecoder("utf-8")().decode(dados, final=False))
+
+    def tamanho(self, caminho_rel: str) -> int:
+        return self._tamanhos_membros.get(os.path.normpath(caminho_rel), 0)
+
+    def estatisticas_ingestao(self) -> dict:
+        return {"formato": self.formato, "arquivos_lidos": self.arquivos_lidos, "bytes_lidos": self.bytes_lidos}
+
+    def fechar(self) -> None:
+        pass
+
+
+class RepoIndexZip(RepoIndexCompactado):
+    """
+    Índice de um .zip (local ou remoto, via ArquivoHTTP). Os membros vêm do
+    diretório central e cada arquivo só é lido (e descomprimido) quando o
+    analyzer o abre.
+    """
+
+    formato = FORMATO_ZIP
+
+    def __init__(self, origem: str, fluxo, config: analyzer.ConfigVarredura | None = None):
+        self._fluxo = fluxo
+        self._zip = zipfile.ZipFile(fluxo)
+        membros = [(_normalizar_nome(info.filename), info.is_dir(), info.file_size)
+                   for info in self._zip.infolist()]
+        self._infos = {_normalizar_nome(info.filename): info for info in self._zip.infolist()}
+        super().__init__(origem, membros, config)
+
+    def _ler(self, nome_membro: str, limite: int | None) -> bytes:
+        with self._zip.open(self._infos[nome_membro]) as f:
+            return f.read() if limite is None else f.read(limite)
+
+    def estatisticas_ingestao(self) -> dict:
+        estatisticas = super().estatisticas_ingestao()
+        remoto = getattr(self._fluxo, "raw", None)
+        if isinstance(remoto, ArquivoHTTP):
+            estatisticas.update(requisicoes=remoto.requisicoes, bytes_baixados=remoto.bytes_baixados,
+                                tamanho_arquivo=remoto.tamanho)
+        return estatisticas
+
+    def fechar(self) -> None:
+        self._zip.close()
+        self._fluxo.close()
+
+
+def _limite_candidato(nome: str, entry_points: set[str]) -> int | None:
+    """Quantos bytes guardar de um arquivo do tar (None = o analyzer nunca o lê)."""
+    # +1 para o analyzer perceber que o arquivo passou do limite
+    if nome == ignorados.NOME_GITIGNORE:
+        return ignorados.MAX_BYTES_PADROES + 1
+    if manifestos.parser_para(nome):
+        return manifestos.MAX_BYTES_MANIFESTO + 1
+    if nome in entry_points:
+        return analyzer.MAX_BYTES_CODIGO
+    return None
+
+
+class RepoIndexTar(RepoIndexCompactado):
+    """
+    Índice de um tar (.tar.gz, .tgz, .tar) lido de um fluxo, numa única
+    passada: a lista de membros monta o índice e só os candidatos (manifestos,
+    entry points e .gitignore) ficam na memória, cortados no limite de cada tipo.
+    """
+
+    formato = FORMATO_TAR
+
+    def __init__(self, origem: str, fluxo, config: analyzer.ConfigVarredura | None = None):
+        self._dados: dict[str, bytes] = {}
+        self.bytes_baixados = 0
+        limitado = _FluxoLimitado(fluxo)
+        try:
+            membros = self._ler_membros(limitado)
+        finally:
+            self.bytes_baixados = limitado.lidos
+        super().__init__(origem, membros, config)
+
+    def _ler_membros(self, fluxo) -> list[tuple[str, bool, int]]:
+        entry_points = {nome for parser in manifestos.parsers() for nome in parser.arquivos_principais}
+        membros = []
+        with tarfile.open(fileobj=fluxo, mode="r|*") as tar:
+            for membro in tar:
+                nome = _normalizar_nome(membro.name)
+                if membro.isdir():
+                    membros.append((nome, True, 0))
+                    continue
+                if not (membro.isfile() or membro.issym() or membro.islnk()):
+                    continue  # Dispositivos, FIFOs...
+                membros.append((nome, False, membro.size))
+                limite = _limite_candidato(nome.rpartition("/")[2], entry_points) if membro.isfile() else None
+                if limite is not None:
+                    self._dados[nome] = tar.extractfile(membro).read(limite)
+        return membros
+
+    def _ler(self, nome_membro: str, limite: int | None) -> bytes:
+        dados = self._dados[nome_membro]
+        return dados if limite is None else dados[:limite]
+
+    def estatisticas_ingestao(self) -> dict:
+        return {**super().estatisticas_ingestao(), "bytes_baixados": self.bytes_baixados,
+                "candidatos_em_memoria": len(self._dados)}
+
+
+def abrir_url_com_seek(url: str, tamanho: int) -> io.BufferedReader:
+    """Arquivo remoto com seek (ArquivoHTTP) e buffer de TAMANHO_BLOCO_HTTP."""
+    return io.BufferedReader(ArquivoHTTP(url, tamanho), buffer_size=TAMANHO_BLOCO_HTTP)
+
+
+def abrir_indice(origem: str, config: analyzer.ConfigVarredura | None = None) -> RepoIndexCompactado:
+    """
+    Cria o índice de um arquivo compactado, local ou remoto (http/https).
+    Um zip remoto é lido por Range se o servidor aceitar; senão (e no tar),
+    o download é um único fluxo, abandonado assim que o índice fica pronto.
+    """
+    if not _e_url(origem):
+        with open(origem, "rb") as f:
+            formato = _formato(f.read(4))
+        if formato == FORMATO_ZIP:
+            return RepoIndexZip(origem, open(origem, "rb"), config)
+        with open(origem, "rb") as f:
+            return RepoIndexTar(origem, f, config)
+
+    formato, tamanho, resposta = _sondar_url(origem)
+    if formato == FORMATO_ZIP:
+        if resposta is None and tamanho:
+            if tamanho > MAX_BYTES_ARQUIVO:
+                raise ValueError(f"O arquivo compactado passa do limite de {MAX_ARQUIVO_MB:g} MB.")
+            return RepoIndexZip(origem, abrir_url_com_seek(origem, tamanho), config)
+        # Sem Range o diretório central (no fim) só chega depois de tudo: o zip fica na memória
+        if resposta is None:
+            resposta = _FluxoComInicio(b"", _requisitar(origem))
+        dados = io.BytesIO()
+        try:
+            limitado = _FluxoLimitado(resposta)
+            while bloco := limitado.read(TAMANHO_BLOCO_HTTP):
+                dados.write(bloco)
+        finally:
+            resposta.close()
+        return RepoIndexZip(origem, dados, config)
+
+    if resposta is None:
+        resposta = _FluxoComInicio(b"", _requisitar(origem))
+    try:
+        return RepoIndexTar(origem, resposta, config)
+    finally:
+        resposta.close()
+
+
+def montar_contexto(origem: str, config: analyzer.ConfigVarredura | None = None,
+                    max_workers: int = analyzer.MAX_WORKERS_STACKS) -> dict:
+    """
+    Equivalente a analyzer.montar_contexto para um arquivo compactado: indexa
+    o arquivo, detecta as stacks, mapeia a raiz e lê só os manifestos e entry
+    points, sem clone e sem extrair nada para o disco.
+    """
+    with telemetria.span("ingestao", remoto=_e_url(origem)) as s:
+        print(f"Lendo o arquivo compactado {origem} (sem clone)...")
+        indice = abrir_indice(origem, config)
+        try:
+            contexto = analyzer.montar_contexto(origem, origem, indice=indice, max_workers=max_workers,
+                                                usar_cache=False, config=config)
+        finally:
+            indice.fechar()
+        estatisticas = indice.estatisticas_ingestao()
+        s.definir(**estatisticas)
+        baixados = estatisticas.get("bytes_baixados")
+        print(f"Arquivo {estatisticas['formato']}: {estatisticas['arquivos_lidos']} arquivos lidos"
+              + (f", {baixados / 1024:.0f} KB transferidos" if baixados is not None else "") + ".")
+    return contexto
@@ -0,0 +1,269 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cloner
+import analyzer
+import generator
+import telemetria
+
+# Jobs executados ao mesmo tempo (cada um clona, analisa e chama a IA)
+MAX_WORKERS_JOBS = int(os.getenv("README_AI_JOBS_WORKERS", "4"))
+# Jobs aguardando um worker; acima disso, submeter() recusa (FilaCheia)
+MAX_JOBS_NA_FILA = int(os.getenv("README_AI_JOBS_MAX_FILA", "100"))
+# Por quanto tempo um README pronto é reaproveitado por novas submissões da mesma URL
+TTL_RESULTADOS_S = float(os.getenv("README_AI_JOBS_TTL_S", "600"))
+# Jobs concluídos guardados em memória (os mais antigos são descartados)
+MAX_JOBS_GUARDADOS = int(os.getenv("README_AI_JOBS_MAX_GUARDADOS", "500"))
+
+# Estados de um job e de cada fase
+NA_FILA = "na_fila"
+EXECUTANDO = "executando"
+OK = "ok"
+ERRO = "erro"
+
+FASES = ("clone", "analise", "geracao")
+
+
+class FilaCheia(RuntimeError):
+    """A fila de jobs atingiu o limite (MAX_JOBS_NA_FILA)."""
+
+
+class Job:
+    """
+    Um pedido de README (clone -> análise -> geração) executado em segundo
+    plano. O worker atualiza o job sob o lock; a interface lê instantaneo().
+    """
+
+    def __init__(self, repo_url: str, chave: str, modo_clone: str, usar_espelho: bool,
+                 usar_cache: bool, config_varredura: analyzer.ConfigVarredura | None):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = repo_url
+        self.chave = chave
+        self.modo_clone = modo_clone
+        self.usar_espelho = usar_espelho
+        self.usar_cache = usar_cache
+        self.config_varredura = config_varredura
+
+        self.status = NA_FILA
+        self.fase = None
+        self.fases = {fase: {"status": NA_FILA, "duracao_s": None} for fase in FASES}
+        self.stacks = []
+        self.parcial = None
+        self.readme = ""
+        self.erro = None
+        self.tempos_fases = []
+        self.submissoes = 1
+        self.criado_em = time.time()
+        self.concluido_em = None
+        self._lock = threading.Lock()
+        self._fim = threading.Event()
+
+    @property
+    def terminado(self) -> bool:
+        return self._fim.is_set()
+
+    def aguardar(self, timeout: float | None = None) -> bool:
+        """Bloqueia até o job terminar. Retorna False se o timeout estourar."""
+        return self._fim.wait(timeout)
+
+    def _iniciar_fase(self, fase: str) -> float:
+        with self._lock:
+            self.status = EXECUTANDO
+            self.fase = fase
+            self.fases[fase]["status"] = EXECUTANDO
+        return time.perf_counter()
+
+    def _concluir_fase(self, fase: str, inicio: float, status: str = OK) -> None:
+        with self._lock:
+            self.fases[fase] = {"status": status, "duracao_s": round(time.perf_counter() - inicio, 3)}
+
+    def _adicionar_trecho(self, trecho: str) -> None:
+        with self._lock:
+            self.readme += trecho
+
+    def _finalizar(self, erro: str | None = None) -> None:
+        with self._lock:
+            if erro is not None:
+                self.erro = erro
+                if self.fase:
+                    self.fases[self.fase]["status"] = ERRO
+            self.status = ERRO if self.erro else OK
+            self.concluido_em = time.time()
+        self._fim.set()
+
+    def instantaneo(self) -> dict:
+        """Cópia consistente do estado atual (o README vem parcial durante a geração)."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "url": self.url,
+                "status": self.status,
+                "fase": self.fase,
+                "fases": {fase: dict(info) for fase, info in self.fases.items()},
+                "stacks": list(self.stacks),
+                "parcial": self.parcial,
+                "readme": self.readme,
+                "erro": self.erro,
+                "tempos_fases": list(self.tempos_fases),
+                "submissoes": self.submissoes,
+                "criado_em": self.criado_em,
+                "concluido_em": self.concluido_em,
+            }
+
+
+class GerenciadorJobs:
+    """
+    Fila de jobs com um pool de workers de tamanho fixo:
+    - submeter() devolve na hora o id do job, sem bloquear a interface;
+    - a mesma URL (normalizada) enviada de novo se junta ao job em andamento;
+    - um README pronto há menos de 'ttl_resultados_s' é reaproveitado
+      (a menos que usar_cache=False), inclusive entre sessões do app.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS_JOBS, max_fila: int = MAX_JOBS_NA_FILA,
+                 ttl_resultados_s: float = TTL_RESULTADOS_S, max_guardados: int = MAX_JOBS_GUARDADOS):
+        self.max_workers = max_workers
+        self.max_fila = max_fila
+        self.ttl_resultados_s = ttl_resultados_s
+        self.max_guardados = max_guardados
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="readme-ai-job")
+        self._jobs: dict[str, Job] = {}
+        self._por_chave: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submeter(self, repo_url: str, modo_clone: str = cloner.MODO_PARCIAL, usar_espelho: bool = True,
+                 usar_cache: bool = True, config_varredura: analyzer.ConfigVarredura | None = None) -> str:
+        """
+        Enfileira a geração do README de 'repo_url' e retorna o id do job
+        (que pode ser de um job já existente para a mesma URL).
+        Levanta FilaCheia se houver MAX_JOBS_NA_FILA jobs esperando.
+        """
+        config = config_varredura or analyzer.ConfigVarredura()
+        chave = cloner.normalizar_url(repo_url) + "\0" + config.chave()
+        with self._lock:
+            existente = self._por_chave.get(chave)
+            if existente is not None:
+                reaproveitavel = not existente.terminado or (
+                    usar_cache and existente.status == OK
+                    and time.time() - existente.concluido_em < self.ttl_resultados_s
+                )
+                if reaproveitavel:
+                    with existente._lock:
+                        existente.submissoes += 1
+                    return existente.id
+
+            if self._na_fila() >= self.max_fila:
+                raise FilaCheia(f"Fila de jobs cheia ({self.max_fila} aguardando).")
+
+            job = Job(repo_url, chave, modo_clone, usar_espelho, usar_cache, config_varredura)
+            self._jobs[job.id] = job
+            self._por_chave[chave] = job
+            self._podar()
+        # O job leva uma cópia do contexto (telemetria) para o worker
+        self._executor.submit(telemetria.no_contexto_atual(self._executar), job)
+        return job.id
+
+    def obter(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _na_fila(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == NA_FILA)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "workers": self.max_workers,
+            "na_fila": sum(1 for job in jobs if job.status == NA_FILA),
+            "executando": sum(1 for job in jobs if job.status == EXECUTANDO),
+            "concluidos": sum(1 for job in jobs if job.status == OK),
+            "com_erro": sum(1 for job in jobs if job.status == ERRO),
+        }
+
+    def _podar(self) -> None:
+        """Descarta os jobs terminados mais antigos acima de max_guardados (chamar com o lock)."""
+        excedente = len(self._jobs) - self.max_guardados
+        if excedente <= 0:
+            return
+        terminados = sorted((job for job in self._jobs.values() if job.terminado),
+                            key=lambda job: job.concluido_em)
+        for job in terminados[:excedente]:
+            del self._jobs[job.id]
+            if self._por_chave.get(job.chave) is job:
+                del self._por_chave[job.chave]
+
+    def _executar(self, job: Job) -> None:
+        """Roda num worker: clone, análise e geração, atualizando o progresso do job."""
+        span_pipeline = telemetria.iniciar_span("pipeline", url=job.url, job=job.id)
+        token_span = telemetria.ativar(span_pipeline)
+        erro = None
+        try:
+            with telemetria.coletar() as coletor:
+                erro = self._executar_fases(job)
+                with job._lock:
+                    job.tempos_fases = coletor.resumo()
+        except Exception as e:
+            erro = f"Erro inesperado: {e}"
+        finally:
+            if erro:
+                span_pipeline.marcar_erro(erro)
+            telemetria.desativar(token_span)
+            span_pipeline.finalizar()
+            job._finalizar(erro)
+
+    def _executar_fases(self, job: Job) -> str | None:
+        """Retorna a mensagem de erro, ou None se o README foi gerado."""
+        inicio = job._iniciar_fase("clone")
+        with cloner.AreaTrabalho(job.url, modo=job.modo_clone, usar_espelho=job.usar_espelho) as area:
+            if not area.caminho:
+                if area.orcamento.estouros:
+                    return f"O repositório é grande demais: {area.orcamento.estouros[-1]}"
+                return "Falha ao clonar o repositório. Verifique a URL."
+            job._concluir_fase("clone", inicio)
+
+            inicio = job._iniciar_fase("analise")
+            contexto_para_ia = analyzer.montar_contexto(
+                area.caminho, job.url, hash_arvore=area.hash_arvore,
+                usar_cache=job.usar_cache, config=job.config_varredura
+            )
+        stacks = [
+            {"tecnologia": stack["tecnologia"], "caminho": stack["caminho"], "erro": stack.get("erro")}
+            for stack in contexto_para_ia["stacks"]
+        ]
+        with job._lock:
+            job.stacks = stacks
+            job.parcial = contexto_para_ia.get("parcial")
+        if not stacks:
+            return "Nenhuma stack de tecnologia conhecida foi encontrada."
+        job._concluir_fase("analise", inicio)
+
+        inicio = job._iniciar_fase("geracao")
+        for trecho in generator.gerar_readme_stream(contexto_para_ia, usar_cache=job.usar_cache):
+            job._adicionar_trecho(trecho)
+        if generator.readme_falhou(job.readme):
+            return "A IA não conseguiu gerar o README."
+        job._concluir_fase("geracao", inicio)
+        return None
+
+    def encerrar(self, aguardar: bool = True) -> None:
+        self._executor.shutdown(wait=aguardar, cancel_futures=not aguardar)
+
+
+_gerenciador_padrao = None
+_lock_gerenciador = threading.Lock()
+
+
+def obter_gerenciador() -> GerenciadorJobs:
+    """
+    Retorna o gerenciador compartilhado pelo processo (no Streamlit, por todas
+    as sessões), criado na primeira chamada.
+    """
+    global _gerenciador_padrao
+    with _lock_gerenciador:
+        if _gerenciador_padrao is None:
+            _gerenciador_padrao = GerenciadorJobs()
+        return _gerenciador_padrao
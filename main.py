@@ -1,86 +1,440 @@
 import argparse
 import os
-import cloner          
-import analyzer        
-import generator
+import re
+import sys
+import json
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cloner
+import analyzer
+import ingestao
+import telemetria
+# O generator (e com ele o SDK do Gemini) só é importado na fase de geração:
+# '--help' e '--so-analise' nunca carregam a IA
 
 NOME_ARQUIVO_SAIDA = "README_NEW.md"
+NOME_ARQUIVO_CONTEXTO = "contexto.json"
+NOME_RELATORIO = "resumo.json"
 
-def run_analysis(repo_url: str):
-    
-    print(f"--- Iniciando análise para: {repo_url} ---")
-    
-    # --- FASE 1: COLETA DE DADOS ---
-    
-    # 1. Clonar
-    caminho_local = cloner.clonar_repositorio(repo_url)
-    
-    if not caminho_local:
-        print("Falha no clone. Abortando.")
-        return
-
-    # 2. Analisar Stack
-    stack_info = analyzer.identificar_stack(caminho_local)
-    
-    contexto_para_ia = {
-        "url_repo": repo_url,
-        "tecnologia": stack_info['tecnologia'],
-        "arquivo_stack": stack_info['arquivo'],
-        "dependencias": [],
-        "estrutura_arquivos": [],
-        "codigo_principal": None 
-    }
+# Limites padrão de concorrência de cada fase do pipeline em lote
+MAX_CLONES = 4        # Rede (git clone/fetch)
+MAX_ANALISES = 2      # CPU/disco (varredura e parsing)
+MAX_CHAMADAS_IA = 2   # Chamadas ao Gemini (limitadas pela cota da API)
+
+
+class LimitesPipeline:
+    """
+    Semáforos que limitam, separadamente, quantos repositórios podem estar
+    em cada fase ao mesmo tempo. Enquanto um repositório espera a IA,
+    outros já podem estar clonando ou sendo analisados.
+    """
 
-    # 3. Extrair Dependências
-    if stack_info['arquivo']:
-        deps = analyzer.extrair_dependencias(caminho_local, stack_info['arquivo'])
-        contexto_para_ia["dependencias"] = deps
-            
-    # 4. Mapear Estrutura
-    estrutura = analyzer.mapear_estrutura(caminho_local)
-    contexto_para_ia["estrutura_arquivos"] = estrutura
-    
-    # 5. Ler Código Principal
-    if stack_info['tecnologia'] != "Desconhecida":
-        codigo_info = analyzer.ler_codigo_principal(caminho_local, stack_info['tecnologia'])
-        if codigo_info:
-            contexto_para_ia["codigo_principal"] = codigo_info
-    
-    print("\n--- Análise Concluída ---")
-    
-    # Imprime um resumo limpo do contexto coletado
+    def __init__(self, clones: int = MAX_CLONES, analises: int = MAX_ANALISES,
+                 chamadas_ia: int = MAX_CHAMADAS_IA):
+        self.clone = threading.BoundedSemaphore(clones)
+        self.analise = threading.BoundedSemaphore(analises)
+        self.ia = threading.BoundedSemaphore(chamadas_ia)
+        self.total = clones + analises + chamadas_ia
+
+
+def _imprimir_contexto(contexto_para_ia: dict) -> None:
+    """
+    Imprime um resumo limpo do contexto coletado.
+    """
     print("\nContexto final coletado:")
     print("-" * 30)
     print(f"  URL: {contexto_para_ia['url_repo']}")
-    print(f"  Tecnologia: {contexto_para_ia['tecnologia']}")
-    print(f"  Dependências: {len(contexto_para_ia['dependencias'])} encontradas")
-    print(f"  Estrutura: {len(contexto_para_ia['estrutura_arquivos'])} itens encontrados")
-    if contexto_para_ia.get('codigo_principal'):
-        print(f"  Código Principal: Lido de '{contexto_para_ia['codigo_principal']['arquivo']}'")
-    else:
-        print("  Código Principal: Não encontrado")
+    print(f"  Estrutura (raiz): {len(contexto_para_ia['estrutura_arquivos_raiz'])} itens encontrados")
+    varredura = contexto_para_ia.get("varredura")
+    if varredura:
+        podados = ", ".join(f"{motivo}={n}" for motivo, n in varredura["podados"].items() if n)
+        print(f"  Varredura: {varredura['diretorios']} diretórios, {varredura['arquivos']} arquivos"
+              + (f" (podados: {podados})" if podados else "")
+              + (" — INTERROMPIDA pelo limite de itens" if varredura["truncado"] else ""))
+    incremental = contexto_para_ia.get("incremental")
+    if incremental:
+        print(f"  Reanálise incremental: {incremental['arquivos_alterados']} arquivos alterados, "
+              f"{len(incremental['stacks_reanalisadas'])} stacks reanalisadas, "
+              f"{len(incremental['stacks_reaproveitadas'])} reaproveitadas")
+    mudancas = contexto_para_ia.get("mudancas")
+    if mudancas:
+        print(f"  Mudanças desde {(mudancas['commit_anterior'] or '?')[:12]}:"
+              + ("" if mudancas["relevante"] else " nenhuma relevante para o README"))
+        for stack in mudancas["stacks_adicionadas"]:
+            print(f"    + stack {stack['tecnologia']} em ./{stack['caminho']}")
+        for stack in mudancas["stacks_removidas"]:
+            print(f"    - stack {stack['tecnologia']} em ./{stack['caminho']}")
+        for caminho, deps in mudancas["dependencias"].items():
+            print(f"    ~ ./{caminho}: +{len(deps['adicionadas'])} / -{len(deps['removidas'])} dependências")
+    parcial = contexto_para_ia.get("parcial")
+    if parcial:
+        descartadas = parcial["stacks_descartadas"]
+        print(f"  ANÁLISE PARCIAL (limites atingidos: {', '.join(parcial['motivos'])})"
+              + (f"; {descartadas} stacks não analisadas" if descartadas else ""))
+    print(f"  Stacks: {len(contexto_para_ia['stacks'])} encontradas")
+    for stack in contexto_para_ia['stacks']:
+        print(f"  - {stack['tecnologia']} em ./{stack['caminho']}")
+        if stack.get('erro'):
+            print(f"      Erro: {stack['erro']}")
+        print(f"      Dependências: {len(stack['dependencias'])} encontradas"
+              + (" (manifesto grande demais, lista truncada)" if stack.get('dependencias_truncadas') else ""))
+        if stack.get('codigo_principal'):
+            print(f"      Código Principal: Lido de '{stack['codigo_principal']['arquivo']}'")
+        else:
+            print("      Código Principal: Não encontrado")
     print("-" * 30)
-    
-    # --- FASE 2: GERAÇÃO COM IA ---
-    # (Este é o novo bloco de código)
-    
-    print("\n--- Iniciando Geração com IA ---")
-    # 6. Chamar o gerador
-    readme_texto = generator.gerar_readme(contexto_para_ia)
-    print("IA concluiu a geração.")
-    
-    # 7. Salvar o resultado
+
+
+def _coletar_do_clone(repo_url: str, resultado: dict, limites: LimitesPipeline, modo_clone: str,
+                      usar_espelho: bool, usar_cache: bool,
+                      config_varredura: analyzer.ConfigVarredura | None) -> dict | None:
+    """Clona e analisa o repositório. Retorna None (com o erro em 'resultado') se o clone falhar."""
+    area = cloner.AreaTrabalho(repo_url, modo=modo_clone, usar_espelho=usar_espelho)
     try:
-        with open(NOME_ARQUIVO_SAIDA, "w", encoding="utf-8") as f:
-            f.write(readme_texto)
-        print(f"\n🎉 Sucesso! Seu README foi salvo em: {NOME_ARQUIVO_SAIDA}")
+        # 1. Clonar (numa pasta temporária exclusiva deste repositório)
+        with limites.clone:
+            t0 = time.perf_counter()
+            area.clonar()
+            resultado["tempos"]["clone"] = round(time.perf_counter() - t0, 3)
+        if area.orcamento.estouros:
+            # Limites do clone (ex: refeito no modo árvore por ser grande demais)
+            resultado["avisos"] = list(area.orcamento.estouros)
+        if not area.caminho:
+            resultado["erro"] = " ".join(["Falha no clone.", *area.orcamento.estouros])
+            return None
+
+        # 2-5. Stacks, estrutura da raiz, dependências e código principal
+        with limites.analise:
+            t0 = time.perf_counter()
+            contexto_para_ia = analyzer.montar_contexto(
+                area.caminho, repo_url, hash_arvore=area.hash_arvore, usar_cache=usar_cache,
+                config=config_varredura
+            )
+            resultado["tempos"]["analise"] = round(time.perf_counter() - t0, 3)
+        return contexto_para_ia
+    finally:
+        area.limpar()
+
+
+def processar_repositorio(repo_url: str, caminho_saida: str, limites: LimitesPipeline,
+                          modo_clone: str = cloner.MODO_COMPLETO, usar_espelho: bool = False,
+                          usar_cache: bool = True,
+                          config_varredura: analyzer.ConfigVarredura | None = None,
+                          atualizar: bool = False, so_analise: bool = False) -> dict:
+    """
+    Clona (ou, se for um .zip/.tar.gz, lê em memória), analisa e gera o
+    README de um repositório, respeitando os limites de cada fase.
+    Nunca levanta exceção: o resultado (para o relatório) traz o status,
+    o tempo de cada fase e o erro, se houver.
+    Com 'atualizar', um README já existente em 'caminho_saida' é atualizado
+    só nas seções afetadas pelas mudanças desde a última análise.
+    Com 'so_analise', não há geração: o contexto coletado é gravado (em JSON)
+    em 'caminho_saida'.
+    """
+    resultado = {"url": repo_url, "status": "erro", "arquivo": None, "stacks": 0, "tempos": {}}
+    inicio = time.perf_counter()
+    span_pipeline = telemetria.iniciar_span("pipeline", url=repo_url)
+    token_span = telemetria.ativar(span_pipeline)
+
+    print(f"--- Iniciando análise para: {repo_url} ---")
+
+    try:
+        # --- FASE 1: COLETA DE DADOS ---
+        if ingestao.e_arquivo_compactado(repo_url):
+            # Um .zip/.tar.gz é lido em memória: sem clone e sem pasta temporária
+            with limites.clone:
+                t0 = time.perf_counter()
+                contexto_para_ia = ingestao.montar_contexto(repo_url, config=config_varredura)
+                resultado["tempos"]["ingestao"] = round(time.perf_counter() - t0, 3)
+        else:
+            contexto_para_ia = _coletar_do_clone(repo_url, resultado, limites, modo_clone, usar_espelho,
+                                                 usar_cache, config_varredura)
+            if contexto_para_ia is None:
+                return resultado
+
+        resultado["stacks"] = len(contexto_para_ia["stacks"])
+        if contexto_para_ia.get("parcial"):
+            resultado["parcial"] = contexto_para_ia["parcial"]["motivos"]
+        if not contexto_para_ia["stacks"]:
+            resultado["erro"] = "Nenhuma stack de tecnologia conhecida foi encontrada."
+            return resultado
+
+        _imprimir_contexto(contexto_para_ia)
+
+        pasta_saida = os.path.dirname(caminho_saida)
+        if pasta_saida:
+            os.makedirs(pasta_saida, exist_ok=True)
+
+        if so_analise:
+            with open(caminho_saida, "w", encoding="utf-8") as f:
+                json.dump(contexto_para_ia, f, ensure_ascii=False, indent=2)
+            resultado["arquivo"] = caminho_saida
+            resultado["status"] = "ok"
+            return resultado
+
+        # --- FASE 2: GERAÇÃO COM IA ---
+        # 6-7. Chamar o gerador e salvar o resultado à medida que a IA responde
+        import generator
+        with limites.ia:
+            t0 = time.perf_counter()
+            readme_anterior = None
+            if atualizar and os.path.isfile(caminho_saida):
+                with open(caminho_saida, "r", encoding="utf-8") as f:
+                    readme_anterior = f.read()
+            readme_texto = ""
+            # Os trechos vão para um arquivo temporário na mesma pasta: o README
+            # existente só é substituído se a geração der certo
+            descritor, caminho_temporario = tempfile.mkstemp(
+                prefix=".readme-ai-", suffix=".md.tmp", dir=pasta_saida or "."
+            )
+            try:
+                with os.fdopen(descritor, "w", encoding="utf-8") as f:
+                    for trecho in generator.gerar_readme_stream(contexto_para_ia, usar_cache=usar_cache,
+                                                                readme_anterior=readme_anterior):
+                        readme_texto += trecho
+                        f.write(trecho)
+                        f.flush()
+                if not generator.readme_falhou(readme_texto):
+                    os.replace(caminho_temporario, caminho_saida)
+            finally:
+                if os.path.exists(caminho_temporario):
+                    os.remove(caminho_temporario)
+            resultado["tempos"]["geracao"] = round(time.perf_counter() - t0, 3)
+
+        if generator.readme_falhou(readme_texto):
+            resultado["erro"] = "A IA não conseguiu gerar o README."
+        else:
+            resultado["arquivo"] = caminho_saida
+            resultado["status"] = "ok"
+
     except Exception as e:
-        print(f"\nErro ao salvar o arquivo README: {e}")
-    
+        resultado["erro"] = str(e)
+
+    finally:
+        resultado["tempos"]["total"] = round(time.perf_counter() - inicio, 3)
+        span_pipeline.definir(stacks=resultado["stacks"])
+        if resultado["status"] == "ok":
+            print(f"🎉 {'Contexto' if so_analise else 'README'} de {repo_url} salvo em: {resultado['arquivo']}")
+        else:
+            span_pipeline.marcar_erro(resultado.get("erro") or "Falha desconhecida.")
+            print(f"Falha em {repo_url}: {resultado.get('erro')}")
+        telemetria.desativar(token_span)
+        span_pipeline.finalizar()
+
+    return resultado
+
+
+def run_analysis(repo_url: str, modo_clone: str = cloner.MODO_COMPLETO, usar_espelho: bool = False,
+                 usar_cache: bool = True, config_varredura: analyzer.ConfigVarredura | None = None,
+                 atualizar: bool = False, so_analise: bool = False) -> dict:
+    """
+    Processa um único repositório e salva o README em NOME_ARQUIVO_SAIDA
+    (ou, com 'so_analise', o contexto em NOME_ARQUIVO_CONTEXTO).
+    """
+    return processar_repositorio(
+        repo_url, NOME_ARQUIVO_CONTEXTO if so_analise else NOME_ARQUIVO_SAIDA, LimitesPipeline(1, 1, 1),
+        modo_clone=modo_clone, usar_espelho=usar_espelho, usar_cache=usar_cache,
+        config_varredura=config_varredura, atualizar=atualizar, so_analise=so_analise
+    )
+
+
+def _limite_cli(valor: int | None, padrao: int | None) -> int | None:
+    """Limite vindo do CLI: ausente usa o padrão (do ambiente); 0 desativa, como nas variáveis."""
+    if valor is None:
+        return padrao
+    return valor or None
+
+
+def _normalizar_entrada(repo_url: str) -> str:
+    """Aceita 'github.com/dono/repo' (como o app) e completa com https://."""
+    repo_url = repo_url.strip()
+    if repo_url.startswith("github.com"):
+        return f"https://{repo_url}"
+    if repo_url.startswith("http://github.com"):
+        return repo_url.replace("http://", "https://", 1)
+    return repo_url
+
+
+def ler_urls(urls: list[str], arquivo: str | None) -> list[str]:
+    """
+    Junta as URLs passadas na linha de comando com as de um arquivo
+    ('-' lê do stdin). Ignora linhas vazias, comentários (#) e duplicatas.
+    """
+    linhas = list(urls)
+    if arquivo == "-":
+        linhas.extend(sys.stdin.read().splitlines())
+    elif arquivo:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            linhas.extend(f.read().splitlines())
+
+    vistas = set()
+    resultado = []
+    for linha in linhas:
+        linha = linha.strip()
+        if not linha or linha.startswith("#"):
+            continue
+        repo_url = _normalizar_entrada(linha)
+        chave = cloner.normalizar_url(repo_url)
+        if chave not in vistas:
+            vistas.add(chave)
+            resultado.append(repo_url)
+    return resultado
+
+
+def _nome_arquivo_saida(repo_url: str, usados: set[str], extensao: str = ".md") -> str:
+    """
+    Nome de arquivo a partir da URL (ex: 'dono__repo.md'), sem colisões.
+    """
+    partes = [p for p in cloner.normalizar_url(repo_url).split("/") if p][-2:]
+    base = re.sub(r"[^\w.-]", "_", "__".join(partes)) or "repositorio"
+    nome = f"{base}{extensao}"
+    i = 2
+    while nome in usados:
+        nome = f"{base}-{i}{extensao}"
+        i += 1
+    usados.add(nome)
+    return nome
+
+
+def processar_lote(urls: list[str], pasta_saida: str, limites: LimitesPipeline,
+                   caminho_relatorio: str | None = None, **opcoes) -> dict:
+    """
+    Processa vários repositórios em pipeline (um pool de threads, com limites
+    separados por fase) e grava um relatório JSON com o resultado de cada um.
+    """
+    usados = set()
+    extensao = ".json" if opcoes.get("so_analise") else ".md"
+    saidas = [os.path.join(pasta_saida, _nome_arquivo_saida(url, usados, extensao)) for url in urls]
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(limites.total, len(urls)))) as executor:
+        futuros = [
+            executor.submit(telemetria.no_contexto_atual(processar_repositorio), url, saida, limites, **opcoes)
+            for url, saida in zip(urls, saidas)
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+
+    relatorio = {
+        "total": len(resultados),
+        "sucesso": sum(1 for r in resultados if r["status"] == "ok"),
+        "falhas": sum(1 for r in resultados if r["status"] != "ok"),
+        "parciais": sum(1 for r in resultados if r.get("parcial")),
+        "duracao_s": round(time.perf_counter() - inicio, 3),
+        "repositorios": resultados,
+    }
+    if not opcoes.get("so_analise"):
+        import generator
+        relatorio["cache_respostas"] = generator.estatisticas_cache()
+
+    caminho_relatorio = caminho_relatorio or os.path.join(pasta_saida, NOME_RELATORIO)
+    pasta_relatorio = os.path.dirname(caminho_relatorio)
+    if pasta_relatorio:
+        os.makedirs(pasta_relatorio, exist_ok=True)
+    with open(caminho_relatorio, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(f"\nLote concluído: {relatorio['sucesso']}/{relatorio['total']} "
+          f"{'contextos coletados' if opcoes.get('so_analise') else 'READMEs gerados'} "
+          f"em {relatorio['duracao_s']}s. Relatório: {caminho_relatorio}")
+    return relatorio
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="README-AI: Gerador de README com IA.")
-    parser.add_argument("url", type=str, help="A URL (https) do repositório GitHub a ser analisado.")
+    parser.add_argument(
+        "urls", nargs="*",
+        help="URL(s) (https) do(s) repositório(s) GitHub a serem analisados, ou caminhos/URLs "
+             "de arquivos .zip/.tar.gz do repositório (lidos em memória, sem clone)."
+    )
+    parser.add_argument(
+        "-a", "--arquivo",
+        help="Arquivo com uma URL por linha ('-' lê do stdin)."
+    )
+    parser.add_argument(
+        "-o", "--pasta-saida",
+        help="Pasta onde salvar um README por repositório e o relatório "
+             f"(padrão com uma única URL: ./{NOME_ARQUIVO_SAIDA}; com várias: ./readmes)."
+    )
+    parser.add_argument("--relatorio", help=f"Caminho do relatório JSON (padrão: <pasta-saida>/{NOME_RELATORIO}).")
+    parser.add_argument("--max-clones", type=int, default=MAX_CLONES, help="Clones simultâneos.")
+    parser.add_argument("--max-analises", type=int, default=MAX_ANALISES, help="Análises simultâneas.")
+    parser.add_argument("--max-chamadas-ia", type=int, default=MAX_CHAMADAS_IA, help="Chamadas simultâneas à IA.")
+    parser.add_argument(
+        "--modo-clone", choices=cloner.MODOS_CLONE, default=cloner.MODO_COMPLETO,
+        help="'parcial' faz um clone raso (depth 1) e baixa apenas os arquivos analisados; "
+             "'arvore' faz o mesmo sem checkout, lendo direto do banco de objetos do git."
+    )
+    parser.add_argument(
+        "--espelho", action="store_true",
+        help="Reutiliza o espelho local do repositório (fetch incremental em vez de novo clone)."
+    )
+    parser.add_argument(
+        "--sem-cache", action="store_true",
+        help="Ignora os caches de análise e de respostas da IA (força uma nova geração)."
+    )
+    parser.add_argument(
+        "--atualizar", action="store_true",
+        help="Se o README de saída já existir, reescreve só as seções afetadas pelas mudanças "
+             "desde a última análise (reanálise incremental)."
+    )
+    parser.add_argument(
+        "--so-analise", action="store_true",
+        help=f"Só clona e analisa, sem chamar a IA (nem importar o SDK): grava o contexto em JSON "
+             f"(padrão com uma única URL: ./{NOME_ARQUIVO_CONTEXTO})."
+    )
+    parser.add_argument(
+        "--excluir", action="append", default=[], metavar="GLOB",
+        help="Glob (formato .gitignore) a não varrer, ex: 'gen/' ou '*.pb.go'. Pode repetir."
+    )
+    parser.add_argument(
+        "--incluir", action="append", default=[], metavar="GLOB",
+        help="Glob que nunca é podado (vence .gitignore e pastas padrão), ex: 'vendor/'. Pode repetir."
+    )
+    parser.add_argument("--profundidade-max", type=int,
+                        help="Profundidade máxima de pastas a varrer (0 desativa o limite).")
+    parser.add_argument("--max-entradas", type=int,
+                        help="Para a varredura após indexar este total de itens (0 desativa o limite).")
+    parser.add_argument(
+        "--max-stacks", type=int,
+        help="Analisa só as N stacks mais rasas (padrão: README_AI_MAX_STACKS ou 50; 0 desativa o limite)."
+    )
+    parser.add_argument("--sem-gitignore", action="store_true", help="Não aplica o .gitignore do repositório.")
+    parser.add_argument(
+        "--telemetria", metavar="ARQUIVO", default=telemetria.ARQUIVO_TELEMETRIA,
+        help="Grava os spans (duração de cada fase, bytes, arquivos, tokens) neste arquivo JSON lines."
+    )
     args = parser.parse_args()
-    
-    run_analysis(args.url)
\ No newline at end of file
+
+    if args.telemetria and args.telemetria != telemetria.ARQUIVO_TELEMETRIA:
+        telemetria.adicionar_destino(telemetria.DestinoJSONL(args.telemetria))
+
+    urls = ler_urls(args.urls, args.arquivo)
+    if not urls:
+        parser.error("Informe ao menos uma URL (como argumento ou via --arquivo).")
+
+    opcoes = {
+        "modo_clone": args.modo_clone,
+        "usar_espelho": args.espelho,
+        "usar_cache": not args.sem_cache,
+        "atualizar": args.atualizar,
+        "so_analise": args.so_analise,
+        "config_varredura": analyzer.ConfigVarredura(
+            respeitar_gitignore=not args.sem_gitignore,
+            excluir=args.excluir or analyzer.VARREDURA_EXCLUIR,
+            incluir=args.incluir or analyzer.VARREDURA_INCLUIR,
+            profundidade_max=_limite_cli(args.profundidade_max, analyzer.VARREDURA_PROFUNDIDADE_MAX),
+            max_entradas=_limite_cli(args.max_entradas, analyzer.VARREDURA_MAX_ENTRADAS),
+            max_stacks=_limite_cli(args.max_stacks, analyzer.VARREDURA_MAX_STACKS),
+        ),
+    }
+
+    # Uma única URL sem pasta de saída: mantém o comportamento original (README_NEW.md)
+    if len(urls) == 1 and not args.pasta_saida and not args.relatorio:
+        resultado = run_analysis(urls[0], **opcoes)
+        sys.exit(0 if resultado["status"] == "ok" else 1)
+
+    limites = LimitesPipeline(args.max_clones, args.max_analises, args.max_chamadas_ia)
+    relatorio = processar_lote(urls, args.pasta_saida or "readmes", limites, args.relatorio, **opcoes)
+    sys.exit(0 if relatorio["falhas"] == 0 else 1)
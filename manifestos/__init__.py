@@ -0,0 +1,200 @@
+# Registro dos formatos de manifesto (requirements.txt, package.json, pom.xml...).
+#
+# Cada Parser diz qual arquivo identifica a stack, a tecnologia, onde procurar o
+# código principal, o comando de instalação e qual função extrai as dependências.
+# A função é indicada como "modulo:funcao" e só é importada no primeiro uso: o
+# custo de importar um formato (tomli, xml...) só é pago se ele aparecer.
+#
+# A ordem do registro é a prioridade: se uma pasta tiver 'pyproject.toml' E
+# 'requirements.txt', o 'pyproject.toml' vence.
+import os
+import importlib
+import threading
+from pathlib import PurePosixPath
+
+# Limite de leitura por manifesto: acima disso a lista de dependências é truncada
+MAX_MANIFESTO_MB = float(os.getenv("README_AI_MAX_MANIFESTO_MB", "1"))
+MAX_BYTES_MANIFESTO = int(MAX_MANIFESTO_MB * 1024 * 1024)
+
+# Tamanho de cada leitura ao percorrer um arquivo em blocos
+TAMANHO_BLOCO = 64 * 1024
+
+
+class Parser:
+    """
+    Um formato de manifesto. 'manifesto' é um nome exato ('pom.xml') ou uma
+    extensão com curinga ('*.csproj'). 'extrator' ("modulo:funcao") recebe o
+    arquivo aberto em binário e o limite de bytes, e devolve (dependências,
+    truncado). 'comando_instalacao' aceita {caminho} (pasta da stack) e
+    {manifesto} (caminho POSIX do manifesto).
+    """
+
+    def __init__(self, manifesto: str, tecnologia: str, extrator: str | None = None,
+                 arquivos_principais: list[str] | None = None, pastas_busca: list[str] | None = None,
+                 comando_instalacao: str | None = None):
+        self.manifesto = manifesto
+        self.tecnologia = tecnologia
+        self.extrator = extrator
+        self.arquivos_principais = list(arquivos_principais or [])
+        # Pastas (além das padrão do analyzer) onde procurar o código principal
+        self.pastas_busca = list(pastas_busca or [])
+        self.comando_instalacao = comando_instalacao
+        self._funcao = None
+
+    @property
+    def extensao(self) -> str | None:
+        return self.manifesto[1:] if self.manifesto.startswith("*") else None
+
+    def casa(self, nome_arquivo: str) -> bool:
+        if self.extensao:
+            return nome_arquivo.endswith(self.extensao) and nome_arquivo != self.extensao
+        return nome_arquivo == self.manifesto
+
+    def extrair(self, f, limite: int = MAX_BYTES_MANIFESTO) -> tuple[list[str], bool]:
+        if self.extrator is None:
+            return [], False
+        if self._funcao is None:
+            modulo, funcao = self.extrator.split(":")
+            self._funcao = getattr(importlib.import_module(modulo), funcao)
+        return self._funcao(f, limite)
+
+    def comando(self, caminho_stack: str, arquivo: str) -> str | None:
+        if not self.comando_instalacao:
+            return None
+        manifesto = PurePosixPath(caminho_stack.replace(os.sep, "/"), arquivo).as_posix()
+        return self.comando_instalacao.format(caminho=caminho_stack, manifesto=manifesto)
+
+
+_parsers: list[Parser] = []
+_por_nome: dict[str, Parser] = {}
+_lock_registro = threading.Lock()
+
+
+def registrar(parser: Parser, antes_de: str | None = None) -> None:
+    """
+    Registra um formato. Por padrão ele entra com a menor prioridade;
+    com 'antes_de' (o manifesto de outro parser), entra logo antes dele.
+    """
+    global _parsers
+    with _lock_registro:
+        novos = [p for p in _parsers if p.manifesto != parser.manifesto]
+        posicao = next((i for i, p in enumerate(novos) if p.manifesto == antes_de), len(novos))
+        novos.insert(posicao, parser)
+        _parsers = novos
+        _por_nome.clear()
+        _por_nome.update({p.manifesto: p for p in novos if not p.extensao})
+
+
+def parsers() -> list[Parser]:
+    """Os formatos registrados, do mais para o menos prioritário."""
+    return list(_parsers)
+
+
+def parser_para(nome_arquivo: str) -> Parser | None:
+    """O parser de um manifesto (pelo nome do arquivo), ou None."""
+    parser = _por_nome.get(nome_arquivo)
+    if parser is not None:
+        return parser
+    return next((p for p in _parsers if p.extensao and p.casa(nome_arquivo)), None)
+
+
+def escolher_manifesto(nomes_arquivos) -> str | None:
+    """
+    Entre os arquivos de uma pasta, o manifesto do parser mais prioritário
+    (com curinga, o primeiro nome em ordem alfabética). None se não houver.
+    """
+    for parser in _parsers:
+        if parser.extensao:
+            candidatos = sorted(nome for nome in nomes_arquivos if parser.casa(nome))
+            if candidatos:
+                return candidatos[0]
+        elif parser.manifesto in nomes_arquivos:
+            return parser.manifesto
+    return None
+
+
+class LeitorLimitado:
+    """
+    Envolve um arquivo binário e finge que ele termina após 'limite' bytes
+    (marcando 'truncado'). Para parsers que recebem um arquivo (ex: iterparse).
+    """
+
+    def __init__(self, f, limite: int):
+        self._f = f
+        self._restante = limite
+        self.truncado = False
+
+    def read(self, n: int = -1) -> bytes:
+        if self._restante <= 0:
+            if not self.truncado and self._f.read(1):
+                self.truncado = True
+            return b""
+        if n is None or n < 0 or n > self._restante:
+            n = self._restante
+        dados = self._f.read(n)
+        self._restante -= len(dados)
+        return dados
+
+
+def linhas(f, limite: int):
+    """
+    Gera as linhas (texto) de um arquivo binário até 'limite' bytes, sem
+    carregá-lo inteiro. Ao estourar o limite, gera o valor True e para:
+        for linha in linhas(f, limite):
+            if linha is True: truncado = True; break
+    """
+    lidos = 0
+    while True:
+        # Também limita uma única linha gigante (ex: um arquivo sem quebras)
+        linha = f.readline(limite - lidos + 1)
+        if not linha:
+            return
+        lidos += len(linha)
+        if lidos > limite:
+            yield True
+            return
+        yield linha.decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+ENTRY_POINTS_PYTHON = ["main.py", "app.py", "run.py", "__init__.py"]
+ENTRY_POINTS_NODE = [
+    "index.js", "server.js", "app.js", "main.js",
+    "index.ts", "server.ts", "app.ts", "main.ts",
+    "main.tsx", "index.tsx"
+]
+ENTRY_POINTS_JVM = ["Main.java", "Application.java", "App.java", "Main.kt", "Application.kt"]
+PASTAS_JVM = ["src/main/java", "src/main/kotlin"]
+ENTRY_POINTS_DOTNET = ["Program.cs", "Startup.cs"]
+
+for _parser in (
+    # Python
+    Parser("pyproject.toml", "Python", "manifestos.python:extrair_pyproject",
+           ENTRY_POINTS_PYTHON, comando_instalacao="`pip install ./{caminho}`"),
+    Parser("Pipfile", "Python", "manifestos.python:extrair_pipfile",
+           ENTRY_POINTS_PYTHON, comando_instalacao="`pipenv install`"),
+    # JavaScript
+    Parser("package.json", "JavaScript (Node.js)", "manifestos.node:extrair_package_json",
+           ENTRY_POINTS_NODE, comando_instalacao="`npm install`"),
+    Parser("requirements.txt", "Python", "manifestos.python:extrair_requirements",
+           ENTRY_POINTS_PYTHON, comando_instalacao="`pip install -r {manifesto}`"),
+    # Java
+    Parser("pom.xml", "Java (Maven)", "manifestos.maven:extrair_pom",
+           ENTRY_POINTS_JVM, PASTAS_JVM, comando_instalacao="`mvn install`"),
+    Parser("build.gradle", "Java (Gradle)", "manifestos.gradle:extrair_gradle",
+           ENTRY_POINTS_JVM, PASTAS_JVM, comando_instalacao="`./gradlew build`"),
+    Parser("build.gradle.kts", "Java (Gradle)", "manifestos.gradle:extrair_gradle",
+           ENTRY_POINTS_JVM, PASTAS_JVM, comando_instalacao="`./gradlew build`"),
+    # Go
+    Parser("go.mod", "Go", "manifestos.go:extrair_go_mod",
+           ["main.go"], comando_instalacao="`go mod download`"),
+    # Ruby
+    Parser("Gemfile", "Ruby", "manifestos.ruby:extrair_gemfile",
+           ["app.rb", "main.rb", "config.ru", "application.rb"], comando_instalacao="`bundle install`"),
+    # C#
+    Parser("*.csproj", "C# (.NET)", "manifestos.dotnet:extrair_csproj",
+           ENTRY_POINTS_DOTNET, comando_instalacao="`dotnet restore {manifesto}`"),
+    # Uma solução só agrupa projetos; as dependências ficam nos .csproj
+    Parser("*.sln", "C# (.NET)", None,
+           ENTRY_POINTS_DOTNET, comando_instalacao="`dotnet restore {manifesto}`"),
+):
+    registrar(_parser)
@@ -0,0 +1,19 @@
+import xml.etree.ElementTree as ET
+from manifestos import MAX_BYTES_MANIFESTO, LeitorLimitado
+
+
+def extrair_csproj(f, limite: int = MAX_BYTES_MANIFESTO) -> tuple[list[str], bool]:
+    """Pacotes NuGet (<PackageReference Include="...">) de um .csproj, em streaming."""
+    leitor = LeitorLimitado(f, limite)
+    dependencias = []
+    try:
+        for _, elem in ET.iterparse(leitor, events=("end",)):
+            if elem.tag.rsplit("}", 1)[-1] == "PackageReference":
+                nome = elem.get("Include") or elem.get("Update")
+                if nome:
+                    dependencias.append(nome)
+            elem.clear()
+    except ET.ParseError:
+        if not leitor.truncado:
+            raise
+    return list(dict.fromkeys(dependencias)), leitor.truncado
@@ -0,0 +1,31 @@
+from manifestos import MAX_BYTES_MANIFESTO, linhas
+
+
+def extrair_go_mod(f, limite: int = MAX_BYTES_MANIFESTO) -> tuple[list[str], bool]:
+    """
+    Módulos exigidos por um go.mod ('require' em linha ou em bloco), sem os
+    marcados como '// indirect' (dependências das dependências).
+    """
+    dependencias = []
+    no_bloco = False
+    for linha in linhas(f, limite):
+        if linha is True:
+            return dependencias, True
+        indireta = "// indirect" in linha
+        texto = linha.split("//", 1)[0].strip()
+        if no_bloco:
+            if texto.startswith(")"):
+                no_bloco = False
+                continue
+            partes = texto.split()
+        elif texto.startswith("require"):
+            resto = texto[len("require"):].strip()
+            if resto.startswith("("):
+                no_bloco = True
+                continue
+            partes = resto.split()
+        else:
+            continue
+        if len(partes) >= 2 and not indireta:
+            dependencias.append(partes[0])
+    return dependencias, False
@@ -0,0 +1,40 @@
+import re
+from manifestos import MAX_BYTES_MANIFESTO, linhas
+
+# Configurações que declaram dependências (Groovy e Kotlin DSL)
+_CONFIGURACOES = (
+    r"\b(?:implementation|api|compileOnly|runtimeOnly|annotationProcessor|kapt|ksp|"
+    r"testImplementation|testRuntimeOnly|testCompileOnly|developmentOnly|compile|testCompile|runtime)"
+)
+# implementation 'g:a:v' | implementation("g:a:v") | implementation(platform("g:a:v"))
+_RE_COORDENADA = re.compile(
+    _CONFIGURACOES + r"""\s*\(?\s*(?:(?:enforcedPlatform|platform)\s*\(\s*)?["']([^"':\s]+):([^"':\s]+)"""
+)
+# implementation group: 'g', name: 'a'
+_RE_MAPA = re.compile(
+    _CONFIGURACOES + r"""\s*\(?\s*group\s*[:=]\s*["']([^"']+)["']\s*,\s*name\s*[:=]\s*["']([^"']+)["']"""
+)
+# implementation(libs.spring.boot.web) (version catalog)
+_RE_CATALOGO = re.compile(_CONFIGURACOES + r"\s*\(?\s*(libs\.[\w.]+)")
+
+
+def extrair_gradle(f, limite: int = MAX_BYTES_MANIFESTO) -> tuple[list[str], bool]:
+    """
+    Dependências (group:name) de um build.gradle ou build.gradle.kts, linha a
+    linha. Sem executar o Gradle, só as declarações literais são reconhecidas.
+    """
+    dependencias = []
+    for linha in linhas(f, limite):
+        if linha is True:
+            return list(dict.fromkeys(dependencias)), True
+        texto = linha.strip()
+        if texto.startswith(("//", "/*", "*")):
+            continue
+        m = _RE_COORDENADA.search(texto) or _RE_MAPA.search(texto)
+        if m:
+            dependencias.append(f"{m.group(1)}:{m.group(2)}")
+            continue
+        m = _RE_CATALOGO.search(texto)
+        if m:
+            dependencias.append(m.group(1))
+    return list(dict.fromkeys(dependencias)), False
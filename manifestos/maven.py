@@ -0,0 +1,41 @@
+import xml.etree.ElementTree as ET
+from manifestos import MAX_BYTES_MANIFESTO, LeitorLimitado
+
+
+def _nome_local(tag: str) -> str:
+    """'{http://maven.apache.org/POM/4.0.0}artifactId' -> 'artifactId'."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def extrair_pom(f, limite: int = MAX_BYTES_MANIFESTO) -> tuple[list[str], bool]:
+    """
+    Dependências (groupId:artifactId) de um pom.xml, lidas em streaming com
+    iterparse: cada elemento é esvaziado assim que processado, então a memória
+    não cresce com o arquivo. Ignora as dependências de plugins e o
+    dependencyManagement (que só fixa versões).
+    Retorna (dependências, truncado): para de ler ao passar de 'limite' bytes.
+    """
+    leitor = LeitorLimitado(f, limite)
+    dependencias = []
+    caminho = []
+    try:
+        for evento, elem in ET.iterparse(leitor, events=("start", "end")):
+            if evento == "start":
+                caminho.append(_nome_local(elem.tag))
+                continue
+
+            nome = caminho.pop()
+            if nome == "dependency" and caminho[-1:] == ["dependencies"] and \
+               "plugin" not in caminho and "dependencyManagement" not in caminho:
+                campos = {_nome_local(filho.tag): (filho.text or "").strip() for filho in elem}
+                artefato, grupo = campos.get("artifactId"), campos.get("groupId")
+                if artefato:
+                    dependencias.append(f"{grupo}:{artefato}" if grupo else artefato)
+            # Os filhos de um <dependency> ainda são lidos no fim dele
+            if caminho[-1:] != ["dependency"]:
+                elem.clear()
+    except ET.ParseError:
+        if not leitor.truncado:
+            raise
+    # Perfis podem repetir a mesma dependência
+    return list(dict.fromkeys(dependencias)), leitor.truncado
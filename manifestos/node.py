@@ -0,0 +1,186 @@
+import re
+import json
+import codecs
+from manifestos import MAX_BYTES_MANIFESTO, TAMANHO_BLOCO
+
+CHAVES_PACKAGE_JSON = ("dependencies", "devDependencies")
+
+
+class _FimInesperado(ValueError):
+    """O JSON terminou (ou o limite foi atingido) no meio de um valor."""
+
+
+_RE_ESTRUTURA = re.compile(r'["{}\[\]]')
+_RE_FIM_STRING = re.compile(r'["\\]')
+_RE_FIM_ESCALAR = re.compile(r"[\s,}\]]")
+
+
+class _LeitorJSON:
+    """
+    Percorre um documento JSON em blocos, sem montar o objeto inteiro:
+    só as strings pedidas são decodificadas; o resto é pulado contando
+    chaves/colchetes (com buscas de regex, não caractere a caractere).
+    """
+
+    def __init__(self, f, limite: int):
+        self._f = f
+        self._limite = limite
+        self._lidos = 0
+        self._decodificador = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._fim = False
+        self.buffer = ""
+        self.pos = 0
+        self.truncado = False
+
+    def _carregar(self) -> bool:
+        """Descarta o que já foi consumido e lê mais um bloco. False no fim do arquivo ou do limite."""
+        if self._fim:
+            return False
+        bloco = self._f.read(min(TAMANHO_BLOCO, self._limite - self._lidos + 1))
+        self._lidos += len(bloco)
+        if self._lidos > self._limite:
+            bloco = bloco[:len(bloco) - (self._lidos - self._limite)]
+            self.truncado = True
+            self._fim = True
+        elif not bloco:
+            self._fim = True
+        texto = self._decodificador.decode(bloco, final=self._fim)
+        self.buffer = self.buffer[self.pos:] + texto
+        self.pos = 0
+        return bool(texto) or not self._fim
+
+    def caractere(self) -> str:
+        """Próximo caractere que não seja espaço (sem consumi-lo); '' no fim."""
+        while True:
+            while self.pos < len(self.buffer):
+                if not self.buffer[self.pos].isspace():
+                    return self.buffer[self.pos]
+                self.pos += 1
+            if not self._carregar():
+                return ""
+
+    def esperar(self, esperado: str) -> None:
+        c = self.caractere()
+        if c != esperado:
+            if not c:
+                raise _FimInesperado(f"JSON incompleto (esperava '{esperado}').")
+            raise ValueError(f"JSON inválido: esperava '{esperado}', encontrou '{c}'.")
+        self.pos += 1
+
+    def _percorrer_string(self, guardar: bool) -> str:
+        """Consome uma string (o cursor está nas aspas de abertura)."""
+        self.esperar('"')
+        partes = []
+        while True:
+            m = _RE_FIM_STRING.search(self.buffer, self.pos)
+            if m is None:
+                if guardar:
+                    partes.append(self.buffer[self.pos:])
+                self.pos = len(self.buffer)
+                if not self._carregar():
+                    raise _FimInesperado("JSON incompleto (string sem fim).")
+                continue
+            if m.group() == '"':
+                if guardar:
+                    partes.append(self.buffer[self.pos:m.start()])
+                self.pos = m.end()
+                return json.loads('"' + "".join(partes) + '"') if guardar else ""
+            # Barra invertida: o escape precisa do caractere seguinte (ou de 5, para \uXXXX).
+            # _carregar() desloca o buffer (mesmo no fim), então a posição é relativa a self.pos
+            deslocamento = m.start() - self.pos
+            while len(self.buffer) - self.pos - deslocamento < 6 and self._carregar():
+                pass
+            barra = self.pos + deslocamento
+            if barra + 1 >= len(self.buffer):
+                raise _FimInesperado("JSON incompleto (string sem fim).")
+            tamanho = 6 if self.buffer[barra + 1] == "u" else 2
+            if guardar:
+                partes.append(self.buffer[self.pos:barra + tamanho])
+            self.pos = barra + tamanho
+
+    def ler_string(self) -> str:
+        return self._percorrer_string(guardar=True)
+
+    def pular_valor(self) -> None:
+        """Consome um valor qualquer (string, número, literal, objeto ou lista)."""
+        c = self.caractere()
+        if c == '"':
+            self._percorrer_string(guardar=False)
+            return
+        if c not in ("{", "["):
+            # Número, true, false ou null: vai até o próximo separador
+            while True:
+                m = _RE_FIM_ESCALAR.search(self.buffer, self.pos)
+                if m is not None:
+                    self.pos = m.start()
+                    return
+                self.pos = len(self.buffer)
+                if not self._carregar():
+                    return
+        profundidade = 0
+        while True:
+            m = _RE_ESTRUTURA.search(self.buffer, self.pos)
+            if m is None:
+                self.pos = len(self.buffer)
+                if not self._carregar():
+                    raise _FimInesperado("JSON incompleto (objeto ou lista sem fim).")
+                continue
+            if m.group() == '"':
+                self.pos = m.start()
+                self._percorrer_string(guardar=False)
+                continue
+            self.pos = m.end()
+            profundidade += 1 if m.group() in "{[" else -1
+            if profundidade == 0:
+                return
+
+    def chaves_objeto(self):
+        """Gera as chaves de um objeto, pulando os valores."""
+        self.esperar("{")
+        while True:
+            c = self.caractere()
+            if c == "}":
+                self.pos += 1
+                return
+            if c == ",":
+                self.pos += 1
+                continue
+            chave = self.ler_string()
+            self.esperar(":")
+            self.pular_valor()
+            yield chave
+
+
+def extrair_package_json(f, limite: int = MAX_BYTES_MANIFESTO) -> tuple[list[str], bool]:
+    """
+    Extrai as chaves de 'dependencies' e 'devDependencies' de um package.json
+    (aberto em binário) sem montar o documento inteiro: os demais campos
+    (ex: dados embutidos, listas enormes) são pulados em blocos.
+    Retorna (dependências, truncado): para de ler ao passar de 'limite' bytes
+    e devolve o que já tinha encontrado.
+    """
+    leitor = _LeitorJSON(f, limite)
+    encontradas = {chave: [] for chave in CHAVES_PACKAGE_JSON}
+    try:
+        leitor.esperar("{")
+        while True:
+            c = leitor.caractere()
+            if c in ("}", ""):
+                break
+            if c == ",":
+                leitor.pos += 1
+                continue
+            chave = leitor.ler_string()
+            leitor.esperar(":")
+            if chave in encontradas and leitor.caractere() == "{":
+                # Como no json.load, uma chave repetida vale pela última ocorrência
+                encontradas[chave] = []
+                for dependencia in leitor.chaves_objeto():
+                    encontradas[chave].append(dependencia)
+            else:
+                leitor.pular_valor()
+    except _FimInesperado:
+        if not leitor.truncado:
+            raise
+    dependencias = [d for chave in CHAVES_PACKAGE_JSON for d in encontradas[chave]]
+    return dependencias, leitor.truncado
@@ -0,0 +1,77 @@
+import re
+import tomli  # pip install tomli
+from manifestos import MAX_BYTES_MANIFESTO, linhas
+
+# Nome de um requisito (PEP 508): letras/dígitos, com '.', '_' e '-' no meio,
+# seguido do fim ou de extras, versão, marcadores ou URL ('@')
+_RE_NOME_PEP508 = re.compile(
+    r"\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)(?=\s*(?:$|[\[(;@<>=!~,]))"
+)
+# Comentário no requirements.txt: '#' no início ou precedido de espaço
+_RE_COMENTARIO = re.compile(r"(?:^|\s)#.*$")
+
+
+def nome_pep508(especificacao: str) -> str | None:
+    """
+    Extrai o nome do pacote de uma especificação PEP 508, ex:
+    'requests[socks]>=2.0; python_version<"3.8"' -> 'requests'.
+    Retorna None se a linha não começar por um nome (URL, caminho local...).
+    """
+    m = _RE_NOME_PEP508.match(especificacao)
+    return m.group(1) if m else None
+
+
+def extrair_requirements(f, limite: int = MAX_BYTES_MANIFESTO) -> tuple[list[str], bool]:
+    """
+    Lê um requirements.txt (aberto em binário) linha a linha, sem carregá-lo
+    inteiro. Ignora comentários e opções (-r, -e, --index-url...) e junta
+    linhas continuadas com '\\'.
+    Retorna (dependências, truncado): para de ler ao passar de 'limite' bytes.
+    """
+    dependencias = []
+    pendente = ""
+    for texto in linhas(f, limite):
+        if texto is True:
+            return dependencias, True
+        if texto.endswith("\\"):
+            pendente += texto[:-1]
+            continue
+        texto, pendente = pendente + texto, ""
+
+        texto = _RE_COMENTARIO.sub("", texto).strip()
+        if not texto or texto.startswith("-"):
+            continue
+        nome = nome_pep508(texto)
+        if nome:
+            dependencias.append(nome)
+
+    nome = nome_pep508(pendente) if pendente else None
+    if nome:
+        dependencias.append(nome)
+    return dependencias, False
+
+
+def extrair_pyproject(f, limite: int = MAX_BYTES_MANIFESTO) -> tuple[list[str], bool]:
+    """
+    Dependências de um pyproject.toml (PEP 621 ou Poetry). TOML não dá para
+    ler pela metade: acima de 'limite' bytes o arquivo não é interpretado.
+    """
+    dados = f.read(limite + 1)
+    if len(dados) > limite:
+        return [], True
+    dados = tomli.loads(dados.decode("utf-8"))
+    deps = dados.get("project", {}).get("dependencies", [])
+    if not deps:
+        poetry_deps = dados.get("tool", {}).get("poetry", {}).get("dependencies", {})
+        if isinstance(poetry_deps, dict):
+            deps = [d for d in poetry_deps.keys() if d.lower() != 'python']
+    return [nome for nome in map(nome_pep508, deps) if nome], False
+
+
+def extrair_pipfile(f, limite: int = MAX_BYTES_MANIFESTO) -> tuple[list[str], bool]:
+    """Pacotes das seções [packages] e [dev-packages] de um Pipfile (TOML)."""
+    dados = f.read(limite + 1)
+    if len(dados) > limite:
+        return [], True
+    dados = tomli.loads(dados.decode("utf-8"))
+    return [nome for secao in ("packages", "dev-packages") for nome in dados.get(secao, {})], False
@@ -0,0 +1,17 @@
+import re
+from manifestos import MAX_BYTES_MANIFESTO, linhas
+
+# gem 'rails', '~> 7.0'  |  gem("puma")
+_RE_GEM = re.compile(r"""^\s*gem\s*\(?\s*["']([^"']+)["']""")
+
+
+def extrair_gemfile(f, limite: int = MAX_BYTES_MANIFESTO) -> tuple[list[str], bool]:
+    """Gems declaradas num Gemfile (inclusive dentro de blocos 'group')."""
+    dependencias = []
+    for linha in linhas(f, limite):
+        if linha is True:
+            return list(dict.fromkeys(dependencias)), True
+        m = _RE_GEM.match(linha)
+        if m:
+            dependencias.append(m.group(1))
+    return list(dict.fromkeys(dependencias)), False
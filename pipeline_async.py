@@ -0,0 +1,356 @@
+import os
+import sys
+import shutil
+import time
+import asyncio
+import weakref
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+import cloner
+import analyzer
+import generator
+import telemetria
+
+# Tempo máximo de cada fase, em segundos (0 = sem limite)
+TIMEOUT_CLONE_S = float(os.getenv("README_AI_TIMEOUT_CLONE_S", "300"))
+TIMEOUT_ANALISE_S = float(os.getenv("README_AI_TIMEOUT_ANALISE_S", "120"))
+TIMEOUT_GERACAO_S = float(os.getenv("README_AI_TIMEOUT_GERACAO_S", "300"))
+
+# Threads para o trabalho de disco/CPU (varredura, leituras, limpeza).
+# É o único ponto bloqueante do pipeline, por isso tem tamanho fixo.
+MAX_WORKERS_DISCO = int(os.getenv("README_AI_MAX_WORKERS_DISCO", "8"))
+
+# Limites padrão por fase (a IA já é limitada pelo ClienteModeloAsync)
+MAX_CLONES_ASYNC = 16
+MAX_ANALISES_ASYNC = MAX_WORKERS_DISCO
+
+_executor_disco = None
+_limites_por_loop = weakref.WeakKeyDictionary()
+
+
+class ErroGit(RuntimeError):
+    """Falha de um comando git executado como subprocesso assíncrono."""
+
+    def __init__(self, argumentos: tuple, stderr: str):
+        super().__init__(f"git {' '.join(argumentos)} falhou: {stderr}")
+        self.stderr = stderr
+
+
+class LimitesPipelineAsync:
+    """
+    Versão asyncio de main.LimitesPipeline: semáforos que limitam quantos
+    jobs podem estar clonando ou analisando ao mesmo tempo no event loop.
+    """
+
+    def __init__(self, clones: int = MAX_CLONES_ASYNC, analises: int = MAX_ANALISES_ASYNC):
+        self.clone = asyncio.Semaphore(clones)
+        self.analise = asyncio.Semaphore(analises)
+
+
+def _limites_padrao() -> LimitesPipelineAsync:
+    # Semáforos do asyncio pertencem a um único event loop
+    loop = asyncio.get_running_loop()
+    if loop not in _limites_por_loop:
+        _limites_por_loop[loop] = LimitesPipelineAsync()
+    return _limites_por_loop[loop]
+
+
+def _obter_executor() -> ThreadPoolExecutor:
+    global _executor_disco
+    if _executor_disco is None:
+        _executor_disco = ThreadPoolExecutor(max_workers=MAX_WORKERS_DISCO,
+                                             thread_name_prefix="readme-ai-disco")
+    return _executor_disco
+
+
+async def _executar(funcao: Callable, *args, **kwargs):
+    """Roda uma função bloqueante no executor de disco sem travar o event loop."""
+    loop = asyncio.get_running_loop()
+    # run_in_executor não propaga o contexto (span atual da telemetria) sozinho
+    tarefa = telemetria.no_contexto_atual(functools.partial(funcao, *args, **kwargs))
+    return await loop.run_in_executor(_obter_executor(), tarefa)
+
+
+async def _com_timeout(corrotina, timeout_s: float | None):
+    if not timeout_s:
+        return await corrotina
+    return await asyncio.wait_for(corrotina, timeout_s)
+
+
+async def _git(*argumentos: str, cwd: str | None = None) -> str:
+    """
+    Executa 'git' como subprocesso assíncrono e retorna o stdout.
+    Se a tarefa for cancelada (ou estourar o timeout), o processo é encerrado.
+    """
+    processo = await asyncio.create_subprocess_exec(
+        "git", *argumentos, cwd=cwd,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},  # Nunca pedir senha no terminal
+    )
+    try:
+        saida, erro = await processo.communicate()
+    except asyncio.CancelledError:
+        if processo.returncode is None:
+            processo.kill()
+            await processo.wait()
+        raise
+    if processo.returncode != 0:
+        raise ErroGit(argumentos, erro.decode("utf-8", errors="replace").strip())
+    return saida.decode("utf-8", errors="replace")
+
+
+async def _clonar_parcial_async(repo_url: str, destino: str) -> None:
+    """Mesmo fluxo de cloner._clonar_parcial, com o git rodando em subprocessos assíncronos."""
+    try:
+        await _git("clone", "--depth=1", "--filter=blob:none", "--no-checkout", "--", repo_url, destino)
+    except ErroGit as e:
+        print(f"Clone parcial recusado pelo servidor ({e.stderr}). Usando clone completo...")
+        await _executar(_remover_pasta, destino)
+        await _git("clone", "--", repo_url, destino)
+        return
+
+    saida = await _git("ls-tree", "-r", "--name-only", "-z", "HEAD", cwd=destino)
+    arquivos = [a for a in saida.split("\0") if a]
+    _, diretorios = await _executar(cloner._escrever_sparse_checkout, os.path.join(destino, ".git"), arquivos)
+    await _git("-c", "core.sparseCheckout=true", "read-tree", "-mu", "HEAD", cwd=destino)
+    await _executar(cloner._criar_esqueleto, destino, diretorios)
+
+
+async def _clonar_arvore_async(repo_url: str, destino: str) -> None:
+    """Mesmo fluxo de cloner._clonar_arvore: clone bare sem blobs + busca em lote dos necessários."""
+    try:
+        await _git("clone", "--bare", "--depth=1", "--filter=blob:none", "--", repo_url, destino)
+    except ErroGit as e:
+        print(f"Clone parcial recusado pelo servidor ({e.stderr}). Usando clone bare completo...")
+        await _executar(_remover_pasta, destino)
+        await _git("clone", "--bare", "--depth=1", "--", repo_url, destino)
+        return
+
+    try:
+        promisor = await _git("config", "--get", "remote.origin.promisor", cwd=destino)
+    except ErroGit:
+        return  # Chave ausente: o servidor ignorou o filtro e o clone veio completo
+    if promisor.strip() != "true":
+        return
+    oids = cloner._oids_necessarios(await _git("ls-tree", "-r", "-z", "HEAD", cwd=destino))
+    try:
+        for i in range(0, len(oids), cloner.MAX_OBJETOS_POR_FETCH):
+            await _git("-c", "fetch.negotiationAlgorithm=noop", "fetch", "--no-tags", "--no-write-fetch-head",
+                       "origin", *oids[i:i + cloner.MAX_OBJETOS_POR_FETCH], cwd=destino)
+    except ErroGit as e:
+        print(f"Busca em lote dos blobs recusada ({e.stderr}). Eles serão lidos sob demanda.")
+
+
+async def _vigiar_tamanho(orcamento: cloner.OrcamentoClone, destino: str) -> None:
+    """Mede a pasta do clone periodicamente; levanta LimiteClone ao passar do orçamento."""
+    while True:
+        await asyncio.sleep(cloner.INTERVALO_MEDICAO_CLONE_S)
+        orcamento.verificar(await _executar(cloner._tamanho_pasta, destino))
+
+
+async def _com_orcamento(corrotina, orcamento: cloner.OrcamentoClone, destino: str) -> None:
+    """
+    Roda o clone enquanto vigia o tamanho da pasta. Se passar do orçamento,
+    o clone é cancelado (o que mata o git) e a LimiteClone é propagada.
+    """
+    clone = asyncio.ensure_future(corrotina)
+    vigia = asyncio.ensure_future(_vigiar_tamanho(orcamento, destino))
+    try:
+        await asyncio.wait({clone, vigia}, return_when=asyncio.FIRST_COMPLETED)
+        if vigia.done():
+            vigia.result()
+        clone.result()
+    finally:
+        for tarefa in (clone, vigia):
+            tarefa.cancel()
+        await asyncio.gather(clone, vigia, return_exceptions=True)
+    # Um clone rápido pode terminar entre duas medições
+    orcamento.verificar(await _executar(cloner._tamanho_pasta, destino))
+
+
+def _remover_pasta(caminho: str) -> None:
+    if os.path.exists(caminho):
+        shutil.rmtree(caminho, onerror=cloner.handle_remove_readonly)
+
+
+async def clonar_async(area: cloner.AreaTrabalho) -> str:
+    """
+    Clona o repositório da área de trabalho com 'git' em subprocesso assíncrono.
+    Preenche area.caminho e area.hash_arvore. Levanta exceção em caso de falha
+    (a limpeza da pasta fica a cargo de area.limpar()).
+
+    Com espelho, a LojaEspelhos (que usa travas entre processos) roda no
+    executor; nesse caso o cancelamento só tem efeito ao fim da preparação.
+
+    A pasta segue o limite de bytes de area.orcamento (o prazo é o timeout da
+    fase): ao passar dele, o clone é refeito no modo árvore, como em cloner.
+    """
+    if area.modo not in cloner.MODOS_CLONE:
+        raise ValueError(f"Modo de clone inválido: {area.modo}. Use um de {cloner.MODOS_CLONE}.")
+    if area.orcamento is None:
+        area.orcamento = cloner.OrcamentoClone(timeout_s=0)
+
+    destino = area.destino()
+    with telemetria.span("clone", modo=area.modo, espelho=area.usar_espelho) as s:
+        print(f"Clonando {area.repo_url} (modo {area.modo})...")
+        try:
+            if area.usar_espelho:
+                # Roda numa thread que o cancelamento não interrompe: o próprio
+                # cloner aplica o orçamento (e não há vigia disputando a pasta)
+                await _executar(cloner.LojaEspelhos().preparar_worktree, area.repo_url, destino, area.modo,
+                                area.orcamento)
+            elif area.modo == cloner.MODO_PARCIAL:
+                await _com_orcamento(_clonar_parcial_async(area.repo_url, destino), area.orcamento, destino)
+            elif area.modo == cloner.MODO_ARVORE:
+                await _com_orcamento(_clonar_arvore_async(area.repo_url, destino), area.orcamento, destino)
+            else:
+                await _com_orcamento(_git("clone", "--", area.repo_url, destino), area.orcamento, destino)
+        except cloner.LimiteClone as e:
+            if e.motivo == "tempo" or (area.modo == cloner.MODO_ARVORE and not area.usar_espelho):
+                raise
+            print(f"{e} Refazendo o clone no modo {cloner.MODO_ARVORE}...")
+            await _executar(_remover_pasta, destino)
+            s.definir(modo_efetivo=cloner.MODO_ARVORE)
+            await _com_orcamento(_clonar_arvore_async(area.repo_url, destino), area.orcamento, destino)
+
+        area.caminho = destino
+        area.hash_arvore = (await _git("rev-parse", "HEAD^{tree}", cwd=destino)).strip() or None
+        s.definir(bytes=await _executar(cloner._tamanho_pasta, destino))
+    print(f"Clone concluído com sucesso em: {destino}")
+    return destino
+
+
+async def gerar_readme_async(repo_url: str, modo_clone: str = cloner.MODO_PARCIAL,
+                             usar_espelho: bool = False, usar_cache: bool = True,
+                             ao_receber_trecho: Callable[[str], None] | None = None,
+                             limites: LimitesPipelineAsync | None = None,
+                             timeout_clone_s: float | None = TIMEOUT_CLONE_S,
+                             timeout_analise_s: float | None = TIMEOUT_ANALISE_S,
+                             timeout_geracao_s: float | None = TIMEOUT_GERACAO_S,
+                             cliente=None,
+                             config_varredura: analyzer.ConfigVarredura | None = None,
+                             readme_anterior: str | None = None) -> dict:
+    """
+    Pipeline completo (clone -> análise -> geração) em asyncio, para rodar
+    centenas de jobs num único event loop:
+    - o clone é um subprocesso 'git' assíncrono;
+    - a análise roda no executor de disco, de tamanho fixo;
+    - a IA é chamada pelo cliente assíncrono (generate_content_async).
+
+    Cada fase tem seu timeout; ao estourar, o job termina com status "erro".
+    Para cancelar, cancele a tarefa (ex: asyncio.create_task(...).cancel()):
+    o subprocesso do git é encerrado e a pasta temporária é removida.
+    'ao_receber_trecho' é chamada com cada pedaço do README gerado.
+    Com 'readme_anterior', só as seções afetadas pelas mudanças desde a
+    última análise são reescritas (ver generator.gerar_readme_stream).
+
+    Retorna {url, status, readme, stacks, tempos, erro, fase_erro}, mais
+    'avisos' (limites do clone atingidos) e 'parcial' (ver analyzer.montar_contexto).
+    """
+    limites = limites or _limites_padrao()
+    resultado = {"url": repo_url, "status": "erro", "readme": None, "stacks": 0, "tempos": {}}
+    inicio = time.perf_counter()
+    fase = "clone"
+
+    area = cloner.AreaTrabalho(repo_url, modo=modo_clone, usar_espelho=usar_espelho)
+    limpeza = None
+    span_pipeline = telemetria.iniciar_span("pipeline", url=repo_url)
+    token_span = telemetria.ativar(span_pipeline)
+
+    def limpar_area():
+        # Uma única limpeza por job; 'shield' garante que ela vá até o fim
+        # mesmo que a tarefa seja cancelada enquanto espera
+        nonlocal limpeza
+        if limpeza is None:
+            limpeza = asyncio.ensure_future(_executar(area.limpar))
+        return asyncio.shield(limpeza)
+
+    try:
+        # --- FASE 1: COLETA DE DADOS ---
+        async with limites.clone:
+            t0 = time.perf_counter()
+            await _com_timeout(clonar_async(area), timeout_clone_s)
+            resultado["tempos"]["clone"] = round(time.perf_counter() - t0, 3)
+
+        fase = "analise"
+        async with limites.analise:
+            t0 = time.perf_counter()
+            # Com timeout, a thread da análise ainda termina em segundo plano,
+            # mas o resultado é descartado e a pasta é removida em seguida
+            contexto_para_ia = await _com_timeout(_executar(
+                analyzer.montar_contexto, area.caminho, repo_url,
+                hash_arvore=area.hash_arvore, usar_cache=usar_cache, config=config_varredura
+            ), timeout_analise_s)
+            resultado["tempos"]["analise"] = round(time.perf_counter() - t0, 3)
+
+        await limpar_area()
+
+        resultado["stacks"] = len(contexto_para_ia["stacks"])
+        if contexto_para_ia.get("parcial"):
+            resultado["parcial"] = contexto_para_ia["parcial"]["motivos"]
+        if not contexto_para_ia["stacks"]:
+            resultado["erro"] = "Nenhuma stack de tecnologia conhecida foi encontrada."
+            return resultado
+
+        # --- FASE 2: GERAÇÃO COM IA ---
+        fase = "geracao"
+        partes = []
+
+        async def consumir():
+            async for trecho in generator.gerar_readme_stream_async(
+                contexto_para_ia, usar_cache=usar_cache, cliente=cliente, readme_anterior=readme_anterior
+            ):
+                partes.append(trecho)
+                if ao_receber_trecho:
+                    ao_receber_trecho(trecho)
+
+        t0 = time.perf_counter()
+        await _com_timeout(consumir(), timeout_geracao_s)
+        resultado["tempos"]["geracao"] = round(time.perf_counter() - t0, 3)
+
+        resultado["readme"] = "".join(partes)
+        if generator.readme_falhou(resultado["readme"]):
+            resultado["erro"] = "A IA não conseguiu gerar o README."
+        else:
+            resultado["status"] = "ok"
+
+    except asyncio.TimeoutError:
+        limite = {"clone": timeout_clone_s, "analise": timeout_analise_s, "geracao": timeout_geracao_s}[fase]
+        resultado["erro"] = f"Tempo esgotado na fase '{fase}' ({limite:g}s)."
+        resultado["fase_erro"] = fase
+
+    except Exception as e:
+        resultado["erro"] = str(e)
+        resultado["fase_erro"] = fase
+
+    finally:
+        await limpar_area()
+        if area.orcamento is not None and area.orcamento.estouros:
+            resultado["avisos"] = list(area.orcamento.estouros)
+        resultado["tempos"]["total"] = round(time.perf_counter() - inicio, 3)
+        span_pipeline.definir(stacks=resultado["stacks"])
+        if resultado["status"] != "ok":
+            span_pipeline.marcar_erro(resultado.get("erro") or "Job cancelado.")
+        telemetria.desativar(token_span)
+        span_pipeline.finalizar()
+
+    return resultado
+
+
+async def gerar_varios_async(urls: list[str], **opcoes) -> list[dict]:
+    """Roda um job por URL no mesmo event loop e devolve os resultados na ordem das URLs."""
+    return await asyncio.gather(*(gerar_readme_async(url, **opcoes) for url in urls))
+
+
+if __name__ == "__main__":
+    # Uso: python pipeline_async.py URL [URL ...]
+    if len(sys.argv) < 2:
+        print("Uso: python pipeline_async.py URL [URL ...]")
+        sys.exit(2)
+
+    resultados = asyncio.run(gerar_varios_async(sys.argv[1:]))
+    for r in resultados:
+        detalhe = f"{r['stacks']} stacks" if r["status"] == "ok" else r.get("erro")
+        print(f"{r['status']:>4}  {r['url']}  ({detalhe}, {r['tempos'].get('total')}s)")
+    sys.exit(0 if all(r["status"] == "ok" for r in resultados) else 1)
@@ -0,0 +1,492 @@
+# Serviço HTTP (sem interface) em volta do pipeline clone -> análise -> geração,
+# para ser chamado por outros serviços. Só usa a biblioteca padrão (http.server).
+#
+#   GET /analisar?url=...   contexto coletado (JSON), sem chamar a IA
+#   GET /gerar?url=...      README gerado (JSON; com 'Accept: text/markdown', só o texto)
+#   GET /saude              o processo está de pé e quanto da capacidade está em uso
+#   GET /metricas           requisições, fila, respostas 304/429 e caches
+#
+# Parâmetros opcionais: modo (completo/parcial/arvore), max_stacks e sem_cache=1.
+#
+# As respostas levam ETag derivada do commit do repositório (+ generator.chave_prompt,
+# em /gerar). O commit do HEAD é consultado com 'git ls-remote', sem clonar: se
+# não mudou, a resposta sai da memória na hora (ou 304, se o cliente mandou
+# If-None-Match com a mesma ETag). Mesmo sem o resultado em memória, um
+# If-None-Match igual em /gerar evita a chamada à IA.
+#
+# No máximo MAX_EXECUCOES pipelines rodam ao mesmo tempo; as demais requisições
+# esperam numa fila curta e, com a fila cheia (ou a espera longa demais),
+# recebem 429 com Retry-After.
+#
+# Uso: python servidor.py [--host 127.0.0.1] [--porta 8080]
+import os
+import re
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+import contextlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import cache
+import cloner
+import analyzer
+import ingestao
+import telemetria
+
+HOST = os.getenv("README_AI_SERVIDOR_HOST", "127.0.0.1")
+PORTA = int(os.getenv("README_AI_SERVIDOR_PORTA", "8080"))
+# Pipelines (clone + análise, ou geração) executados ao mesmo tempo
+MAX_EXECUCOES = int(os.getenv("README_AI_SERVIDOR_MAX_EXECUCOES", "4"))
+# Requisições esperando uma execução livre; acima disso, 429
+MAX_FILA = int(os.getenv("README_AI_SERVIDOR_MAX_FILA", "16"))
+# Quanto uma requisição espera na fila antes de desistir (429)
+ESPERA_MAX_S = float(os.getenv("README_AI_SERVIDOR_ESPERA_MAX_S", "30"))
+# Estimativa inicial da duração de uma execução (base do Retry-After)
+DURACAO_INICIAL_S = float(os.getenv("README_AI_SERVIDOR_DURACAO_INICIAL_S", "10"))
+# Resultados (por repositório e commit) guardados em memória
+MAX_RESULTADOS = int(os.getenv("README_AI_SERVIDOR_MAX_RESULTADOS", "500"))
+# Esquemas de URL aceitos; 'file' (inclui caminhos locais) expõe o disco do servidor
+ESQUEMAS_PERMITIDOS = tuple(
+    esquema.strip() for esquema in os.getenv("README_AI_SERVIDOR_ESQUEMAS", "https").split(",") if esquema.strip()
+)
+MODO_CLONE_PADRAO = os.getenv("README_AI_SERVIDOR_MODO_CLONE", cloner.MODO_PARCIAL)
+
+ROTA_ANALISAR = "/analisar"
+ROTA_GERAR = "/gerar"
+ROTA_SAUDE = "/saude"
+ROTA_METRICAS = "/metricas"
+
+ROTAS = (ROTA_ANALISAR, ROTA_GERAR, ROTA_SAUDE, ROTA_METRICAS)
+
+TIPO_JSON = "application/json; charset=utf-8"
+TIPO_MARKDOWN = "text/markdown; charset=utf-8"
+
+
+class ErroRequisicao(Exception):
+    """Erro que vira uma resposta HTTP com 'status' e {"erro": mensagem}."""
+
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+class Sobrecarga(ErroRequisicao):
+    """Fila cheia ou espera longa demais: 429 com Retry-After."""
+
+    def __init__(self, mensagem: str, retry_after: int):
+        super().__init__(429, mensagem)
+        self.retry_after = retry_after
+
+
+class Admissao:
+    """
+    Limita as execuções simultâneas ('max_simultaneas') com uma fila de
+    espera curta ('max_fila'). Quem não cabe na fila, ou espera mais que
+    'espera_max_s', recebe Sobrecarga com um Retry-After estimado pela
+    duração média das execuções recentes.
+
+        with admissao.vaga():
+            ...
+    """
+
+    def __init__(self, max_simultaneas: int = MAX_EXECUCOES, max_fila: int = MAX_FILA,
+                 espera_max_s: float = ESPERA_MAX_S, duracao_inicial_s: float = DURACAO_INICIAL_S):
+        self.max_simultaneas = max_simultaneas
+        self.max_fila = max_fila
+        self.espera_max_s = espera_max_s
+        self.em_execucao = 0
+        self.na_fila = 0
+        self.recusadas = 0
+        self._duracao_media_s = duracao_inicial_s
+        self._condicao = threading.Condition()
+
+    def retry_after(self) -> int:
+        """Segundos até uma vaga provavelmente abrir (chamar com a condição)."""
+        rodadas = (self.na_fila + 1) / max(self.max_simultaneas, 1)
+        return max(1, math.ceil(self._duracao_media_s * rodadas))
+
+    def _recusar(self, mensagem: str) -> Sobrecarga:
+        self.recusadas += 1
+        return Sobrecarga(mensagem, self.retry_after())
+
+    def entrar(self) -> None:
+        with self._condicao:
+            if self.em_execucao < self.max_simultaneas and self.na_fila == 0:
+                self.em_execucao += 1
+                return
+            if self.na_fila >= self.max_fila:
+                raise self._recusar(f"Servidor ocupado ({self.em_execucao} execuções, {self.na_fila} na fila).")
+            self.na_fila += 1
+            try:
+                livre = self._condicao.wait_for(lambda: self.em_execucao < self.max_simultaneas,
+                                                timeout=self.espera_max_s)
+            finally:
+                self.na_fila -= 1
+            if not livre:
+                raise self._recusar(f"Nenhuma execução livre em {self.espera_max_s:g}s.")
+            self.em_execucao += 1
+
+    def sair(self, duracao_s: float) -> None:
+        with self._condicao:
+            self.em_execucao -= 1
+            # Média móvel: as execuções recentes pesam mais
+            self._duracao_media_s = 0.8 * self._duracao_media_s + 0.2 * duracao_s
+            self._condicao.notify()
+
+    @contextlib.contextmanager
+    def vaga(self):
+        self.entrar()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sair(time.perf_counter() - inicio)
+
+    def estatisticas(self) -> dict:
+        with self._condicao:
+            return {
+                "max_execucoes": self.max_simultaneas,
+                "em_execucao": self.em_execucao,
+                "max_fila": self.max_fila,
+                "na_fila": self.na_fila,
+                "recusadas": self.recusadas,
+                "duracao_media_s": round(self._duracao_media_s, 3),
+            }
+
+
+class MemoriaResultados:
+    """Resultados prontos (ETag + corpo) por chave, descartando os menos usados."""
+
+    def __init__(self, max_itens: int = MAX_RESULTADOS):
+        self.max_itens = max_itens
+        self._itens: OrderedDict[tuple, tuple[str, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: tuple) -> tuple[str, dict] | None:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+            return item
+
+    def gravar(self, chave: tuple, etag: str, corpo: dict) -> None:
+        with self._lock:
+            self._itens[chave] = (etag, corpo)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._itens)
+
+
+def _etag(*partes, fraca: bool = False) -> str:
+    valor = f'"{cache.gerar_chave(*partes)[:32]}"'
+    return f"W/{valor}" if fraca else valor
+
+
+def etag_confere(if_none_match: str | None, etag: str) -> bool:
+    """Comparação fraca do RFC 9110: ignora o 'W/' dos dois lados; '*' sempre confere."""
+    if not if_none_match:
+        return False
+    valor = etag.removeprefix("W/")
+    for candidata in if_none_match.split(","):
+        candidata = candidata.strip()
+        if candidata == "*" or candidata.removeprefix("W/") == valor:
+            return True
+    return False
+
+
+def _esquema(url: str) -> str:
+    if re.match(r"^[\w.-]+@[^:/]+:", url):  # ex: git@github.com:dono/repo.git
+        return "ssh"
+    esquema = urlsplit(url).scheme.lower()
+    # Caminhos locais (inclusive 'C:\...' no Windows) contam como 'file'
+    return esquema if len(esquema) > 1 else "file"
+
+
+class ServicoReadme:
+    """
+    O pipeline por trás das rotas: consulta o commit, reaproveita resultados,
+    agrupa requisições idênticas em andamento e respeita a Admissao.
+    Cada método retorna (etag, corpo) ou levanta ErroRequisicao.
+    """
+
+    def __init__(self, admissao: Admissao | None = None, memoria: MemoriaResultados | None = None,
+                 modo_clone: str = MODO_CLONE_PADRAO, usar_espelho: bool = True,
+                 esquemas_permitidos: tuple[str, ...] = ESQUEMAS_PERMITIDOS):
+        self.admissao = admissao or Admissao()
+        self.memoria = memoria or MemoriaResultados()
+        self.modo_clone = modo_clone
+        self.usar_espelho = usar_espelho
+        self.esquemas_permitidos = esquemas_permitidos
+        self.iniciado_em = time.time()
+        self._em_andamento: dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self._contadores = {"requisicoes": {}, "status": {}, "respostas_304": 0, "acertos_memoria": 0,
+                            "agrupadas": 0, "geracoes_evitadas": 0}
+
+    # --- Contadores (para /metricas) ---
+
+    def contar(self, campo: str, subcampo: str | None = None) -> None:
+        with self._lock:
+            if subcampo is None:
+                self._contadores[campo] += 1
+            else:
+                self._contadores[campo][subcampo] = self._contadores[campo].get(subcampo, 0) + 1
+
+    def metricas(self) -> dict:
+        with self._lock:
+            contadores = json.loads(json.dumps(self._contadores))
+            em_andamento = len(self._em_andamento)
+        metricas = {
+            "ativo_ha_s": round(time.time() - self.iniciado_em, 1),
+            **contadores,
+            "em_andamento": em_andamento,
+            "admissao": self.admissao.estatisticas(),
+            "resultados_em_memoria": len(self.memoria),
+        }
+        # Só se a IA já foi usada: /metricas não deve carregar o SDK
+        if "generator" in sys.modules:
+            metricas["cache_respostas_ia"] = sys.modules["generator"].estatisticas_cache()
+        return metricas
+
+    # --- Pipeline ---
+
+    def _uma_vez(self, chave: tuple, funcao):
+        """
+        Executa 'funcao' (dentro da Admissao) uma vez por chave: quem chegar com
+        a mesma chave enquanto ela roda espera e recebe o mesmo resultado.
+        """
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            lider = futuro is None
+            if lider:
+                futuro = self._em_andamento[chave] = Future()
+        if not lider:
+            self.contar("agrupadas")
+            return futuro.result()
+        try:
+            with self.admissao.vaga():
+                futuro.set_result(funcao())
+        except BaseException as e:
+            futuro.set_exception(e)
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+        return futuro.result()
+
+    def _validar(self, parametros: dict) -> tuple[str, str, analyzer.ConfigVarredura, bool]:
+        url = (parametros.get("url") or "").strip()
+        if not url:
+            raise ErroRequisicao(400, "Informe o repositório no parâmetro 'url'.")
+        if _esquema(url) not in self.esquemas_permitidos:
+            aceitos = ", ".join(self.esquemas_permitidos)
+            raise ErroRequisicao(400, f"Esquema de URL não permitido (aceitos: {aceitos}).")
+        modo = parametros.get("modo") or self.modo_clone
+        if modo not in cloner.MODOS_CLONE:
+            raise ErroRequisicao(400, f"Modo de clone inválido (use {', '.join(cloner.MODOS_CLONE)}).")
+        max_stacks = analyzer.VARREDURA_MAX_STACKS
+        if parametros.get("max_stacks"):
+            try:
+                max_stacks = int(parametros["max_stacks"])
+            except ValueError:
+                raise ErroRequisicao(400, "'max_stacks' deve ser um número inteiro.")
+        usar_cache = parametros.get("sem_cache", "0").lower() not in ("1", "true", "sim")
+        return url, modo, analyzer.ConfigVarredura(max_stacks=max_stacks), usar_cache
+
+    def _coletar(self, url: str, modo: str, config: analyzer.ConfigVarredura, usar_cache: bool) -> dict:
+        """Clona e analisa (ou lê o .zip/.tar.gz em memória)."""
+        if ingestao.e_arquivo_compactado(url):
+            try:
+                return ingestao.montar_contexto(url, config=config)
+            except Exception as e:
+                raise ErroRequisicao(502, f"Falha ao ler o arquivo: {e}")
+        with cloner.AreaTrabalho(url, modo=modo, usar_espelho=self.usar_espelho) as area:
+            if not area.caminho:
+                raise ErroRequisicao(502, " ".join(["Falha no clone.", *area.orcamento.estouros]))
+            return analyzer.montar_contexto(area.caminho, url, hash_arvore=area.hash_arvore,
+                                            usar_cache=usar_cache, config=config)
+
+    def analisar(self, parametros: dict) -> tuple[str, dict]:
+        url, modo, config, usar_cache = self._validar(parametros)
+        return self._analisar(url, modo, config, usar_cache)
+
+    def _analisar(self, url: str, modo: str, config: analyzer.ConfigVarredura,
+                  usar_cache: bool) -> tuple[str, dict]:
+        commit = None
+        if not ingestao.e_arquivo_compactado(url):
+            commit = cloner.obter_commit_remoto(url)
+            if commit is None:
+                raise ErroRequisicao(502, "Não foi possível acessar o repositório (ou ele está vazio).")
+        chave = (ROTA_ANALISAR, cloner.normalizar_url(url), commit, config.chave())
+        if commit and usar_cache:
+            guardado = self.memoria.obter(chave)
+            if guardado is not None:
+                self.contar("acertos_memoria")
+                return guardado
+
+        def executar():
+            contexto = self._coletar(url, modo, config, usar_cache)
+            # Um arquivo compactado não tem commit: a ETag vem do próprio contexto
+            versao = contexto.get("commit") or commit or json.dumps(contexto, sort_keys=True)
+            etag = _etag(ROTA_ANALISAR, versao, config.chave(), analyzer.VERSAO_ANALISADOR)
+            if commit:
+                self.memoria.gravar(chave, etag, contexto)
+            return etag, contexto
+
+        return self._uma_vez(chave + (usar_cache,), executar)
+
+    def gerar(self, parametros: dict, if_none_match: str | None = None) -> tuple[str, dict | None]:
+        """Como analisar, mas o corpo traz o README. Corpo None = 304 (a ETag conferiu)."""
+        import generator
+        url, modo, config, usar_cache = self._validar(parametros)
+        _, contexto = self._analisar(url, modo, config, usar_cache)
+        if not contexto["stacks"]:
+            raise ErroRequisicao(422, "Nenhuma stack de tecnologia conhecida foi encontrada.")
+
+        commit = contexto.get("commit")
+        etag = _etag(ROTA_GERAR, commit or "", generator.chave_prompt(contexto), fraca=True)
+        chave = (ROTA_GERAR, cloner.normalizar_url(url), etag)
+        if usar_cache:
+            guardado = self.memoria.obter(chave)
+            if guardado is not None:
+                self.contar("acertos_memoria")
+                return guardado
+            if etag_confere(if_none_match, etag):
+                # O cliente já tem o README deste commit e destas entradas: nem chama a IA
+                self.contar("geracoes_evitadas")
+                return etag, None
+
+        def executar():
+            readme = generator.gerar_readme(contexto, usar_cache=usar_cache)
+            if generator.readme_falhou(readme):
+                raise ErroRequisicao(502, "A IA não conseguiu gerar o README.")
+            corpo = {
+                "url": url,
+                "commit": commit,
+                "readme": readme,
+                "stacks": [{"tecnologia": stack["tecnologia"], "caminho": stack["caminho"]}
+                           for stack in contexto["stacks"]],
+                "parcial": contexto.get("parcial"),
+            }
+            self.memoria.gravar(chave, etag, corpo)
+            return etag, corpo
+
+        return self._uma_vez(chave + (usar_cache,), executar)
+
+
+class TratadorHTTP(BaseHTTPRequestHandler):
+    """Traduz as rotas para o ServicoReadme do servidor ('self.server.servico')."""
+
+    server_version = "readme-ai"
+    protocol_version = "HTTP/1.1"
+
+    def _enviar(self, status: int, corpo: bytes = b"", tipo: str = TIPO_JSON,
+                cabecalhos: dict | None = None) -> None:
+        self.send_response(status)
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        if status != 304:
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(corpo)
+
+    def _enviar_json(self, status: int, dados: dict, cabecalhos: dict | None = None) -> None:
+        self._enviar(status, json.dumps(dados, ensure_ascii=False).encode("utf-8"), TIPO_JSON, cabecalhos)
+
+    def do_GET(self):
+        servico: ServicoReadme = self.server.servico
+        partes = urlsplit(self.path)
+        rota = partes.path.rstrip("/") or "/"
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(partes.query).items()}
+        servico.contar("requisicoes", rota if rota in ROTAS else "outras")
+        status = 500
+        try:
+            if rota == ROTA_SAUDE:
+                status = 200
+                self._enviar_json(status, {"status": "ok", **servico.admissao.estatisticas()})
+                return
+            if rota == ROTA_METRICAS:
+                status = 200
+                self._enviar_json(status, servico.metricas())
+                return
+            if rota not in (ROTA_ANALISAR, ROTA_GERAR):
+                status = 404
+                self._enviar_json(status, {"erro": f"Rota desconhecida: {rota}"})
+                return
+
+            if_none_match = self.headers.get("If-None-Match")
+            with telemetria.span("servidor", rota=rota, url=parametros.get("url")) as s:
+                if rota == ROTA_ANALISAR:
+                    etag, corpo = servico.analisar(parametros)
+                else:
+                    etag, corpo = servico.gerar(parametros, if_none_match)
+                s.definir(etag=etag)
+            cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+            if corpo is None or etag_confere(if_none_match, etag):
+                status = 304
+                servico.contar("respostas_304")
+                self._enviar(status, cabecalhos=cabecalhos)
+            elif rota == ROTA_GERAR and "text/markdown" in self.headers.get("Accept", ""):
+                status = 200
+                self._enviar(status, corpo["readme"].encode("utf-8"), TIPO_MARKDOWN, cabecalhos)
+            else:
+                status = 200
+                self._enviar_json(status, corpo, cabecalhos)
+        except Sobrecarga as e:
+            status = e.status
+            self._enviar_json(status, {"erro": e.mensagem}, {"Retry-After": str(e.retry_after)})
+        except ErroRequisicao as e:
+            status = e.status
+            self._enviar_json(status, {"erro": e.mensagem})
+        except Exception as e:
+            status = 500
+            self._enviar_json(status, {"erro": f"Erro inesperado: {e}"})
+        finally:
+            servico.contar("status", str(status))
+
+
+def criar_servidor(host: str = HOST, porta: int = PORTA,
+                   servico: ServicoReadme | None = None) -> ThreadingHTTPServer:
+    """Cria (sem iniciar) o servidor HTTP. Use serve_forever() para atender."""
+    servidor = ThreadingHTTPServer((host, porta), TratadorHTTP)
+    servidor.daemon_threads = True
+    servidor.servico = servico or ServicoReadme()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="README-AI: serviço HTTP de análise e geração de READMEs.")
+    parser.add_argument("--host", default=HOST, help=f"Endereço de escuta (padrão: {HOST}).")
+    parser.add_argument("--porta", type=int, default=PORTA, help=f"Porta (padrão: {PORTA}).")
+    parser.add_argument("--max-execucoes", type=int, default=MAX_EXECUCOES,
+                        help="Pipelines executados ao mesmo tempo.")
+    parser.add_argument("--max-fila", type=int, default=MAX_FILA,
+                        help="Requisições aguardando; acima disso a resposta é 429.")
+    args = parser.parse_args()
+
+    servidor = criar_servidor(args.host, args.porta,
+                              ServicoReadme(Admissao(args.max_execucoes, args.max_fila)))
+    print(f"Servidor README-AI em http://{args.host}:{args.porta} "
+          f"({args.max_execucoes} execuções, fila de {args.max_fila}).")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nEncerrando...")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import os
+import json
+import time
+import uuid
+import functools
+import threading
+import contextlib
+import contextvars
+from typing import Callable
+
+# Se definido, todos os spans também são gravados neste arquivo (JSON lines)
+ARQUIVO_TELEMETRIA = os.getenv("README_AI_TELEMETRIA_ARQUIVO") or None
+
+# Span ativo e coletores do contexto atual (thread ou tarefa asyncio)
+_span_atual = contextvars.ContextVar("readme_ai_span_atual", default=None)
+_coletores = contextvars.ContextVar("readme_ai_coletores", default=())
+
+# Destinos globais (recebem os spans de todas as execuções do processo)
+_destinos = []
+_lock_destinos = threading.Lock()
+
+
+class Span:
+    """
+    Um trecho medido do pipeline (ex: "clone", "analise.varredura", "geracao"),
+    com duração, atributos (bytes, arquivos, tokens...) e o span pai.
+    """
+
+    def __init__(self, nome: str, pai: "Span | None" = None, atributos: dict | None = None):
+        self.nome = nome
+        self.id = uuid.uuid4().hex[:16]
+        self.pai_id = pai.id if pai else None
+        self.trace_id = pai.trace_id if pai else uuid.uuid4().hex
+        self.inicio = time.time()
+        self._inicio_perf = time.perf_counter()
+        self.duracao_s = None
+        self.atributos = dict(atributos or {})
+        self.status = "ok"
+        self.erro = None
+
+    def definir(self, **atributos) -> None:
+        """Adiciona ou atualiza atributos do span."""
+        self.atributos.update(atributos)
+
+    def decorrido(self) -> float:
+        """Segundos desde o início do span."""
+        return time.perf_counter() - self._inicio_perf
+
+    def marcar_erro(self, erro: BaseException | str) -> None:
+        self.status = "erro"
+        self.erro = erro if isinstance(erro, str) else f"{type(erro).__name__}: {erro}"
+
+    def finalizar(self, erro: BaseException | None = None) -> None:
+        if self.duracao_s is not None:
+            return
+        self.duracao_s = self.decorrido()
+        if erro is not None:
+            self.marcar_erro(erro)
+        _emitir("finalizar", self)
+
+    def para_dict(self) -> dict:
+        return {
+            "nome": self.nome,
+            "id": self.id,
+            "pai_id": self.pai_id,
+            "trace_id": self.trace_id,
+            "inicio": self.inicio,
+            "duracao_s": None if self.duracao_s is None else round(self.duracao_s, 6),
+            "status": self.status,
+            "erro": self.erro,
+            "atributos": self.atributos,
+        }
+
+
+def _emitir(evento: str, span_: Span) -> None:
+    with _lock_destinos:
+        destinos = list(_destinos)
+    for destino in (*destinos, *_coletores.get()):
+        metodo = getattr(destino, evento, None)
+        if metodo is None:
+            continue
+        try:
+            metodo(span_)
+        except Exception as e:
+            # A instrumentação nunca pode derrubar o pipeline
+            print(f"Falha ao exportar telemetria ({type(destino).__name__}): {e}")
+
+
+def adicionar_destino(destino) -> None:
+    """
+    Registra um destino global. Um destino é qualquer objeto com
+    finalizar(span) e, opcionalmente, iniciar(span).
+    """
+    with _lock_destinos:
+        _destinos.append(destino)
+
+
+def remover_destino(destino) -> None:
+    with _lock_destinos:
+        if destino in _destinos:
+            _destinos.remove(destino)
+
+
+def span_atual() -> Span | None:
+    return _span_atual.get()
+
+
+def iniciar_span(nome: str, **atributos) -> Span:
+    """
+    Cria um span filho do span atual SEM torná-lo o atual.
+    Útil em geradores (streaming), onde trocar o contexto entre os 'yield'
+    vazaria para quem consome. Termine com span.finalizar().
+    """
+    novo = Span(nome, _span_atual.get(), atributos)
+    _emitir("iniciar", novo)
+    return novo
+
+
+@contextlib.contextmanager
+def span(nome: str, **atributos):
+    """
+    Mede o bloco 'with' como um span filho do span atual:
+
+        with telemetria.span("clone", modo="parcial") as s:
+            ...
+            s.definir(bytes=1234)
+    """
+    novo = iniciar_span(nome, **atributos)
+    token = _span_atual.set(novo)
+    try:
+        yield novo
+    except BaseException as e:
+        _span_atual.reset(token)
+        novo.finalizar(erro=e)
+        raise
+    _span_atual.reset(token)
+    novo.finalizar()
+
+
+def ativar(span_: Span) -> contextvars.Token:
+    """
+    Torna 'span_' o span atual, para trechos que não cabem num único 'with'.
+    Desfaça com desativar(token) no mesmo contexto.
+    """
+    return _span_atual.set(span_)
+
+
+def desativar(token: contextvars.Token) -> None:
+    _span_atual.reset(token)
+
+
+def definir(**atributos) -> None:
+    """Adiciona atributos ao span atual (se houver)."""
+    atual = _span_atual.get()
+    if atual is not None:
+        atual.definir(**atributos)
+
+
+def no_contexto_atual(funcao: Callable) -> Callable:
+    """
+    Prende 'funcao' a uma cópia do contexto atual (span e coletores) para
+    que ela possa rodar em outra thread, ex:
+        executor.submit(telemetria.no_contexto_atual(funcao), *args)
+    Deve ser chamada uma vez por tarefa, na thread que a submete.
+    """
+    return functools.partial(contextvars.copy_context().run, funcao)
+
+
+class DestinoJSONL:
+    """Grava cada span finalizado como uma linha JSON (seguro entre threads)."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+    def finalizar(self, span_: Span) -> None:
+        linha = json.dumps(span_.para_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(linha + "\n")
+
+
+class ColetorMemoria:
+    """Guarda os spans finalizados em memória (para testes e para o app)."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def finalizar(self, span_: Span) -> None:
+        with self._lock:
+            self.spans.append(span_)
+
+    def por_nome(self, nome: str) -> list[Span]:
+        return [s for s in self.spans if s.nome == nome]
+
+    def resumo(self) -> list[dict]:
+        """
+        Uma linha por nome de span, na ordem em que apareceram:
+        quantidade, duração total (s) e os atributos do último.
+        """
+        linhas = {}
+        for s in sorted(self.spans, key=lambda s: s.inicio):
+            linha = linhas.setdefault(s.nome, {"fase": s.nome, "vezes": 0, "duracao_s": 0.0, "atributos": {}})
+            linha["vezes"] += 1
+            linha["duracao_s"] += s.duracao_s or 0.0
+            linha["atributos"].update(s.atributos)
+        for linha in linhas.values():
+            linha["duracao_s"] = round(linha["duracao_s"], 3)
+        return list(linhas.values())
+
+    def limpar(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+@contextlib.contextmanager
+def coletar():
+    """
+    Coleta em memória apenas os spans criados dentro do bloco (inclusive em
+    threads/tarefas que herdem o contexto), sem misturar execuções paralelas:
+
+        with telemetria.coletar() as coletor:
+            ...
+        print(coletor.resumo())
+    """
+    coletor = ColetorMemoria()
+    token = _coletores.set((*_coletores.get(), coletor))
+    try:
+        yield coletor
+    finally:
+        _coletores.reset(token)
+
+
+class ExportadorOpenTelemetry:
+    """
+    Repassa os spans para o OpenTelemetry (pacote opcional 'opentelemetry-api',
+    com o SDK/exportador configurado pela aplicação). Mantém a hierarquia pai/filho.
+    """
+
+    def __init__(self, nome_tracer: str = "readme-ai"):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "O exportador OpenTelemetry requer 'opentelemetry-api' "
+                "(pip install opentelemetry-api opentelemetry-sdk)."
+            ) from e
+        self._trace = trace
+        self._tracer = trace.get_tracer(nome_tracer)
+        self._abertos = {}
+        self._lock = threading.Lock()
+
+    def iniciar(self, span_: Span) -> None:
+        with self._lock:
+            pai = self._abertos.get(span_.pai_id)
+        contexto = self._trace.set_span_in_context(pai) if pai is not None else None
+        otel = self._tracer.start_span(span_.nome, context=contexto,
+                                       start_time=int(span_.inicio * 1e9))
+        with self._lock:
+            self._abertos[span_.id] = otel
+
+    def finalizar(self, span_: Span) -> None:
+        with self._lock:
+            otel = self._abertos.pop(span_.id, None)
+        if otel is None:
+            return
+        for chave, valor in span_.atributos.items():
+            if isinstance(valor, (str, bool, int, float)):
+                otel.set_attribute(f"readme_ai.{chave}", valor)
+        if span_.erro:
+            otel.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span_.erro))
+        otel.end(end_time=int((span_.inicio + span_.duracao_s) * 1e9))
+
+
+if ARQUIVO_TELEMETRIA:
+    adicionar_destino(DestinoJSONL(ARQUIVO_TELEMETRIA))
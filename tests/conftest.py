@@ -0,0 +1,38 @@
+# Os módulos do projeto ficam na raiz (layout plano): deixa-os importáveis nos testes.
+# Os caches em disco vão para uma pasta temporária, para não tocar no cache do usuário.
+import os
+import sys
+import tempfile
+import subprocess
+
+import pytest
+
+os.environ.setdefault("README_AI_PASTA_CACHE", tempfile.mkdtemp(prefix="readme-ai-testes-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def escrever_arquivos(pasta, arquivos: dict[str, str]) -> None:
+    for caminho, conteudo in arquivos.items():
+        destino = pasta / caminho
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        destino.write_text(conteudo, encoding="utf-8")
+
+
+ARQUIVOS_PROJETO = {
+    "requirements.txt": "flask>=2\nrequests  # http\n",
+    "app/main.py": "def main():\n    pass\n",
+    "frontend/package.json": '{"name": "web", "dependencies": {"react": "^18"}, "devDependencies": {"vite": "^5"}}',
+    "frontend/index.js": "console.log('oi')\n",
+}
+
+
+@pytest.fixture
+def repo_git(tmp_path):
+    """Repositório git local com uma stack Python na raiz e uma Node em frontend/."""
+    pasta = tmp_path / "repo"
+    escrever_arquivos(pasta, ARQUIVOS_PROJETO)
+    git = ["git", "-C", str(pasta), "-c", "user.email=testes@readme-ai", "-c", "user.name=testes"]
+    subprocess.run(git[:3] + ["init", "-q"], check=True)
+    subprocess.run(git + ["add", "."], check=True)
+    subprocess.run(git + ["commit", "-qm", "inicial"], check=True)
+    return pasta
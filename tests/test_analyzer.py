@@ -0,0 +1,78 @@
+# Leitura do código principal: só os primeiros bytes de um entry point enorme
+# vão para a memória, e um corte no meio de um caractere UTF-8 não é erro.
+# Cache de análises: por árvore (sem o commit) e a última análise por URL.
+import subprocess
+
+import pytest
+
+import cache
+import cloner
+import analyzer
+
+STACK_PYTHON = {"tecnologia": "Python", "caminho": ".", "arquivo": "requirements.txt"}
+# 'é' ocupa 2 bytes: com o 'a' na frente, o teto de bytes cai no meio de um caractere
+MAIN_GRANDE = "a" + "é" * 100_000
+
+
+def _git(pasta, *argumentos: str) -> None:
+    git = ["git", "-C", str(pasta), "-c", "user.email=testes@readme-ai", "-c", "user.name=testes"]
+    subprocess.run(git + list(argumentos), check=True)
+
+
+def _commitar(pasta, caminho: str, conteudo: str) -> None:
+    (pasta / caminho).write_text(conteudo, encoding="utf-8")
+    _git(pasta, "commit", "-qam", f"altera {caminho}")
+
+
+def _conferir(codigo: dict) -> None:
+    assert codigo["arquivo"] == "app/main.py"
+    assert codigo["conteudo"].startswith(MAIN_GRANDE[:analyzer.MAX_CARACTERES_CODIGO])
+    assert codigo["conteudo"].endswith("(arquivo truncado para análise)")
+
+
+def test_codigo_principal_da_arvore_le_no_maximo_o_teto(repo_git):
+    _commitar(repo_git, "app/main.py", MAIN_GRANDE)
+    indice = analyzer.RepoIndexArvore(str(repo_git))
+    limites = []
+    ler_bytes = indice.ler_bytes
+
+    def espiar(caminho_rel, limite=None):
+        limites.append(limite)
+        return ler_bytes(caminho_rel, limite)
+
+    indice.ler_bytes = espiar
+    _conferir(analyzer.ler_codigo_principal(str(repo_git), STACK_PYTHON, indice))
+    assert limites == [analyzer.MAX_BYTES_CODIGO]
+
+
+def test_codigo_principal_do_disco(repo_git):
+    (repo_git / "app/main.py").write_text(MAIN_GRANDE, encoding="utf-8")
+    _conferir(analyzer.ler_codigo_principal(str(repo_git), STACK_PYTHON))
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    monkeypatch.setattr(analyzer, "_cache_analise", cache.CacheDisco("analise", pasta=str(tmp_path / "c")))
+    monkeypatch.setattr(analyzer, "_cache_ultima_analise",
+                        cache.CacheDisco("ultima_analise", pasta=str(tmp_path / "c")))
+
+
+def _analisar(pasta, url: str) -> dict:
+    return analyzer.montar_contexto(str(pasta), url, hash_arvore=cloner.obter_hash_arvore(str(pasta)))
+
+
+def test_acerto_por_arvore_traz_o_commit_do_clone(repo_git, caches):
+    primeiro = _analisar(repo_git, "https://example.com/dono/repo")
+    # Mesma árvore, outro commit (ex: um commit vazio, um revert ou um fork)
+    _git(repo_git, "commit", "-q", "--allow-empty", "-m", "vazio")
+    segundo = _analisar(repo_git, "https://example.com/outro/fork")
+    assert segundo["hash_arvore"] == primeiro["hash_arvore"]
+    assert segundo["commit"] == analyzer.obter_commit(str(repo_git)) != primeiro["commit"]
+    assert segundo["url_repo"] == "https://example.com/outro/fork"
+
+
+def test_ultima_analise_e_compartilhada_por_urls_equivalentes(repo_git, caches):
+    _analisar(repo_git, "https://example.com/dono/repo")
+    _commitar(repo_git, "requirements.txt", "flask>=2\nrequests\nhttpx\n")
+    contexto = _analisar(repo_git, "https://example.com/dono/repo.git")
+    assert "mudancas" in contexto
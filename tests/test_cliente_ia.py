@@ -0,0 +1,164 @@
+# Cliente da IA com modelos falsos (sem rede): agrupamento de prompts idênticos,
+# limite de taxa e retentativas.
+import time
+import asyncio
+import threading
+
+import pytest
+
+import cliente_ia
+
+
+class _Chunk:
+    def __init__(self, texto):
+        self.text = texto
+
+
+class ServiceUnavailable(Exception):
+    """Mesmo nome da exceção 503 do google.api_core."""
+
+
+class ModeloFalso:
+    """
+    Responde com o próprio prompt depois de 'atraso_s'. As primeiras
+    'falhas' chamadas levantam 'erro' (ex: um 503 transitório).
+    """
+
+    def __init__(self, atraso_s: float = 0.0, falhas: int = 0, erro: Exception | None = None):
+        self.atraso_s = atraso_s
+        self.falhas = falhas
+        self.erro = erro or ServiceUnavailable("503")
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.chamadas += 1
+            falhar = self.chamadas <= self.falhas
+        time.sleep(self.atraso_s)
+        if falhar:
+            raise self.erro
+        return [_Chunk(prompt[:1]), _Chunk(prompt[1:])]
+
+
+def _cliente(modelo, **opcoes) -> cliente_ia.ClienteModelo:
+    opcoes = {"requisicoes_por_minuto": 60_000, "rajada": 1000, "backoff_base_s": 0.001, **opcoes}
+    return cliente_ia.ClienteModelo(modelo=modelo, **opcoes)
+
+
+def test_agrupa_prompts_identicos_em_andamento():
+    modelo = ModeloFalso(atraso_s=0.2)
+    cliente = _cliente(modelo)
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(cliente.gerar("mesmo prompt")))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert resultados == ["mesmo prompt"] * 5
+    assert modelo.chamadas == 1
+    assert cliente.estatisticas()["agrupadas"] == 4
+
+
+def test_prompts_diferentes_nao_sao_agrupados():
+    modelo = ModeloFalso()
+    cliente = _cliente(modelo)
+    assert [cliente.gerar(p) for p in ("a", "b", "a")] == ["a", "b", "a"]
+    assert modelo.chamadas == 3
+
+
+def test_repete_erros_transitorios():
+    modelo = ModeloFalso(falhas=2)
+    cliente = _cliente(modelo, max_tentativas=3)
+    assert cliente.gerar("ok") == "ok"
+    assert modelo.chamadas == 3
+    assert cliente.estatisticas()["retentativas"] == 2
+
+
+def test_nao_repete_erros_permanentes():
+    modelo = ModeloFalso(falhas=1, erro=ValueError("chave inválida"))
+    cliente = _cliente(modelo, max_tentativas=3)
+    with pytest.raises(ValueError):
+        cliente.gerar("x")
+    assert modelo.chamadas == 1
+
+
+def test_desiste_depois_de_max_tentativas():
+    modelo = ModeloFalso(falhas=5)
+    with pytest.raises(ServiceUnavailable):
+        _cliente(modelo, max_tentativas=2).gerar("x")
+    assert modelo.chamadas == 2
+
+
+def test_balde_limita_a_taxa_depois_da_rajada():
+    balde = cliente_ia.BaldeTokens(taxa_por_segundo=20, capacidade=2)
+    inicio = time.monotonic()
+    for _ in range(4):
+        balde.adquirir()
+    # 2 tokens na rajada; os outros 2 esperam 1/20 s cada
+    assert time.monotonic() - inicio >= 0.09
+
+
+def test_erros_transitorios():
+    assert cliente_ia.e_erro_transitorio(ServiceUnavailable())
+    assert cliente_ia.e_erro_transitorio(ConnectionError())
+    assert not cliente_ia.e_erro_transitorio(ValueError())
+
+
+class ModeloAsyncFalso:
+    """Responde com o próprio prompt, em dois pedaços, depois de 'atraso_s'."""
+
+    def __init__(self, atraso_s: float = 0.05):
+        self.atraso_s = atraso_s
+        self.chamadas = 0
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.chamadas += 1
+        await asyncio.sleep(self.atraso_s)
+
+        async def pedacos():
+            yield _Chunk(prompt[:1])
+            yield _Chunk(prompt[1:])
+        return pedacos()
+
+
+def _cliente_async(modelo) -> cliente_ia.ClienteModeloAsync:
+    return cliente_ia.ClienteModeloAsync(modelo=modelo, balde=cliente_ia.BaldeTokens(1000, 1000))
+
+
+def test_async_agrupa_prompts_identicos_no_mesmo_loop():
+    modelo = ModeloAsyncFalso()
+    cliente = _cliente_async(modelo)
+
+    async def principal():
+        return await asyncio.gather(*(cliente.gerar("abc") for _ in range(5)))
+
+    assert asyncio.run(principal()) == ["abc"] * 5
+    assert modelo.chamadas == 1
+    assert cliente.agrupadas == 4
+
+
+def test_async_cliente_compartilhado_por_varios_loops():
+    # Regressão: um loop esperava a future de outro loop (RuntimeError)
+    modelo = ModeloAsyncFalso(atraso_s=0.2)
+    cliente = _cliente_async(modelo)
+    resultados, erros = [], []
+    barreira = threading.Barrier(3)
+
+    def em_outro_loop():
+        async def principal():
+            barreira.wait()
+            return await cliente.gerar("mesmo prompt")
+        try:
+            resultados.append(asyncio.run(principal()))
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=em_outro_loop) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert erros == []
+    assert resultados == ["mesmo prompt"] * 3
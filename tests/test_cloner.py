@@ -0,0 +1,13 @@
+# Medição da pasta do clone usada pelo orçamento (OrcamentoClone).
+import cloner
+from conftest import escrever_arquivos
+
+
+def test_tamanho_pasta_soma_subpastas(tmp_path):
+    escrever_arquivos(tmp_path, {"a.txt": "12345", "sub/b.txt": "123", "sub/vazia/c.txt": ""})
+    assert cloner._tamanho_pasta(str(tmp_path)) == 8
+
+
+def test_tamanho_pasta_inexistente_vale_zero(tmp_path):
+    # O git pode falhar (ou ainda não ter começado) antes de criar a pasta do clone
+    assert cloner._tamanho_pasta(str(tmp_path / "ainda-nao-existe")) == 0
@@ -0,0 +1,90 @@
+# Cache de respostas da IA (por hash do prompt) com um modelo falso, sem rede.
+import pytest
+
+import cache
+import generator
+
+
+class _Chunk:
+    def __init__(self, texto):
+        self.text = texto
+
+
+class ModeloFalso:
+    """Conta as chamadas e responde um README curto, com as cercas de ```markdown."""
+
+    model_name = "modelo-falso"
+
+    def __init__(self, resposta: str | None = None):
+        self.prompts = []
+        self.resposta = resposta
+
+    def generate_content(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        pedacos = [_Chunk("```markdown\n# Projeto\n"), _Chunk(f"\nResposta {len(self.prompts)}.\n```")]
+        if self.resposta is not None:
+            pedacos = [_Chunk(self.resposta)]
+        return pedacos if stream else _Chunk("".join(p.text for p in pedacos))
+
+
+def _contexto(dependencias=("flask",)) -> dict:
+    return {
+        "url_repo": "https://github.com/dono/projeto",
+        "estrutura_arquivos_raiz": ["app/", "requirements.txt"],
+        "stacks": [{
+            "tecnologia": "Python", "arquivo": "requirements.txt", "caminho": ".",
+            "dependencias": list(dependencias),
+            "codigo_principal": {"arquivo": "app/main.py", "conteudo": "def main():\n    pass\n"},
+        }],
+    }
+
+
+@pytest.fixture
+def modelo(tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "_cache_respostas", cache.CacheDisco("respostas", pasta=str(tmp_path)))
+    return ModeloFalso()
+
+
+def test_prompt_identico_vem_do_cache(modelo):
+    primeiro = generator.gerar_readme(_contexto(), model=modelo)
+    segundo = generator.gerar_readme(_contexto(), model=modelo)
+    assert primeiro == segundo == "# Projeto\n\nResposta 1."
+    assert len(modelo.prompts) == 1
+    assert generator.estatisticas_cache()["acertos"] == 1
+
+
+def test_prompt_diferente_chama_a_ia(modelo):
+    generator.gerar_readme(_contexto(), model=modelo)
+    generator.gerar_readme(_contexto(("flask", "requests")), model=modelo)
+    assert len(modelo.prompts) == 2
+
+
+def test_sem_cache_sempre_chama_a_ia(modelo):
+    generator.gerar_readme(_contexto(), model=modelo)
+    assert generator.gerar_readme(_contexto(), model=modelo, usar_cache=False).endswith("Resposta 2.")
+    assert len(modelo.prompts) == 2
+
+
+@pytest.mark.parametrize("resposta", ["", "```markdown\n```"])
+def test_resposta_vazia_nao_vai_para_o_cache(modelo, resposta):
+    vazio = ModeloFalso(resposta)
+    for _ in range(2):
+        assert generator.readme_falhou(generator.gerar_readme(_contexto(), model=vazio))
+    assert len(vazio.prompts) == 2
+
+
+def test_chave_depende_do_modelo_e_da_configuracao():
+    prompt = generator._construir_prompt(_contexto())
+    chave = generator._chave_resposta(prompt)
+    assert chave != generator._chave_resposta(prompt, "outro-modelo")
+    assert chave != generator._chave_resposta(prompt, config={"temperature": 0.1})
+
+
+def test_chave_prompt_segue_as_entradas_da_geracao():
+    chave = generator.chave_prompt(_contexto())
+    # Dados que não entram no prompt (commit, estatísticas da varredura) não mudam a chave
+    assert chave == generator.chave_prompt({**_contexto(), "commit": "abc", "varredura": {"arquivos": 3}})
+    assert chave != generator.chave_prompt(_contexto(("flask", "requests")))
+    assert chave != generator.chave_prompt(_contexto(), "outro-modelo")
+    # O map-reduce manda outros prompts: a chave muda com o modo
+    assert chave != generator.chave_prompt(_contexto(), map_reduce=True)
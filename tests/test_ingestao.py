@@ -0,0 +1,106 @@
+# Ingestão de .zip/.tar.gz montados em memória: o contexto deve ser o mesmo
+# da análise do checkout equivalente, sem clone e sem extrair para o disco.
+import io
+import json
+import tarfile
+import zipfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+
+import analyzer
+import ingestao
+from conftest import ARQUIVOS_PROJETO, escrever_arquivos
+
+# Como o GitHub: tudo dentro de uma pasta única no topo
+PREFIXO = "projeto-main/"
+
+
+def _zip(arquivos: dict[str, str]) -> bytes:
+    dados = io.BytesIO()
+    with zipfile.ZipFile(dados, "w", zipfile.ZIP_DEFLATED) as z:
+        for caminho, conteudo in arquivos.items():
+            z.writestr(PREFIXO + caminho, conteudo)
+    return dados.getvalue()
+
+
+def _tar_gz(arquivos: dict[str, str]) -> bytes:
+    dados = io.BytesIO()
+    with tarfile.open(fileobj=dados, mode="w:gz") as tar:
+        for caminho, conteudo in arquivos.items():
+            bruto = conteudo.encode("utf-8")
+            info = tarfile.TarInfo(PREFIXO + caminho)
+            info.size = len(bruto)
+            tar.addfile(info, io.BytesIO(bruto))
+    return dados.getvalue()
+
+
+def _comparavel(contexto: dict) -> dict:
+    """A ordem de listagem do disco e a do arquivo podem diferir."""
+    return {
+        "estrutura": sorted(contexto["estrutura_arquivos_raiz"]),
+        "stacks": sorted((json.dumps(stack, sort_keys=True) for stack in contexto["stacks"])),
+    }
+
+
+@pytest.fixture
+def referencia(tmp_path):
+    pasta = tmp_path / "checkout"
+    escrever_arquivos(pasta, ARQUIVOS_PROJETO)
+    return _comparavel(analyzer.montar_contexto(str(pasta), "x", usar_cache=False))
+
+
+@pytest.mark.parametrize("nome, montar", [("projeto.zip", _zip), ("projeto.tar.gz", _tar_gz)])
+def test_arquivo_local_igual_ao_checkout(tmp_path, referencia, nome, montar):
+    caminho = tmp_path / nome
+    caminho.write_bytes(montar(ARQUIVOS_PROJETO))
+    assert ingestao.e_arquivo_compactado(str(caminho))
+    contexto = ingestao.montar_contexto(str(caminho))
+    assert _comparavel(contexto) == referencia
+    assert len(contexto["stacks"]) == 2
+
+
+def test_zip_em_memoria():
+    indice = ingestao.RepoIndexZip("memoria.zip", io.BytesIO(_zip(ARQUIVOS_PROJETO)))
+    assert indice.e_arquivo("frontend/package.json")
+    assert {e.nome for e in indice.listar(".")} == {"requirements.txt", "app", "frontend"}
+    with indice.abrir("requirements.txt") as f:
+        assert f.read() == ARQUIVOS_PROJETO["requirements.txt"]
+    assert indice.estatisticas_ingestao()["arquivos_lidos"] == 1
+
+
+def test_zip_le_no_maximo_o_teto_do_codigo_principal():
+    # Um entry point enorme (ou uma bomba de zip) não é descomprimido inteiro
+    arquivos = {**ARQUIVOS_PROJETO, "app/main.py": "x = 1\n" * 1_000_000}
+    indice = ingestao.RepoIndexZip("memoria.zip", io.BytesIO(_zip(arquivos)))
+    stack = {"tecnologia": "Python", "caminho": ".", "arquivo": "requirements.txt"}
+    codigo = analyzer.ler_codigo_principal("memoria.zip", stack, indice)
+    assert codigo["conteudo"].endswith("(arquivo truncado para análise)")
+    assert indice.estatisticas_ingestao()["bytes_lidos"] == analyzer.MAX_BYTES_CODIGO
+
+
+def test_tar_guarda_so_os_candidatos():
+    arquivos = {**ARQUIVOS_PROJETO, "dados/grande.bin": "x" * 100_000}
+    indice = ingestao.RepoIndexTar("memoria.tar.gz", io.BytesIO(_tar_gz(arquivos)))
+    assert indice.tamanho("dados/grande.bin") == 100_000
+    # Só manifestos e entry points ficam na memória
+    assert indice.estatisticas_ingestao()["candidatos_em_memoria"] == 4
+    with pytest.raises(FileNotFoundError):
+        indice.abrir("dados/grande.bin")
+
+
+def test_arquivo_remoto_sem_range(tmp_path, referencia):
+    (tmp_path / "projeto.zip").write_bytes(_zip(ARQUIVOS_PROJETO))
+    (tmp_path / "projeto.tar.gz").write_bytes(_tar_gz(ARQUIVOS_PROJETO))
+    tratador = functools.partial(SimpleHTTPRequestHandler, directory=str(tmp_path))
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), tratador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        for nome in ("projeto.zip", "projeto.tar.gz"):
+            url = f"http://127.0.0.1:{servidor.server_port}/{nome}"
+            assert _comparavel(ingestao.montar_contexto(url)) == referencia
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,118 @@
+# Fila de jobs com o pipeline substituído por um falso (sem clone nem IA):
+# agrupamento por URL, reaproveitamento de resultados, fila cheia e poda.
+import threading
+
+import pytest
+
+import jobs
+
+URL = "https://github.com/dono/repo"
+
+
+class PipelineFalso:
+    """Faz o papel de _executar_fases: espera 'liberar' e gera um README (ou falha)."""
+
+    def __init__(self):
+        self.liberar = threading.Event()
+        self.execucoes = []
+        self.erro = None
+
+    def __call__(self, job):
+        self.execucoes.append(job.url)
+        job._iniciar_fase("clone")
+        self.liberar.wait(5)
+        job._adicionar_trecho(f"# README de {job.url}")
+        return self.erro
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    falso = PipelineFalso()
+    monkeypatch.setattr(jobs.GerenciadorJobs, "_executar_fases", lambda gerenciador, job: falso(job))
+    yield falso
+    falso.liberar.set()
+
+
+@pytest.fixture
+def gerenciadores():
+    criados = []
+
+    def criar(**opcoes) -> jobs.GerenciadorJobs:
+        gerenciador = jobs.GerenciadorJobs(**{"max_workers": 1, **opcoes})
+        criados.append(gerenciador)
+        return gerenciador
+
+    yield criar
+    for gerenciador in criados:
+        gerenciador.encerrar(aguardar=False)
+
+
+def _concluir(gerenciador, job_id: str) -> jobs.Job:
+    job = gerenciador.obter(job_id)
+    assert job.aguardar(5)
+    return job
+
+
+def test_mesma_url_se_junta_ao_job_em_andamento(pipeline, gerenciadores):
+    gerenciador = gerenciadores()
+    job_id = gerenciador.submeter(URL)
+    assert gerenciador.submeter(URL + ".git") == job_id
+    pipeline.liberar.set()
+    job = _concluir(gerenciador, job_id)
+    assert job.status == jobs.OK
+    assert job.submissoes == 2
+    assert pipeline.execucoes == [URL]
+
+
+def test_resultado_pronto_e_reaproveitado(pipeline, gerenciadores):
+    gerenciador = gerenciadores()
+    pipeline.liberar.set()
+    job_id = gerenciador.submeter(URL)
+    _concluir(gerenciador, job_id)
+    assert gerenciador.submeter(URL) == job_id
+    assert len(pipeline.execucoes) == 1
+
+
+@pytest.mark.parametrize("opcoes_gerenciador, opcoes_submissao, erro", [
+    ({}, {"usar_cache": False}, None),   # Pedido explícito de nova geração
+    ({"ttl_resultados_s": 0}, {}, None),  # Resultado expirado
+    ({}, {}, "falhou"),                   # Erros não são reaproveitados
+])
+def test_resultado_nao_reaproveitado(pipeline, gerenciadores, opcoes_gerenciador, opcoes_submissao, erro):
+    gerenciador = gerenciadores(**opcoes_gerenciador)
+    pipeline.liberar.set()
+    pipeline.erro = erro
+    job_id = gerenciador.submeter(URL)
+    _concluir(gerenciador, job_id)
+    novo_id = gerenciador.submeter(URL, **opcoes_submissao)
+    assert novo_id != job_id
+    _concluir(gerenciador, novo_id)
+    assert len(pipeline.execucoes) == 2
+
+
+def test_fila_cheia(pipeline, gerenciadores):
+    gerenciador = gerenciadores(max_fila=1)
+    primeiro = gerenciador.obter(gerenciador.submeter(URL + "-1"))
+    while primeiro.status == jobs.NA_FILA:
+        primeiro.aguardar(0.01)
+    assert primeiro.status == jobs.EXECUTANDO
+    segundo = gerenciador.submeter(URL + "-2")
+    with pytest.raises(jobs.FilaCheia):
+        gerenciador.submeter(URL + "-3")
+    # Uma URL já na fila se junta ao job existente mesmo com a fila cheia
+    assert gerenciador.submeter(URL + "-2") == segundo
+    pipeline.liberar.set()
+    assert _concluir(gerenciador, segundo).status == jobs.OK
+
+
+def test_poda_os_jobs_terminados_mais_antigos(pipeline, gerenciadores):
+    gerenciador = gerenciadores(max_guardados=2)
+    pipeline.liberar.set()
+    ids = []
+    for i in range(3):
+        ids.append(gerenciador.submeter(f"{URL}-{i}"))
+        _concluir(gerenciador, ids[-1])
+    assert gerenciador.obter(ids[0]) is None
+    assert all(gerenciador.obter(job_id) for job_id in ids[1:])
+    # Sem o job podado, a mesma URL gera de novo
+    assert gerenciador.submeter(f"{URL}-0") != ids[0]
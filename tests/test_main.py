@@ -0,0 +1,14 @@
+# Limites da varredura vindos do CLI: ausente usa o padrão; 0 desativa.
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("valor, padrao, esperado", [
+    (None, 200_000, 200_000),
+    (None, None, None),
+    (0, 200_000, None),
+    (3, 200_000, 3),
+])
+def test_limite_cli(valor, padrao, esperado):
+    assert main._limite_cli(valor, padrao) == esperado
@@ -0,0 +1,138 @@
+# Extratores de dependências em streaming: requirements.txt, pyproject.toml e
+# package.json. O package.json deve concordar com a leitura completa (json.loads),
+# inclusive com blocos minúsculos, que forçam strings e escapes a cruzar blocos.
+import io
+import json
+import random
+
+import pytest
+
+from manifestos import node
+from manifestos import python as manifesto_python
+
+TAMANHOS_BLOCO = (1, 2, 3, 5, 7, 16)
+
+
+def _texto_aleatorio(rng: random.Random) -> str:
+    alfabeto = ['a', 'b', 'ç', '"', '\\', '\n', '\t', '/', 'é', '☃', '\U0001f600', ' ']
+    return "".join(rng.choice(alfabeto) for _ in range(rng.randint(0, 6)))
+
+
+def _documento_aleatorio(rng: random.Random) -> dict:
+    documento = {}
+    for _ in range(rng.randint(0, 4)):
+        documento[_texto_aleatorio(rng)] = rng.choice([
+            _texto_aleatorio(rng), rng.randint(-5, 5), None, True, [_texto_aleatorio(rng)],
+            {_texto_aleatorio(rng): _texto_aleatorio(rng)},
+        ])
+    for chave in node.CHAVES_PACKAGE_JSON:
+        if rng.random() < 0.7:
+            documento[chave] = {_texto_aleatorio(rng): _texto_aleatorio(rng) for _ in range(rng.randint(0, 4))}
+    return documento
+
+
+def _esperado(texto: str) -> list[str]:
+    documento = json.loads(texto)
+    return [dep for chave in node.CHAVES_PACKAGE_JSON for dep in documento.get(chave, {})]
+
+
+def _extrair(texto: str, tamanho_bloco: int, monkeypatch) -> list[str]:
+    monkeypatch.setattr(node, "TAMANHO_BLOCO", tamanho_bloco)
+    dependencias, truncado = node.extrair_package_json(io.BytesIO(texto.encode("utf-8")))
+    assert not truncado
+    return dependencias
+
+
+@pytest.mark.parametrize("tamanho_bloco", TAMANHOS_BLOCO)
+def test_escape_no_fim_do_arquivo(tamanho_bloco, monkeypatch):
+    # Regressão: o escape no fim do último bloco apontava para o buffer antigo
+    texto = '{"dependencies": {"a": "x\\n"}}'
+    assert _extrair(texto, tamanho_bloco, monkeypatch) == ["a"]
+
+
+@pytest.mark.parametrize("tamanho_bloco", TAMANHOS_BLOCO)
+def test_package_json_igual_ao_json_loads(tamanho_bloco, monkeypatch):
+    rng = random.Random(tamanho_bloco)
+    for _ in range(500):
+        documento = _documento_aleatorio(rng)
+        texto = json.dumps(documento, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 1]))
+        assert _extrair(texto, tamanho_bloco, monkeypatch) == _esperado(texto), texto
+
+
+def test_package_json_truncado_devolve_o_que_ja_encontrou():
+    texto = json.dumps({"dependencies": {f"dep-{i}": "^1" for i in range(50)}, "description": "x" * 1000})
+    dependencias, truncado = node.extrair_package_json(io.BytesIO(texto.encode("utf-8")), limite=200)
+    assert truncado
+    assert 0 < len(dependencias) < 50
+    assert dependencias == [f"dep-{i}" for i in range(len(dependencias))]
+
+
+# --- requirements.txt e pyproject.toml ---
+
+REQUIREMENTS = """\
+# comentário
+flask>=2.0
+requests[socks] ==2.31 ; python_version >= "3.8"
+-r outros.txt
+--index-url https://example.com/simple
+-e git+https://github.com/dono/pacote.git#egg=pacote
+numpy \\
+    >=1.26
+uvicorn  # servidor
+./pacote-local
+zope.interface~=6.0
+"""
+
+
+def _requirements(texto: str, limite: int = 1 << 20) -> tuple[list[str], bool]:
+    return manifesto_python.extrair_requirements(io.BytesIO(texto.encode("utf-8")), limite)
+
+
+def test_requirements_casos_especiais():
+    assert _requirements(REQUIREMENTS) == (["flask", "requests", "numpy", "uvicorn", "zope.interface"], False)
+
+
+def test_requirements_igual_ao_parser_de_referencia():
+    requirements = pytest.importorskip("packaging.requirements")
+    linhas = [
+        "flask", "Django>=4,<5", "requests[socks,security]==2.31", "black ; python_version>'3.7'",
+        "pkg @ https://example.com/pkg.whl", "a.b-c_d>=1", "x!=1.0,>=0.5",
+    ]
+    esperado = [requirements.Requirement(linha).name for linha in linhas]
+    assert _requirements("\n".join(linhas)) == (esperado, False)
+
+
+def test_requirements_truncado_devolve_um_prefixo():
+    completo, _ = _requirements(REQUIREMENTS)
+    for limite in range(1, len(REQUIREMENTS)):
+        dependencias, truncado = _requirements(REQUIREMENTS, limite)
+        assert truncado
+        assert dependencias == completo[:len(dependencias)]
+
+
+PYPROJECT_PEP621 = """\
+[project]
+name = "app"
+dependencies = ["fastapi>=0.100", "pydantic[email]", "httpx ; python_version >= '3.9'"]
+"""
+
+PYPROJECT_POETRY = """\
+[tool.poetry.dependencies]
+python = "^3.11"
+django = "^5.0"
+celery = {version = "^5", extras = ["redis"]}
+"""
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    (PYPROJECT_PEP621, ["fastapi", "pydantic", "httpx"]),
+    (PYPROJECT_POETRY, ["django", "celery"]),
+])
+def test_pyproject(texto, esperado):
+    f = io.BytesIO(texto.encode("utf-8"))
+    assert manifesto_python.extrair_pyproject(f) == (esperado, False)
+
+
+def test_pyproject_acima_do_limite_nao_e_interpretado():
+    f = io.BytesIO(PYPROJECT_PEP621.encode("utf-8"))
+    assert manifesto_python.extrair_pyproject(f, limite=10) == ([], True)
@@ -0,0 +1,90 @@
+# Pipeline asyncio de ponta a ponta sobre um repositório git local, com um
+# cliente de IA falso (sem rede).
+import asyncio
+import subprocess
+
+import pytest
+
+import cloner
+import cliente_ia
+import pipeline_async
+
+
+class _Chunk:
+    def __init__(self, texto):
+        self.text = texto
+
+
+class ModeloAsyncFalso:
+    def __init__(self, atraso_s: float = 0.0):
+        self.atraso_s = atraso_s
+        self.chamadas = 0
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.chamadas += 1
+        await asyncio.sleep(self.atraso_s)
+
+        async def pedacos():
+            yield _Chunk("# Projeto\n\n")
+            yield _Chunk("Gerado sem rede.\n")
+        return pedacos()
+
+
+def _cliente(atraso_s: float = 0.0) -> cliente_ia.ClienteModeloAsync:
+    return cliente_ia.ClienteModeloAsync(modelo=ModeloAsyncFalso(atraso_s),
+                                         balde=cliente_ia.BaldeTokens(1000, 1000))
+
+
+@pytest.mark.parametrize("modo", cloner.MODOS_CLONE)
+def test_pipeline_completo(repo_git, modo):
+    trechos = []
+    resultado = asyncio.run(pipeline_async.gerar_readme_async(
+        f"file://{repo_git}", modo_clone=modo, usar_cache=False, cliente=_cliente(),
+        ao_receber_trecho=trechos.append,
+    ))
+    assert resultado["status"] == "ok", resultado.get("erro")
+    assert resultado["stacks"] == 2
+    assert resultado["readme"] == "".join(trechos) == "# Projeto\n\nGerado sem rede."
+    assert {"clone", "analise", "geracao", "total"} <= set(resultado["tempos"])
+
+
+def test_timeout_da_geracao(repo_git):
+    resultado = asyncio.run(pipeline_async.gerar_readme_async(
+        f"file://{repo_git}", usar_cache=False, cliente=_cliente(atraso_s=5), timeout_geracao_s=0.2,
+    ))
+    assert resultado["status"] == "erro"
+    assert resultado["fase_erro"] == "geracao"
+
+
+def test_clone_invalido_vira_erro(tmp_path):
+    resultado = asyncio.run(pipeline_async.gerar_readme_async(
+        f"file://{tmp_path / 'nao-existe'}", usar_cache=False, cliente=_cliente(),
+    ))
+    assert resultado["status"] == "erro"
+    assert resultado["fase_erro"] == "clone"
+
+
+def test_varios_jobs_mantem_a_ordem(repo_git, tmp_path):
+    urls = [f"file://{repo_git}", f"file://{tmp_path / 'nao-existe'}", f"file://{repo_git}"]
+    resultados = asyncio.run(pipeline_async.gerar_varios_async(urls, usar_cache=False, cliente=_cliente()))
+    assert [r["url"] for r in resultados] == urls
+    assert [r["status"] for r in resultados] == ["ok", "erro", "ok"]
+
+
+def test_clone_arvore_sem_chave_promisor(repo_git, monkeypatch):
+    # Servidor que ignora o filtro (clone vem completo) e git que não grava remote.origin.promisor
+    subprocess.run(["git", "-C", str(repo_git), "config", "uploadpack.allowFilter", "false"], check=True)
+    git_original = pipeline_async._git
+
+    async def git_sem_promisor(*argumentos, cwd=None):
+        saida = await git_original(*argumentos, cwd=cwd)
+        if argumentos[:2] == ("clone", "--bare"):
+            await git_original("config", "--unset", "remote.origin.promisor", cwd=argumentos[-1])
+        return saida
+
+    monkeypatch.setattr(pipeline_async, "_git", git_sem_promisor)
+    resultado = asyncio.run(pipeline_async.gerar_readme_async(
+        f"file://{repo_git}", modo_clone="arvore", usar_cache=False, cliente=_cliente(),
+    ))
+    assert resultado["status"] == "ok", resultado.get("erro")
+    assert resultado["stacks"] == 2
@@ -0,0 +1,216 @@
+# Serviço HTTP sobre um repositório git local, com um generator falso (sem IA):
+# ETag/304, geração evitada pelo If-None-Match, agrupamento de requisições
+# idênticas e a admissão (fila, 429 e Retry-After).
+import sys
+import json
+import time
+import types
+import threading
+import http.client
+from urllib.parse import quote
+
+import pytest
+
+import cloner
+import servidor
+
+
+@pytest.fixture
+def generator_falso(monkeypatch):
+    """Substitui o módulo generator (o serviço o importa só em /gerar)."""
+    falso = types.ModuleType("generator")
+    falso.chamadas = 0
+
+    def gerar_readme(contexto, usar_cache=True):
+        falso.chamadas += 1
+        return f"# README {falso.chamadas}\n\n{len(contexto['stacks'])} stacks."
+
+    falso.gerar_readme = gerar_readme
+    falso.readme_falhou = lambda readme: not readme.strip()
+    falso.chave_prompt = lambda contexto: json.dumps(contexto["stacks"], sort_keys=True)
+    falso.estatisticas_cache = lambda: {}
+    monkeypatch.setitem(sys.modules, "generator", falso)
+    return falso
+
+
+def _servico(**opcoes) -> servidor.ServicoReadme:
+    return servidor.ServicoReadme(modo_clone=cloner.MODO_COMPLETO, usar_espelho=False,
+                                  esquemas_permitidos=("file",), **opcoes)
+
+
+@pytest.fixture
+def iniciar():
+    """Sobe servidores na porta 0 (uma livre) e os encerra no fim do teste."""
+    iniciados = []
+
+    def iniciar_servidor(servico: servidor.ServicoReadme) -> int:
+        http_servidor = servidor.criar_servidor("127.0.0.1", 0, servico)
+        threading.Thread(target=http_servidor.serve_forever, daemon=True).start()
+        iniciados.append(http_servidor)
+        return http_servidor.server_port
+
+    yield iniciar_servidor
+    for http_servidor in iniciados:
+        http_servidor.shutdown()
+        http_servidor.server_close()
+
+
+def _get(porta: int, caminho: str, cabecalhos: dict | None = None) -> tuple[int, dict, bytes]:
+    conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=30)
+    try:
+        conexao.request("GET", caminho, headers=cabecalhos or {})
+        resposta = conexao.getresponse()
+        return resposta.status, dict(resposta.getheaders()), resposta.read()
+    finally:
+        conexao.close()
+
+
+def _rota(rota: str, repo) -> str:
+    return f"{rota}?url={quote(f'file://{repo}', safe='')}"
+
+
+# --- ETag ---
+
+@pytest.mark.parametrize("if_none_match, confere", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", W/"abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+])
+def test_etag_confere(if_none_match, confere):
+    assert servidor.etag_confere(if_none_match, 'W/"abc"') is confere
+
+
+# --- Admissão ---
+
+def test_admissao_recusa_com_fila_cheia():
+    admissao = servidor.Admissao(max_simultaneas=1, max_fila=0, duracao_inicial_s=10)
+    with admissao.vaga():
+        with pytest.raises(servidor.Sobrecarga) as erro:
+            admissao.entrar()
+    assert erro.value.status == 429
+    assert erro.value.retry_after == 10
+    assert admissao.estatisticas()["recusadas"] == 1
+
+
+def test_admissao_desiste_depois_da_espera_maxima():
+    admissao = servidor.Admissao(max_simultaneas=1, max_fila=1, espera_max_s=0.05)
+    with admissao.vaga():
+        with pytest.raises(servidor.Sobrecarga):
+            admissao.entrar()
+    assert admissao.estatisticas()["na_fila"] == 0
+
+
+def test_admissao_libera_a_fila_quando_uma_vaga_abre():
+    admissao = servidor.Admissao(max_simultaneas=1, max_fila=1, espera_max_s=5)
+    admissao.entrar()
+    admitida = threading.Event()
+
+    def esperar():
+        with admissao.vaga():
+            admitida.set()
+
+    thread = threading.Thread(target=esperar)
+    thread.start()
+    while admissao.estatisticas()["na_fila"] == 0:
+        time.sleep(0.01)
+    assert not admitida.is_set()
+    admissao.sair(0.0)
+    thread.join(5)
+    assert admitida.is_set()
+    assert admissao.estatisticas()["em_execucao"] == 0
+
+
+# --- Agrupamento ---
+
+def test_uma_vez_agrupa_chamadas_identicas():
+    servico = _servico()
+    liberar = threading.Event()
+    execucoes = []
+
+    def funcao():
+        execucoes.append(1)
+        liberar.wait(5)
+        return "resultado"
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(servico._uma_vez(("k",), funcao)))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while servico.metricas()["agrupadas"] < 2:
+        time.sleep(0.01)
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+    assert resultados == ["resultado"] * 3
+    assert execucoes == [1]
+    assert servico.metricas()["em_andamento"] == 0
+
+
+def test_uma_vez_repassa_o_erro_e_libera_a_chave():
+    servico = _servico()
+
+    def falhar():
+        raise servidor.ErroRequisicao(502, "falhou")
+
+    with pytest.raises(servidor.ErroRequisicao):
+        servico._uma_vez(("k",), falhar)
+    assert servico._uma_vez(("k",), lambda: "ok") == "ok"
+
+
+# --- HTTP ---
+
+def test_analisar_responde_304_com_a_mesma_etag(repo_git, iniciar):
+    porta = iniciar(_servico())
+    status, cabecalhos, corpo = _get(porta, _rota("/analisar", repo_git))
+    assert status == 200
+    assert len(json.loads(corpo)["stacks"]) == 2
+    etag = cabecalhos["ETag"]
+    status, cabecalhos, corpo = _get(porta, _rota("/analisar", repo_git), {"If-None-Match": etag})
+    assert (status, cabecalhos["ETag"], corpo) == (304, etag, b"")
+
+
+def test_gerar_e_if_none_match_evita_a_ia(repo_git, iniciar, generator_falso):
+    status, cabecalhos, corpo = _get(iniciar(_servico()), _rota("/gerar", repo_git))
+    assert status == 200
+    assert json.loads(corpo)["readme"] == "# README 1\n\n2 stacks."
+    etag = cabecalhos["ETag"]
+    assert etag.startswith("W/")
+
+    # Outro processo (memória vazia) com a mesma ETag: 304 sem chamar a IA
+    servico = _servico()
+    status, _, _ = _get(iniciar(servico), _rota("/gerar", repo_git), {"If-None-Match": etag})
+    assert status == 304
+    assert generator_falso.chamadas == 1
+    assert servico.metricas()["geracoes_evitadas"] == 1
+
+
+def test_gerar_em_markdown(repo_git, iniciar, generator_falso):
+    status, cabecalhos, corpo = _get(iniciar(_servico()), _rota("/gerar", repo_git), {"Accept": "text/markdown"})
+    assert status == 200
+    assert cabecalhos["Content-Type"] == servidor.TIPO_MARKDOWN
+    assert corpo.decode("utf-8") == "# README 1\n\n2 stacks."
+
+
+def test_servidor_ocupado_responde_429_com_retry_after(repo_git, iniciar):
+    admissao = servidor.Admissao(max_simultaneas=1, max_fila=0, duracao_inicial_s=7)
+    porta = iniciar(_servico(admissao=admissao))
+    admissao.entrar()
+    try:
+        status, cabecalhos, _ = _get(porta, _rota("/analisar", repo_git))
+    finally:
+        admissao.sair(7.0)
+    assert status == 429
+    assert cabecalhos["Retry-After"] == "7"
+
+
+@pytest.mark.parametrize("caminho, status", [
+    ("/nada", 404),
+    ("/analisar", 400),
+    (f"/analisar?url={quote('https://example.com/dono/repo', safe='')}", 400),  # Esquema não permitido
+])
+def test_requisicoes_invalidas(iniciar, caminho, status):
+    assert _get(iniciar(_servico()), caminho)[0] == status